@@ -0,0 +1,301 @@
+# analytics.py - hourly/daily rollups of chats, active users, registrations and feedback
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, and_, tuple_
+
+GRANULARITIES = ('hour', 'day')
+REPORT_GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+
+def bucket_start(moment, granularity):
+    """Start of the hour/day containing moment"""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def report_bucket(day, granularity):
+    """Week (starting Monday) or month a daily bucket rolls up into"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_sql(column, granularity, dialect):
+    """SQL expression truncating a timestamp column to the bucket start"""
+    if dialect == 'sqlite':
+        return func.strftime('%Y-%m-%d %H:00:00' if granularity == 'hour' else '%Y-%m-%d 00:00:00', column)
+    if dialect == 'postgresql':
+        return func.date_trunc(granularity, column)
+    if dialect in ('mysql', 'mariadb'):
+        return func.date_format(column, '%Y-%m-%d %H:00:00' if granularity == 'hour' else '%Y-%m-%d 00:00:00')
+    raise ValueError(f'No bucket expression for {dialect}')
+
+
+def as_datetime(value):
+    """SQLite hands truncated timestamps back as strings"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class RollupStore:
+    """Maintains and reads the rollup tables.
+
+    `rollup` rows hold one counter per (granularity, bucket_start, metric,
+    dimension): chats per category, active_users, registrations per role and
+    feedback per rating. Distinct active users are counted through
+    `activity` marks, one per (granularity, bucket_start, user_id); a user
+    only bumps active_users the first time a mark is inserted.
+    """
+
+    def __init__(self, rollup, activity):
+        self.rollup = rollup.__table__
+        self.activity = activity.__table__
+
+    # ---------- incremental updates ----------
+
+    def record_chats(self, session, rows):
+        """Count chat rows (dicts with user_id, category, created_at)"""
+        counts, marks = {}, set()
+        for row in rows:
+            for granularity in GRANULARITIES:
+                start = bucket_start(row['created_at'], granularity)
+                key = (granularity, start, 'chats', row.get('category') or '')
+                counts[key] = counts.get(key, 0) + 1
+                marks.add((granularity, start, row['user_id']))
+
+        for granularity, start, _ in self._mark_active(session, marks):
+            key = (granularity, start, 'active_users', '')
+            counts[key] = counts.get(key, 0) + 1
+        self._add(session, counts)
+
+    def record_registration(self, session, created_at, role):
+        self._add(session, {(granularity, bucket_start(created_at, granularity), 'registrations', role or ''): 1
+                            for granularity in GRANULARITIES})
+
+    def record_feedback(self, session, created_at, rating):
+        try:
+            dimension = str(int(rating))
+        except (TypeError, ValueError):
+            dimension = ''  # Unrated (or unreadable rating)
+        self._add(session, {(granularity, bucket_start(created_at, granularity), 'feedback', dimension): 1
+                            for granularity in GRANULARITIES})
+
+    def _insert(self, session):
+        dialect = session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            return None
+        return insert
+
+    def _add(self, session, counts):
+        """value += delta for every key, creating missing rows"""
+        if not counts:
+            return
+        values = [{'granularity': g, 'bucket_start': b, 'metric': m, 'dimension': d, 'value': v}
+                  for (g, b, m, d), v in counts.items()]
+        insert = self._insert(session)
+        if insert is not None:
+            statement = insert(self.rollup).values(values)
+            session.execute(statement.on_conflict_do_update(
+                index_elements=['granularity', 'bucket_start', 'metric', 'dimension'],
+                set_={'value': self.rollup.c.value + statement.excluded.value}
+            ))
+            return
+
+        # Portable fallback: read, then update or insert
+        table = self.rollup
+        for row in values:
+            key = and_(table.c.granularity == row['granularity'], table.c.bucket_start == row['bucket_start'],
+                       table.c.metric == row['metric'], table.c.dimension == row['dimension'])
+            if session.execute(table.update().where(key).values(value=table.c.value + row['value'])).rowcount == 0:
+                session.execute(table.insert().values(row))
+
+    def _mark_active(self, session, marks):
+        """Insert activity marks; returns the ones that did not exist yet"""
+        if not marks:
+            return []
+        table = self.activity
+        insert = self._insert(session)
+        if insert is not None:
+            statement = insert(table).values([{'granularity': g, 'bucket_start': b, 'user_id': u}
+                                              for g, b, u in marks])
+            statement = statement.on_conflict_do_nothing().returning(
+                table.c.granularity, table.c.bucket_start, table.c.user_id)
+            return [(g, as_datetime(b), u) for g, b, u in session.execute(statement)]
+
+        existing = set(session.execute(select(table.c.granularity, table.c.bucket_start, table.c.user_id).where(
+            tuple_(table.c.granularity, table.c.bucket_start, table.c.user_id).in_(list(marks)))).all())
+        new = [mark for mark in marks if mark not in existing]
+        if new:
+            session.execute(table.insert(), [{'granularity': g, 'bucket_start': b, 'user_id': u} for g, b, u in new])
+        return new
+
+    # ---------- reads ----------
+
+    def report(self, session, start, end, granularity):
+        """Buckets in [start, end); week and month are summed from daily rows.
+
+        Returns (buckets, rows_read). active_users of a week or month is the
+        sum of its daily values (user-days), not distinct users.
+        """
+        source = 'hour' if granularity == 'hour' else 'day'
+        table = self.rollup
+        rows = session.execute(
+            select(table.c.bucket_start, table.c.metric, table.c.dimension, table.c.value)
+            .where(table.c.granularity == source,
+                   table.c.bucket_start >= bucket_start(start, source),
+                   table.c.bucket_start < end)
+            .order_by(table.c.bucket_start)
+        ).all()
+
+        buckets = {}
+        for moment, metric, dimension, value in rows:
+            moment = report_bucket(as_datetime(moment), granularity)
+            bucket = buckets.get(moment)
+            if bucket is None:
+                bucket = buckets[moment] = {
+                    'bucket': moment.isoformat(),
+                    'chats': 0,
+                    'categories': {},
+                    'active_users': 0,
+                    'registrations': 0,
+                    'feedback': {'count': 0, 'ratings': {}, 'average_rating': None}
+                }
+            if metric == 'chats':
+                bucket['chats'] += value
+                category = dimension or 'uncategorized'
+                bucket['categories'][category] = bucket['categories'].get(category, 0) + value
+            elif metric == 'active_users':
+                bucket['active_users'] += value
+            elif metric == 'registrations':
+                bucket['registrations'] += value
+            elif metric == 'feedback':
+                bucket['feedback']['count'] += value
+                if dimension:
+                    ratings = bucket['feedback']['ratings']
+                    ratings[dimension] = ratings.get(dimension, 0) + value
+
+        for bucket in buckets.values():
+            ratings = bucket['feedback']['ratings']
+            rated = sum(ratings.values())
+            if rated:
+                total = sum(int(rating) * count for rating, count in ratings.items())
+                bucket['feedback']['average_rating'] = round(total / rated, 2)
+
+        return [buckets[moment] for moment in sorted(buckets)], len(rows)
+
+    # ---------- retention ----------
+
+    def prune(self, session, marks_before, hourly_before=None, batch_size=1000):
+        """Delete activity marks of closed buckets and old hourly rollups, one batch per step.
+
+        A generator yielding the rows each committed batch removed. Daily
+        rollups are kept: they are the history once raw chats are gone.
+        """
+        targets = [(self.activity, self.activity.c.bucket_start < marks_before)]
+        if hourly_before is not None:
+            targets.append((self.rollup, and_(self.rollup.c.granularity == 'hour',
+                                              self.rollup.c.bucket_start < hourly_before)))
+
+        for table, condition in targets:
+            key = tuple_(*table.primary_key.columns)
+            while True:
+                keys = session.execute(select(*table.primary_key.columns).where(condition).limit(batch_size)).all()
+                if not keys:
+                    break
+                session.execute(table.delete().where(key.in_(keys)))
+                session.commit()
+                yield len(keys)
+
+    # ---------- backfill ----------
+
+    def backfill(self, session, chat, user, feedback, start=None, end=None, window_days=7, marks_since=None):
+        """Rebuild rollups for [start, end) from the source tables, one window per transaction.
+
+        Existing rollups in each window are replaced, so re-running is safe.
+        Activity marks (only needed while a bucket can still receive chats)
+        are rebuilt from marks_since onwards.
+        """
+        dialect = session.get_bind().dialect.name
+        if start is None:
+            earliest = [session.execute(select(func.min(model.created_at))).scalar()
+                        for model in (chat, user, feedback)]
+            earliest = [as_datetime(moment) for moment in earliest if moment is not None]
+            if not earliest:
+                return 0
+            start = min(earliest)
+        start = bucket_start(start, 'day')
+        end = end or bucket_start(datetime.utcnow(), 'day') + timedelta(days=1)
+
+        written = 0
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + timedelta(days=window_days), end)
+            written += self._backfill_window(session, dialect, chat, user, feedback,
+                                             window_start, window_end, marks_since)
+            session.commit()
+            window_start = window_end
+        return written
+
+    def _backfill_window(self, session, dialect, chat, user, feedback, start, end, marks_since):
+        rollup, activity = self.rollup, self.activity
+        session.execute(rollup.delete().where(rollup.c.bucket_start >= start, rollup.c.bucket_start < end))
+
+        counts = {}
+        for granularity in GRANULARITIES:
+            chat_bucket = bucket_sql(chat.created_at, granularity, dialect)
+            in_window = and_(chat.created_at >= start, chat.created_at < end)
+
+            for moment, category, count in session.execute(
+                    select(chat_bucket, chat.category, func.count()).where(in_window)
+                    .group_by(chat_bucket, chat.category)):
+                counts[(granularity, as_datetime(moment), 'chats', category or '')] = count
+
+            for moment, count in session.execute(
+                    select(chat_bucket, func.count(func.distinct(chat.user_id))).where(in_window)
+                    .group_by(chat_bucket)):
+                counts[(granularity, as_datetime(moment), 'active_users', '')] = count
+
+            user_bucket = bucket_sql(user.created_at, granularity, dialect)
+            for moment, role, count in session.execute(
+                    select(user_bucket, user.role, func.count())
+                    .where(user.created_at >= start, user.created_at < end)
+                    .group_by(user_bucket, user.role)):
+                counts[(granularity, as_datetime(moment), 'registrations', role or '')] = count
+
+            feedback_bucket = bucket_sql(feedback.created_at, granularity, dialect)
+            for moment, rating, count in session.execute(
+                    select(feedback_bucket, feedback.rating, func.count())
+                    .where(feedback.created_at >= start, feedback.created_at < end)
+                    .group_by(feedback_bucket, feedback.rating)):
+                try:
+                    dimension = str(int(rating))
+                except (TypeError, ValueError):
+                    dimension = ''
+                key = (granularity, as_datetime(moment), 'feedback', dimension)
+                counts[key] = counts.get(key, 0) + count
+
+            # Marks for buckets that may still see new chats
+            if marks_since is not None and end > marks_since:
+                mark_start = max(start, bucket_start(marks_since, granularity))
+                session.execute(activity.delete().where(activity.c.granularity == granularity,
+                                                        activity.c.bucket_start >= mark_start,
+                                                        activity.c.bucket_start < end))
+                marks = {(granularity, as_datetime(moment), user_id) for moment, user_id in session.execute(
+                    select(chat_bucket, chat.user_id).where(chat.created_at >= mark_start, chat.created_at < end)
+                    .distinct())}
+                if marks:
+                    session.execute(activity.insert(), [{'granularity': g, 'bucket_start': b, 'user_id': u}
+                                                        for g, b, u in marks])
+
+        if counts:
+            session.execute(rollup.insert(), [
+                {'granularity': g, 'bucket_start': b, 'metric': m, 'dimension': d, 'value': v}
+                for (g, b, m, d), v in counts.items()
+            ])
+        return len(counts)
@@ -1,20 +1,41 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import func, desc
-import smtplib
+from sqlalchemy import func, desc, inspect, select, insert, update, delete, event, and_, or_, bindparam, case
 import random
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import asyncio
+import atexit
+import base64
+import json
+import time
 from datetime import datetime, timedelta
 import jwt
-from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
+import click
+from functools import wraps, lru_cache
 from dotenv import load_dotenv
 import logging
 import sqlite3
+from cache import TTLCache
+from mailer import EmailDispatcher
+from chat_buffer import ChatWriteBuffer
+from passwords import PasswordHasher
+from stats_service import StatisticsService
+from analytics import RollupStore, REPORT_GRANULARITIES, bucket_start
+from chat_search import ChatSearch
+from chat_sessions import SessionStore
+from rate_limit import RateLimiter, MemoryBackend, backend_from_url
+from async_api import AsyncAPI, AsyncDatabase, Response as AsyncResponse
+from metrics import MetricsRegistry, QueryCounter
+from sql_diagnostics import QueryDiagnostics
+from log_pipeline import LogPipeline, new_request_id, parse_sampling
+from db_tuning import engine_options, sqlite_pragmas, apply_sqlite_pragmas, sqlite_settings, sqlite_maintenance
+from retention import RetentionWorker, DatabaseLease
+from otp_store import MemoryOTPStore
+from intent_engine import IntentEngine
+from retrieval import RetrievalIndex
+from knowledge_base import KNOWLEDGE_BASE, INTENTS, TOPICS, FALLBACK_RESPONSE
 
 # Load environment variables
 load_dotenv()
@@ -27,18 +48,51 @@ CORS(app, resources={r"/*": {"origins": os.environ.get("APP_URL", "http://localh
 # Security
 app.config['SECRET_KEY'] = os.environ.get("SECRET_KEY", "health-ai-assistant-secret-key-2024-change-this-in-production")
 OTP_EXPIRY_MINUTES = int(os.environ.get("OTP_EXPIRY_MINUTES", 10))
+OTP_STORE = os.environ.get("OTP_STORE", "database")  # database, or memory (single process only, no database writes)
 TOKEN_EXPIRY_MINUTES = int(os.environ.get("TOKEN_EXPIRY_MINUTES", 15))
 JWT_EXPIRY_HOURS = int(os.environ.get("JWT_EXPIRY_HOURS", 24))
 
+# Password Hashing (existing hashes are upgraded on the next login when these change)
+PASSWORD_HASH_ALGORITHM = os.environ.get("PASSWORD_HASH_ALGORITHM", "scrypt")  # scrypt or pbkdf2:sha256
+PASSWORD_HASH_WORK_FACTOR = int(os.environ.get("PASSWORD_HASH_WORK_FACTOR", 0))  # scrypt N or PBKDF2 iterations, 0 = werkzeug default
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))  # Hashing processes, 0 hashes on the request thread
+
 # Database
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL", "sqlite:///health_ai.db")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Connection pool (PostgreSQL/MySQL)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # Seconds before a connection is replaced
+
+# SQLite pragmas, applied to every new connection (empty value keeps SQLite's default)
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 268435456))  # Bytes
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", -65536))  # Negative = KiB
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))  # Milliseconds to wait on a locked database
+SQLITE_AUTO_VACUUM = os.environ.get("SQLITE_AUTO_VACUUM", "INCREMENTAL")  # Lets the retention job hand free pages back
+SQLITE_PRAGMAS = sqlite_pragmas(
+    journal_mode=SQLITE_JOURNAL_MODE,
+    synchronous=SQLITE_SYNCHRONOUS,
+    mmap_size=SQLITE_MMAP_SIZE,
+    cache_size=SQLITE_CACHE_SIZE,
+    busy_timeout_ms=SQLITE_BUSY_TIMEOUT,
+    auto_vacuum=SQLITE_AUTO_VACUUM
+)
+
 # Email Configuration
 EMAIL_HOST = os.environ.get("EMAIL_HOST", "smtp.gmail.com")
 EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 587))
 EMAIL_USER = os.environ.get("EMAIL_USER", "")
 EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD", "")
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "True").lower() == "true"
+EMAIL_WORKERS = int(os.environ.get("EMAIL_WORKERS", 1))  # One persistent SMTP session per worker
+EMAIL_QUEUE_SIZE = int(os.environ.get("EMAIL_QUEUE_SIZE", 1000))
+EMAIL_BATCH_SIZE = int(os.environ.get("EMAIL_BATCH_SIZE", 20))
+EMAIL_MAX_RETRIES = int(os.environ.get("EMAIL_MAX_RETRIES", 3))
 
 # Application Settings
 APP_NAME = os.environ.get("APP_NAME", "Health & AI Assistant")
@@ -55,13 +109,95 @@ ADMIN_NAME = "Admin User"
 # Chat Settings
 MAX_CHAT_HISTORY = int(os.environ.get("MAX_CHAT_HISTORY", 100))
 CHAT_SESSION_TIMEOUT = int(os.environ.get("CHAT_SESSION_TIMEOUT", 30))
+MAX_CHAT_BATCH_SIZE = int(os.environ.get("MAX_CHAT_BATCH_SIZE", 500))  # Messages per POST /api/user/chats/batch
+
+# Chat Write Path
+CHAT_WRITE_MODE = os.environ.get("CHAT_WRITE_MODE", "sync")  # sync (commit per message) or write_behind (group commit)
+CHAT_FLUSH_INTERVAL_MS = int(os.environ.get("CHAT_FLUSH_INTERVAL_MS", 50))
+CHAT_FLUSH_ROWS = int(os.environ.get("CHAT_FLUSH_ROWS", 100))
+CHAT_BUFFER_SIZE = int(os.environ.get("CHAT_BUFFER_SIZE", 10000))  # When full, save_chat falls back to a synchronous write
+
+# Chat Search (SQLite FTS5 / PostgreSQL tsvector index kept in step with the chat table)
+CHAT_SEARCH_LANGUAGE = os.environ.get("CHAT_SEARCH_LANGUAGE", "english")  # PostgreSQL text search configuration
+CHAT_SEARCH_CANDIDATES = int(os.environ.get("CHAT_SEARCH_CANDIDATES", 1000))  # Newest matches ranked per query; older ones are not returned
+CHAT_SEARCH_COMMON_TERM_CHATS = int(os.environ.get("CHAT_SEARCH_COMMON_TERM_CHATS", 50000))  # SQLite: queries with a term in more chats list newest first, unranked
+CHAT_SEARCH_PAGE_SIZE = int(os.environ.get("CHAT_SEARCH_PAGE_SIZE", 20))
+MAX_SEARCH_QUERY_LENGTH = int(os.environ.get("MAX_SEARCH_QUERY_LENGTH", 200))
+
+# Async Chat API (ASGI only: uvicorn asgi:application)
+ASYNC_CHAT_API = os.environ.get("ASYNC_CHAT_API", "True").lower() == "true"  # Chat routes on asyncio + aiosqlite/asyncpg instead of the thread pool
 
 # Rate Limiting
-RATE_LIMIT_PER_MINUTE = int(os.environ.get("RATE_LIMIT_PER_MINUTE", 60))
+RATE_LIMIT_PER_MINUTE = int(os.environ.get("RATE_LIMIT_PER_MINUTE", 60))  # Per user (per IP when signed out), across all routes
 RATE_LIMIT_PER_HOUR = int(os.environ.get("RATE_LIMIT_PER_HOUR", 1000))
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "True").lower() == "true"
+RATE_LIMIT_STORAGE_URL = os.environ.get("RATE_LIMIT_STORAGE_URL", "memory://")  # redis://host:6379/0 to share buckets between workers
+AUTH_RATE_LIMIT_PER_MINUTE = int(os.environ.get("AUTH_RATE_LIMIT_PER_MINUTE", 10))  # Login, register and password reset routes
+AUTH_RATE_LIMIT_PER_HOUR = int(os.environ.get("AUTH_RATE_LIMIT_PER_HOUR", 100))
+
+# Chat Response Engine
+CHAT_MATCH_MODE = os.environ.get("CHAT_MATCH_MODE", "auto")  # keyword, retrieval or auto (keyword, then retrieval)
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", 3))
+RETRIEVAL_THRESHOLD = float(os.environ.get("RETRIEVAL_THRESHOLD", 0.1))  # Below this, answer with the help entry
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))  # 0 disables the response cache
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 300))  # Seconds
+RETRIEVAL_INDEX_PATH = os.environ.get("RETRIEVAL_INDEX_PATH", os.path.join(app.instance_path, "knowledge_index.json"))
+KNOWLEDGE_SYNC_SECONDS = float(os.environ.get("KNOWLEDGE_SYNC_SECONDS", 5))  # How stale another worker's admin edits can be, 0 disables the check
+
+# Auth Cache (decoded tokens and user snapshots used by token_required)
+AUTH_CACHE_TTL = int(os.environ.get("AUTH_CACHE_TTL", 60))  # Seconds, 0 disables the cache
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", 10000))
+
+# Analytics Rollups
+ENABLE_ANALYTICS = os.environ.get("ENABLE_ANALYTICS", "True").lower() == "true"  # Hourly/daily rollups updated on every write
+ANALYTICS_MAX_HOURLY_DAYS = int(os.environ.get("ANALYTICS_MAX_HOURLY_DAYS", 31))  # Longest range served at hour granularity
+ANALYTICS_BACKFILL_WINDOW_DAYS = int(os.environ.get("ANALYTICS_BACKFILL_WINDOW_DAYS", 7))  # Days rebuilt per backfill transaction
+ANALYTICS_RETENTION_DAYS = int(os.environ.get("ANALYTICS_RETENTION_DAYS", 90))  # Raw chats and hourly rollups kept this long, 0 = forever
+
+# Retention (background deletion of old chats, OTPs and analytics scratch rows)
+RETENTION_ENABLED = os.environ.get("RETENTION_ENABLED", "True").lower() == "true"
+RETENTION_INTERVAL_SECONDS = int(os.environ.get("RETENTION_INTERVAL_SECONDS", 3600))
+RETENTION_BATCH_SIZE = int(os.environ.get("RETENTION_BATCH_SIZE", 1000))  # Rows deleted per transaction
+RETENTION_BATCH_PAUSE_MS = int(os.environ.get("RETENTION_BATCH_PAUSE_MS", 10))  # Gap between batches for other writers
+RETENTION_MAX_SECONDS = int(os.environ.get("RETENTION_MAX_SECONDS", 60))  # Per pass; the next pass continues
+RETENTION_VACUUM_PAGES = int(os.environ.get("RETENTION_VACUUM_PAGES", 2000))  # Free pages released per vacuum step
+
+# Logging (JSON lines on stdout, written by a background thread)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # json, or text for local development
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))  # Records waiting for the writer; beyond this they are dropped, 0 = write synchronously
+LOG_SAMPLING = os.environ.get("LOG_SAMPLING", "chat_saved=100")  # event=N keeps 1 in N records of a high-volume event
+
+# Statistics (in-memory counters behind /api/health and /api/stats)
+STATS_RECONCILE_SECONDS = int(os.environ.get("STATS_RECONCILE_SECONDS", 300))  # Re-count from the database this often
+
+# Request Metrics (Prometheus text format on /api/metrics)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True").lower() == "true"  # Latency, SQL and response-size histograms per route
+
+# SQL Diagnostics (development aid: slow statements with their plan, repeated statements per request)
+SQL_DIAGNOSTICS = os.environ.get("SQL_DIAGNOSTICS", "False").lower() == "true"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))  # Statements slower than this are logged with EXPLAIN
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 5))  # Same statement shape this often in one request
+
+# Database handle; bound to the app (and the engine created) by create_app()
+db = SQLAlchemy()
+
+# Application log; create_app() starts the pipeline that writes it out
+logger = logging.getLogger('health_ai')
+log_pipeline = LogPipeline(
+    level=LOG_LEVEL,
+    fmt=LOG_FORMAT,
+    sampling=parse_sampling(LOG_SAMPLING),
+    queue_size=LOG_QUEUE_SIZE
+)
+atexit.register(log_pipeline.stop)  # Registered first, so it runs after the services that log on exit
 
-# Initialize database
-db = SQLAlchemy(app)
+password_hasher = PasswordHasher(
+    algorithm=PASSWORD_HASH_ALGORITHM,
+    work_factor=PASSWORD_HASH_WORK_FACTOR,
+    workers=PASSWORD_HASH_WORKERS
+)
+atexit.register(password_hasher.stop)
 
 # ========== DATABASE MODELS ==========
 
@@ -77,17 +213,25 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Denormalized chat counters (maintained by save_chat / clear_chats)
+    chat_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_chat_at = db.Column(db.DateTime)
+    
     # Relationships
     chats = db.relationship('Chat', backref='user', lazy=True, cascade='all, delete-orphan')
     feedbacks = db.relationship('Feedback', backref='user', lazy=True)
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Verify password"""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash predates the current hashing settings"""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def is_admin(self):
         """Check if user is admin"""
@@ -108,7 +252,8 @@ class User(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'chat_count': Chat.query.filter_by(user_id=self.id).count()
+            'chat_count': self.chat_count or 0,
+            'last_chat_at': self.last_chat_at.isoformat() if self.last_chat_at else None
         }
 
 class Chat(db.Model):
@@ -120,6 +265,12 @@ class Chat(db.Model):
     bot_response = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50))  # 'health', 'text_analytics', 'general'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    chat_session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), index=True)
+    
+    # Backs keyset pagination of a user's history on (created_at, id)
+    __table_args__ = (
+        db.Index('ix_chat_user_created_id', 'user_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         """Convert to dictionary for JSON response"""
@@ -129,7 +280,39 @@ class Chat(db.Model):
             'user_message': self.user_message,
             'bot_response': self.bot_response,  # FIXED: Changed from bot_response to self.bot_response
             'category': self.category,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'chat_session_id': self.chat_session_id
+        }
+
+class ChatSession(db.Model):
+    """A user's conversation: chats with no pause longer than CHAT_SESSION_TIMEOUT, kept up to date by chat_sessions"""
+    __tablename__ = 'chat_session'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    client_session_id = db.Column(db.String(100))  # session_id sent with the first chat
+    started_at = db.Column(db.DateTime, nullable=False)
+    ended_at = db.Column(db.DateTime, nullable=False)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    category_counts = db.Column(db.JSON, nullable=False, default=dict)
+    dominant_category = db.Column(db.String(50))
+    
+    # Backs keyset pagination of a user's sessions and the lookup of their latest one
+    __table_args__ = (
+        db.Index('ix_chat_session_user_id_id', 'user_id', 'id'),
+    )
+    
+    def to_dict(self):
+        """Convert to dictionary for JSON response"""
+        return {
+            'id': self.id,
+            'client_session_id': self.client_session_id,
+            'started_at': self.started_at.isoformat(),
+            'ended_at': self.ended_at.isoformat(),
+            'duration_seconds': int((self.ended_at - self.started_at).total_seconds()),
+            'message_count': self.message_count,
+            'category_counts': self.category_counts or {},
+            'dominant_category': self.dominant_category or None,
+            'active': self.ended_at >= datetime.utcnow() - timedelta(minutes=CHAT_SESSION_TIMEOUT)
         }
 
 class OTP(db.Model):
@@ -146,6 +329,11 @@ class OTP(db.Model):
     # Relationship
     user = db.relationship('User', backref='otps', lazy=True)
     
+    # Matches verify_otp exactly, and request_otp's replace through its prefix
+    __table_args__ = (
+        db.Index('ix_otp_email_purpose_used_code', 'email', 'purpose', 'is_used', 'otp_code'),
+    )
+    
     def is_valid(self):
         """Check if OTP is still valid"""
         return datetime.utcnow() < self.expires_at and not self.is_used
@@ -183,6 +371,180 @@ class Feedback(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+# ========== AUTH CACHE ==========
+
+class UserSnapshot:
+    """Lightweight copy of the authenticated user kept in the auth cache"""
+    __slots__ = ('id', 'email', 'name', 'role', 'is_active')
+    
+    def __init__(self, user):
+        self.id = user.id
+        self.email = user.email
+        self.name = user.name
+        self.role = user.role
+        self.is_active = user.is_active
+    
+    def is_admin(self):
+        """Check if user is admin"""
+        return self.role == 'Admin'
+    
+    def is_premium(self):
+        """Check if user is premium"""
+        return self.role == 'Premium User'
+    
+    def load(self):
+        """Fetch the full User row (for handlers that read or modify it)"""
+        return db.session.get(User, self.id)
+
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+def invalidate_user_cache(email):
+    """Forget the cached snapshot so the next request re-reads the user"""
+    user_cache.pop(email)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _queue_user_invalidation(mapper, connection, target):
+    # Role, profile, password and is_active changes all flush through here;
+    # the snapshot is dropped once the transaction commits
+    db.session.info.setdefault('invalidate_users', set()).add(target.email)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_users_after_commit(session):
+    for email in session.info.pop('invalidate_users', ()):
+        invalidate_user_cache(email)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_user_invalidation(session):
+    session.info.pop('invalidate_users', None)
+
+class KnowledgeEntry(db.Model):
+    """Admin-added knowledge base entry"""
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    category = db.Column(db.String(50), default='general')
+    keywords = db.Column(db.Text, default='')  # Comma-separated, matched like the built-in intents
+    response = db.Column(db.Text, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def keyword_list(self):
+        """Keywords as a list of lowercase strings"""
+        return [keyword.strip().lower() for keyword in (self.keywords or '').split(',') if keyword.strip()]
+    
+    def to_dict(self):
+        """Convert to dictionary for JSON response"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'category': self.category,
+            'keywords': self.keyword_list(),
+            'response': self.response,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class AnalyticsRollup(db.Model):
+    """Hourly/daily counter: chats per category, active users, registrations per role, feedback per rating"""
+    __tablename__ = 'analytics_rollup'
+    granularity = db.Column(db.String(10), primary_key=True)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    metric = db.Column(db.String(30), primary_key=True)
+    dimension = db.Column(db.String(50), primary_key=True, default='')
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class AnalyticsActivity(db.Model):
+    """Users already counted as active in a rollup bucket (recent buckets only)"""
+    __tablename__ = 'analytics_activity'
+    granularity = db.Column(db.String(10), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+
+class JobLease(db.Model):
+    """Which process runs a periodic background job (see retention.DatabaseLease)"""
+    __tablename__ = 'job_lease'
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)  # host:pid
+    expires_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+
+rollups = RollupStore(AnalyticsRollup, AnalyticsActivity)
+
+chat_sessions = SessionStore(ChatSession, Chat, timedelta(minutes=CHAT_SESSION_TIMEOUT))
+
+# Full-text index over chats: created along with the chat table, or by `flask init-db` for an existing one
+chat_search = ChatSearch(
+    Chat,
+    language=CHAT_SEARCH_LANGUAGE,
+    candidates=CHAT_SEARCH_CANDIDATES,
+    common_term_chats=CHAT_SEARCH_COMMON_TERM_CHATS
+)
+
+@event.listens_for(Chat.__table__, 'after_create')
+def _create_chat_search_index(target, connection, **kw):
+    chat_search.install(connection)
+
+# ========== STATISTICS ==========
+
+@lru_cache(maxsize=1)
+def sqlite_pragma_values():
+    """Pragmas in effect (fixed for the life of the process, so read once)"""
+    return sqlite_settings(db.engine)
+
+def load_statistics():
+    """Count everything the statistics service tracks straight from the database"""
+    with app.app_context():
+        today = datetime.utcnow().date()
+        today_start = datetime.combine(today, datetime.min.time())
+        
+        roles = dict(db.session.query(User.role, func.count(User.id)).group_by(User.role).all())
+        categories = dict(db.session.query(Chat.category, func.count(Chat.id)).group_by(Chat.category).all())
+        
+        return {
+            'today': today,
+            'users': sum(roles.values()),
+            'roles': roles,
+            'active_today': User.query.filter(User.updated_at >= today_start).count(),
+            'admin_exists': User.query.filter_by(email=ADMIN_EMAIL, role='Admin').first() is not None,
+            'chats': sum(categories.values()),
+            'categories': {str(category): count for category, count in categories.items() if category},
+            'chats_today': Chat.query.filter(Chat.created_at >= today_start).count(),
+            'otps_unused': OTP.query.filter_by(is_used=False).count()
+        }
+
+stats_service = StatisticsService(load_statistics, reconcile_interval=STATS_RECONCILE_SECONDS)
+atexit.register(stats_service.stop)
+
+def record_stats(**deltas):
+    """Queue counter changes for the statistics service; applied when the transaction commits"""
+    db.session.info.setdefault('stats_deltas', []).append(deltas)
+
+def activity_stats(user, now):
+    """Statistics deltas for setting user.updated_at (their last activity) to now"""
+    previous = user.updated_at
+    return {'active_days': {now.date(): 1}} if previous is None or previous.date() < now.date() else {}
+
+def chat_stats(rows):
+    """Statistics deltas for newly saved chat rows (dicts with category and created_at)"""
+    categories, days = {}, {}
+    for row in rows:
+        category = row.get('category')
+        if category:
+            categories[category] = categories.get(category, 0) + 1
+        day = row['created_at'].date()
+        days[day] = days.get(day, 0) + 1
+    return {'chats': len(rows), 'categories': categories, 'days': days}
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_stats_after_commit(session):
+    for deltas in session.info.pop('stats_deltas', ()):
+        stats_service.apply(**deltas)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_stats(session):
+    session.info.pop('stats_deltas', None)
+
 # ========== HELPER FUNCTIONS ==========
 
 def delete_database():
@@ -200,28 +562,47 @@ def delete_database():
         print("ℹ️  Database file not found, will create new one")
         return True
 
+def bearer_token():
+    """JWT from the Authorization header, or None"""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return None
+
+def token_email(token):
+    """Email of a valid token; raises jwt.InvalidTokenError otherwise"""
+    # Decoded tokens are cached until the token or cache entry expires
+    email = token_cache.get(token) if AUTH_CACHE_TTL > 0 else None
+    if email is None:
+        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        email = data['email']
+        if AUTH_CACHE_TTL > 0:
+            # exp is POSIX seconds; naive utcnow().timestamp() would be read as local time
+            token_cache.set(token, email, ttl=data['exp'] - time.time())
+    return email
+
 def token_required(f):
     """Decorator to require valid JWT token"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Get token from header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
+        token = bearer_token()
         
         if not token:
             return jsonify({'error': 'Token is missing'}), 401
         
         try:
-            # Decode token
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.filter_by(email=data['email']).first()
+            email = token_email(token)
             
-            if not current_user:
-                return jsonify({'error': 'User not found'}), 401
+            current_user = user_cache.get(email) if AUTH_CACHE_TTL > 0 else None
+            if current_user is None:
+                user = User.query.filter_by(email=email).first()
+                
+                if not user:
+                    return jsonify({'error': 'User not found'}), 401
+                
+                current_user = UserSnapshot(user)
+                if AUTH_CACHE_TTL > 0:
+                    user_cache.set(email, current_user)
             
             if not current_user.is_active:
                 return jsonify({'error': 'User account is deactivated'}), 401
@@ -245,44 +626,47 @@ def admin_required(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
+# Background email delivery (workers start on the first queued message)
+email_dispatcher = EmailDispatcher(
+    EMAIL_HOST,
+    EMAIL_PORT,
+    user=EMAIL_USER,
+    password=EMAIL_PASSWORD,
+    use_tls=EMAIL_USE_TLS,
+    workers=EMAIL_WORKERS,
+    queue_size=EMAIL_QUEUE_SIZE,
+    batch_size=EMAIL_BATCH_SIZE,
+    max_retries=EMAIL_MAX_RETRIES
+)
+atexit.register(email_dispatcher.stop)
+
 def send_email(to_email, subject, body):
-    """Send email using SMTP"""
+    """Queue email for background SMTP delivery"""
     try:
         # If no email credentials, simulate sending
         if not EMAIL_USER or not EMAIL_PASSWORD:
-            print(f"📧 [SIMULATED] Email to {to_email}: {subject}")
-            print(f"Body preview: {body[:100]}...")
+            logger.info("📧 [SIMULATED] Email to %s: %s", to_email, subject, extra={'event': 'email_simulated'})
             return True
         
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_USER
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        # Add HTML body
-        msg.attach(MIMEText(body, 'html'))
-        
-        # Connect to SMTP server
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        
-        # Send email
-        server.send_message(msg)
-        server.quit()
+        # Returns as soon as the message is queued
+        if not email_dispatcher.enqueue(to_email, subject, body):
+            logger.error("❌ Email queue full, dropped email to %s", to_email, extra={'event': 'email_dropped'})
+            return False
         
-        print(f"✅ Email sent to {to_email}")
+        logger.info("📨 Email queued for %s", to_email, extra={'event': 'email_queued'})
         return True
         
-    except Exception as e:
-        print(f"❌ Email sending error: {str(e)}")
+    except Exception:
+        logger.exception("❌ Email sending error")
         return False
 
 def generate_otp():
     """Generate 6-digit OTP"""
     return str(random.randint(100000, 999999))
 
+# OTP_STORE=memory keeps codes in this process instead of the otp table
+otp_store = MemoryOTPStore(ttl=OTP_EXPIRY_MINUTES * 60) if OTP_STORE == 'memory' else None
+
 def create_reset_token(email):
     """Create JWT reset token"""
     payload = {
@@ -300,102 +684,842 @@ def create_auth_token(email):
     }
     return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
 
-# ========== DATABASE INITIALIZATION ==========
+def count_chat_rows(session, rows):
+    """Bump the per-user counters and analytics rollups for chats about to be inserted in this
+    transaction, and set each row's chat_session_id"""
+    counters = {}
+    for row in rows:
+        count, last = counters.get(row['user_id'], (0, row['created_at']))
+        counters[row['user_id']] = (count + 1, max(last, row['created_at']))
+    
+    if ENABLE_ANALYTICS:
+        rollups.record_chats(session, rows)
+    users = User.__table__
+    session.execute(
+        update(users)
+        .where(users.c.id == bindparam('target_id'))
+        .values(
+            chat_count=users.c.chat_count + bindparam('added'),
+            last_chat_at=bindparam('last'),
+            updated_at=users.c.updated_at
+        ),
+        [{'target_id': user_id, 'added': count, 'last': last}
+         for user_id, (count, last) in counters.items()]
+    )
+    # After the user UPDATE, which holds other writers for these users until commit
+    chat_sessions.assign(session, rows)
 
-def init_database():
-    """Initialize database and create default data - RUNS ONLY ONCE"""
+def flush_chat_rows(rows):
+    """Write buffered chats with one multi-row INSERT and bump the counters"""
     with app.app_context():
         try:
-            # Check if database already exists and has tables
-            table_exists = False
-            try:
-                # Try to query a user to check if tables exist
-                User.query.first()
-                table_exists = True
-                print("✅ Database tables already exist")
-            except:
-                table_exists = False
+            count_chat_rows(db.session, rows)
+            db.session.execute(insert(Chat), rows)
+            record_stats(**chat_stats(rows))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+chat_buffer = ChatWriteBuffer(
+    flush_chat_rows,
+    interval=CHAT_FLUSH_INTERVAL_MS / 1000.0,
+    max_rows=CHAT_FLUSH_ROWS,
+    max_pending=CHAT_BUFFER_SIZE
+)
+atexit.register(chat_buffer.stop)
+
+def pending_chat_dict(row):
+    """Buffered (not yet committed) chat in the shape of Chat.to_dict()"""
+    return {
+        'id': None,
+        'session_id': row['session_id'],
+        'user_message': row['user_message'],
+        'bot_response': row['bot_response'],
+        'category': row['category'],
+        'created_at': row['created_at'].isoformat(),
+        'chat_session_id': None,
+        'pending': True
+    }
+
+def encode_cursor(chat):
+    """Opaque pagination cursor for a chat row"""
+    raw = f"{chat.created_at.isoformat()}|{chat.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Turn a cursor back into (created_at, id); raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, chat_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(chat_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def parse_history_args(args):
+    """(limit, cursor, stream) from the history query args; ValueError carries the client message"""
+    before, after = args.get('before'), args.get('after')
+    stream = args.get('format') == 'ndjson'
+    
+    if before and after:
+        raise ValueError('Use either before or after, not both')
+    
+    try:
+        limit = int(args['limit']) if 'limit' in args else (None if stream else MAX_CHAT_HISTORY)
+        cursor = decode_cursor(before or after) if (before or after) else None
+    except ValueError:
+        raise ValueError('Invalid limit or cursor')
+    
+    if limit is not None:
+        limit = max(1, limit if stream else min(limit, MAX_CHAT_HISTORY))
+    return limit, cursor, stream
+
+def chat_history_query(user_id, args, cursor):
+    """Chats of one user, newest first - or oldest first when walking forward from ?after="""
+    query = select(Chat).where(Chat.user_id == user_id)
+    if args.get('session_id'):
+        query = query.where(Chat.session_id == args['session_id'])
+    
+    if cursor and args.get('before'):
+        # Older than the cursor
+        return query.where(or_(
+            Chat.created_at < cursor[0],
+            and_(Chat.created_at == cursor[0], Chat.id < cursor[1])
+        )).order_by(Chat.created_at.desc(), Chat.id.desc())
+    if cursor:
+        # Newer than the cursor - walk forward, then flip to newest-first
+        return query.where(or_(
+            Chat.created_at > cursor[0],
+            and_(Chat.created_at == cursor[0], Chat.id > cursor[1])
+        )).order_by(Chat.created_at.asc(), Chat.id.asc())
+    return query.order_by(Chat.created_at.desc(), Chat.id.desc())
+
+def chat_history_page(chats, limit, args, cursor, pending_list=()):
+    """Response body for one page, from up to limit + 1 rows of chat_history_query"""
+    has_more = len(chats) > limit
+    chats = chats[:limit]
+    if cursor and args.get('after'):
+        chats.reverse()
+    
+    # Buffered chats lead the page but never count against the limit or move the cursors
+    pending_list = list(pending_list)
+    chats_list = pending_list + [chat.to_dict() for chat in chats]
+    
+    return {
+        'success': True,
+        'chats': chats_list,
+        'count': len(chats_list),
+        'max_history': MAX_CHAT_HISTORY,
+        'pending': len(pending_list),
+        'has_more': has_more,
+        'next_cursor': encode_cursor(chats[-1]) if chats else None,  # Pass as ?before= for older chats
+        'prev_cursor': encode_cursor(chats[0]) if chats else None    # Pass as ?after= for newer chats
+    }
+
+def chat_history_response(user_id):
+    """Keyset-paginated or NDJSON-streamed chat history for one user.
+    
+    Query args: limit, before / after (cursors), session_id, format=ndjson.
+    """
+    args = request.args
+    try:
+        limit, cursor, stream = parse_history_args(args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = chat_history_query(user_id, args, cursor)
+    
+    # Read-your-writes in write-behind mode: chats still in the buffer are newer
+    # than anything committed, so pages reaching the head of the history merge them
+    merge_pending = CHAT_WRITE_MODE == 'write_behind' and not args.get('before')
+    
+    def read(statement, fetch):
+        if merge_pending:
+            return chat_buffer.read_consistent(lambda: fetch(db.session.execute(statement).scalars()), user_id)
+        return fetch(db.session.execute(statement).scalars()), []
+    
+    def pending_dicts(rows):
+        # Oldest first, like an ?after= walk
+        if args.get('session_id'):
+            rows = [row for row in rows if row['session_id'] == args['session_id']]
+        if cursor:
+            rows = [row for row in rows if row['created_at'] > cursor[0]]
+        return [pending_chat_dict(row) for row in rows]
+    
+    if stream:
+        if limit is not None:
+            query = query.limit(limit)
+        
+        # Rows come off a server-side cursor in chunks and are never held as a list
+        def generate():
+            # The statement's snapshot is taken when it starts executing, so there is no need to fetch it all
+            rows, pending = read(query.execution_options(yield_per=500, stream_results=True), lambda rows: rows)
+            pending = pending_dicts(pending)
+            if not cursor:
+                for chat in reversed(pending):
+                    yield json.dumps(chat) + '\n'
+            for chat in rows:
+                yield json.dumps(chat.to_dict()) + '\n'
+            if cursor:
+                for chat in pending:
+                    yield json.dumps(chat) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    chats, pending = read(query.limit(limit + 1), lambda rows: rows.all())
+    return jsonify(chat_history_page(chats, limit, args, cursor, reversed(pending_dicts(pending))))
+
+def search_chats(args, user_id=None):
+    """Response body for one page of ranked search results - one user's chats, or everyone's.
+    
+    Query args: q, limit, offset. ValueError carries the client message. Chats still
+    in the write-behind buffer become searchable once flushed.
+    """
+    query = args.get('q', '').strip()
+    if not query:
+        raise ValueError('Search query (q) is required')
+    if len(query) > MAX_SEARCH_QUERY_LENGTH:
+        raise ValueError(f'Search query is limited to {MAX_SEARCH_QUERY_LENGTH} characters')
+    
+    try:
+        limit = max(1, min(int(args.get('limit', CHAT_SEARCH_PAGE_SIZE)), MAX_CHAT_HISTORY))
+        offset = max(0, int(args.get('offset', 0)))
+    except ValueError:
+        raise ValueError('Invalid limit or offset')
+    
+    page = chat_search.search(db.session, query, user_id=user_id, limit=limit, offset=offset)
+    if page is None:
+        raise ValueError('Search query must contain at least one word')
+    
+    results, has_more, order = page
+    return {
+        'success': True,
+        'query': query,
+        'order': order,  # relevance, or recency for terms too common to rank
+        'results': results,
+        'count': len(results),
+        'offset': offset,
+        'has_more': has_more,
+        'next_offset': offset + len(results) if has_more else None  # Pass as ?offset= for the next page
+    }
+
+# ========== CHAT RESPONSE ENGINE ==========
+
+# Knowledge base is compiled once at startup (create_app) and again whenever admin entries change
+intent_engine = IntentEngine(KNOWLEDGE_BASE, INTENTS, TOPICS, FALLBACK_RESPONSE)
+retrieval_index = RetrievalIndex()
+
+# (count, max id, max created_at) of the entries compiled above, and when another process's edits were last looked for
+knowledge_version = None
+knowledge_checked_at = 0.0
+
+# Serialized /api/chat/respond bodies keyed on mode + normalized message
+response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+def knowledge_documents(entries):
+    """Retrieval documents for the built-in answers plus admin entries"""
+    documents = {}
+    for intent in INTENTS:
+        key = 'kb:' + '.'.join(intent['answer'])
+        if key in documents:
+            continue
+        text = intent_engine._resolve(intent['answer'])
+        terms = ' '.join(intent['keywords'] + intent.get('phrases', []))
+        documents[key] = (f"{terms}\n{text}", {
+            'intent': intent['name'],
+            'category': intent['category'],
+            'response': text
+        })
+    
+    for entry in entries:
+        documents[f'entry:{entry.id}'] = (f"{entry.title} {' '.join(entry.keyword_list())}\n{entry.response}", {
+            'intent': f'custom.{entry.id}',
+            'category': entry.category or 'general',
+            'response': entry.response
+        })
+    return documents
+
+def refresh_knowledge_base():
+    """Recompile the keyword engine and resync the retrieval index with the DB"""
+    global intent_engine, retrieval_index, knowledge_version, knowledge_checked_at
+    
+    entries = KnowledgeEntry.query.order_by(KnowledgeEntry.id).all()
+    knowledge_version = (
+        len(entries),
+        max((entry.id for entry in entries), default=None),
+        max((entry.created_at for entry in entries if entry.created_at), default=None)
+    )
+    knowledge_checked_at = time.monotonic()
+    intents = INTENTS + [
+        {
+            'name': f'custom.{entry.id}',
+            'category': entry.category or 'general',
+            'keywords': entry.keyword_list(),
+            'answer': entry.response
+        }
+        for entry in entries if entry.keyword_list()
+    ]
+    intent_engine = IntentEngine(KNOWLEDGE_BASE, intents, TOPICS, FALLBACK_RESPONSE)
+    
+    # Only new or edited entries are re-tokenized; the live index is swapped, not mutated
+    index = retrieval_index.copy()
+    changed = index.sync(knowledge_documents(entries))
+    retrieval_index = index
+    
+    # Cached answers may come from entries that just changed
+    response_cache.clear()
+    if changed:
+        try:
+            retrieval_index.save(RETRIEVAL_INDEX_PATH)
+        except OSError as e:
+            logger.warning("⚠️ Could not persist retrieval index: %s", e)
+    return changed
+
+def knowledge_sync_due():
+    """Whether it is time to look for entries another worker added or deleted"""
+    return KNOWLEDGE_SYNC_SECONDS > 0 and time.monotonic() - knowledge_checked_at >= KNOWLEDGE_SYNC_SECONDS
+
+def sync_knowledge_base():
+    """Recompile when the entries in the DB differ from the ones this process compiled.
+    
+    Admin routes refresh only the worker that served them; the others notice
+    through this check. max(created_at) is part of the version because SQLite
+    hands a deleted max(id) to the next insert.
+    """
+    global knowledge_checked_at
+    
+    # Claimed up front so concurrent requests don't all run the check
+    knowledge_checked_at = time.monotonic()
+    with app.app_context():
+        try:
+            current = tuple(db.session.execute(select(
+                func.count(KnowledgeEntry.id), func.max(KnowledgeEntry.id), func.max(KnowledgeEntry.created_at)
+            )).one())
+            if current == knowledge_version:
+                return False
+            refresh_knowledge_base()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning("⚠️ Knowledge base version check failed: %s", e.__class__.__name__)
+            return False
+    logger.info("📚 Knowledge base reloaded after changes in another process", extra={'event': 'knowledge_sync'})
+    return True
+
+def respond_to_message(message, mode=CHAT_MATCH_MODE):
+    """Answer a user message with keyword matching, retrieval, or both"""
+    if mode != 'retrieval':
+        result = intent_engine.match(message)
+        if result['intent'] != 'fallback' or mode == 'keyword':
+            result['confidence'] = 0.0 if result['intent'] == 'fallback' else 1.0
+            return result
+    
+    matches = [
+        {
+            'intent': meta['intent'],
+            'category': meta['category'],
+            'confidence': round(score, 4),
+            'response': meta['response']
+        }
+        for score, key, meta in retrieval_index.search(message, RETRIEVAL_TOP_K)
+    ]
+    
+    if matches and matches[0]['confidence'] >= RETRIEVAL_THRESHOLD:
+        best = matches[0]
+        result = {'intent': best['intent'], 'category': best['category'], 'response': best['response']}
+    else:
+        # Not confident enough - point the user at what we can answer
+        result = {'intent': 'help', 'category': 'general', 'response': KNOWLEDGE_BASE['help']}
+    
+    result['confidence'] = matches[0]['confidence'] if matches else 0.0
+    result['matches'] = matches
+    return result
+
+def chat_response_body(data):
+    """(JSON body, status) for /api/chat/respond; hot queries are served from the response cache"""
+    message = data.get('message')
+    if not isinstance(message, str) or not message.strip():
+        return app.json.dumps({'error': 'Message is required'}).encode(), 400
+    
+    mode = data.get('mode', CHAT_MATCH_MODE)
+    if mode not in ('keyword', 'retrieval', 'auto'):
+        return app.json.dumps({'error': 'Invalid mode. Must be one of: keyword, retrieval, auto'}).encode(), 400
+    
+    # Hot queries skip matching and serialization entirely. The key is exactly what both matchers
+    # see: keyword rules are substrings of the lowercased text, so word order, stop words and
+    # punctuation can all change the answer ('hi' in 'this', 'text analytics' vs 'analytics text')
+    normalized = message.lower().strip()
+    cache_key = f"{mode}:{normalized}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached, 200
+    
+    payload = {'success': True}
+    payload.update(respond_to_message(message, mode))
+    body = app.json.dumps(payload).encode()
+    response_cache.set(cache_key, body)
+    return body, 200
+
+# ========== DATABASE INITIALIZATION ==========
+
+def seed_default_users():
+    """Create the admin and demo users if they do not exist yet (part of init_db)"""
+    created = 0
+    try:
+        # ========== CREATE ADMIN USER ==========
+        # Check if admin user already exists
+        admin_user = User.query.filter_by(email=ADMIN_EMAIL).first()
+        if not admin_user:
+            admin_user = User(
+                email=ADMIN_EMAIL,
+                name=ADMIN_NAME,
+                role='Admin',  # Only Admin role
+                avatar='A',
+                is_active=True
+            )
+            admin_user.set_password(ADMIN_PASSWORD)
+            db.session.add(admin_user)
+            created += 1
+            print(f"✅ Admin user created: {ADMIN_EMAIL} / {ADMIN_PASSWORD}")
+            print(f"   Role: Admin (Only this user has admin access)")
+        else:
+            print(f"✅ Admin user already exists: {ADMIN_EMAIL}")
+        
+        # ========== CREATE DEMO USER ==========
+        # Check if demo user already exists
+        demo_user = User.query.filter_by(email="demo@example.com").first()
+        if not demo_user:
+            demo_user = User(
+                email="demo@example.com",
+                name="Demo User",
+                role='Regular User',  # Always Regular User
+                avatar='D',
+                is_active=True
+            )
+            demo_user.set_password("demo123")
+            db.session.add(demo_user)
+            created += 1
+            print("✅ Demo user created: demo@example.com / demo123")
+            print(f"   Role: Regular User (No admin access)")
+        else:
+            print("✅ Demo user already exists: demo@example.com")
+        
+        # Only commit if we made changes
+        if created:
+            db.session.commit()
+        
+        # Verify setup
+        admin_count = User.query.filter_by(role='Admin').count()
+        regular_count = User.query.filter_by(role='Regular User').count()
+        
+        print(f"\n📊 Verification:")
+        print(f"   ✅ Admins: {admin_count} (Only: {ADMIN_EMAIL})")
+        print(f"   ✅ Regular Users: {regular_count}")
+        print(f"\n🔐 Admin Panel Access:")
+        print(f"   ✅ ONLY {ADMIN_EMAIL} can access admin routes")
+        print(f"   ❌ All other users: Regular User role only")
+        
+    except Exception as e:
+        print(f"❌ Database initialization failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        db.session.rollback()
+        raise
+
+def upgrade_schema():
+    """Add tables, columns and indexes introduced after the database was first created"""
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    added = []
+    
+    # New tables are created outright
+    db.create_all()
+    
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
             
-            if not table_exists:
-                # Create all tables
-                db.create_all()
-                print("✅ Database tables created successfully")
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                
+                ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN " \
+                      f"{preparer.format_column(column)} {column.type.compile(dialect=db.engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.exec_driver_sql(ddl)
+                added.append(f"{table.name}.{column.name}")
+    
+    # Indexes added to models after their tables existed
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspect(db.engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                print(f"🔧 Schema upgraded, created index: {index.name}")
+    
+    # Search index for a chat table from before search existed; filling it reads every chat once
+    with db.engine.begin() as conn:
+        if chat_search.install(conn):
+            print("🔧 Schema upgraded, built the chat search index")
+    
+    if added:
+        print(f"🔧 Schema upgraded, added columns: {', '.join(added)}")
+    return added
+
+def reconcile_chat_counters():
+    """Rebuild the denormalized per-user chat counters in one bulk UPDATE"""
+    chat_count = select(func.count(Chat.id))\
+        .where(Chat.user_id == User.id)\
+        .scalar_subquery()
+    last_chat_at = select(func.max(Chat.created_at))\
+        .where(Chat.user_id == User.id)\
+        .scalar_subquery()
+    
+    # Keep updated_at untouched - it doubles as the last login timestamp
+    result = db.session.execute(
+        update(User).values(
+            chat_count=chat_count,
+            last_chat_at=last_chat_at,
+            updated_at=User.updated_at
+        ),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return result.rowcount
+
+def backfill_analytics(days=None):
+    """Rebuild analytics rollups from existing rows (everything, or the last `days` days)"""
+    start = datetime.utcnow() - timedelta(days=days) if days else None
+    
+    # Days the retention job has emptied would be rebuilt as zero; keep their rollups
+    if RETENTION_ENABLED and ANALYTICS_RETENTION_DAYS > 0:
+        horizon = bucket_start(datetime.utcnow() - timedelta(days=ANALYTICS_RETENTION_DAYS), 'day') + timedelta(days=1)
+        start = max(start or horizon, horizon)
+    
+    written = rollups.backfill(
+        db.session, Chat, User, Feedback,
+        start=start,
+        window_days=ANALYTICS_BACKFILL_WINDOW_DAYS,
+        marks_since=datetime.utcnow() - timedelta(days=1)
+    )
+    print(f"📈 Analytics backfilled: {written} rollup rows")
+    return written
+
+def backfill_chat_sessions():
+    """Group chats saved before sessions existed into sessions, one user per transaction"""
+    user_ids = db.session.execute(
+        select(Chat.user_id).where(Chat.chat_session_id.is_(None)).distinct()
+    ).scalars().all()
+    opened = 0
+    for user_id in user_ids:
+        try:
+            # The counter row is the per-user lock save_chat takes, so new chats wait for the backfill
+            db.session.execute(update(User).where(User.id == user_id).values(updated_at=User.updated_at))
+            opened += chat_sessions.backfill(db.session, user_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    print(f"💬 Chat sessions backfilled: {opened} sessions for {len(user_ids)} users")
+    return opened
+
+def init_db():
+    """Create or upgrade the schema and seed the default users (`flask init-db`, once per deployment)"""
+    inspector = inspect(db.engine)
+    if not inspector.has_table('user'):
+        print("🔧 Initializing database for the first time...")
+        db.create_all()
+        print("✅ Database tables created successfully")
+    else:
+        print("✅ Database already initialized")
+        rollups_missing = not inspector.has_table(AnalyticsRollup.__tablename__)
+        sessions_missing = not inspector.has_table(ChatSession.__tablename__)
+        # Backfill counters for columns added to an existing database
+        if 'user.chat_count' in upgrade_schema():
+            reconcile_chat_counters()
+        # ...and analytics for a rollup table that did not exist yet
+        if rollups_missing and ENABLE_ANALYTICS:
+            backfill_analytics()
+        # ...and sessions for the chats saved before them
+        if sessions_missing:
+            backfill_chat_sessions()
+    
+    seed_default_users()
+    refresh_knowledge_base()
+
+# ========== RETENTION ==========
+
+def prune_chats(batch_size):
+    """Delete chats older than ANALYTICS_RETENTION_DAYS or beyond each user's newest MAX_CHAT_HISTORY"""
+    cutoff = datetime.utcnow() - timedelta(days=ANALYTICS_RETENTION_DAYS) if ANALYTICS_RETENTION_DAYS > 0 else None
+    
+    # Candidates come from the denormalized counter and the (user_id, created_at) index
+    over_limit = [User.chat_count > MAX_CHAT_HISTORY]
+    if cutoff:
+        oldest_chat = select(func.min(Chat.created_at)).where(Chat.user_id == User.id).scalar_subquery()
+        over_limit.append(oldest_chat < cutoff)
+    user_ids = db.session.execute(select(User.id).where(or_(*over_limit)).order_by(User.id)).scalars().all()
+    db.session.commit()
+    
+    for user_id in user_ids:
+        # Newest chat past the cap, in history (created_at, id) order
+        boundary = db.session.execute(
+            select(Chat.created_at, Chat.id)
+            .where(Chat.user_id == user_id)
+            .order_by(Chat.created_at.desc(), Chat.id.desc())
+            .offset(MAX_CHAT_HISTORY).limit(1)
+        ).first()
+        
+        expired = [Chat.created_at < cutoff] if cutoff else []
+        if boundary:
+            expired.append(or_(Chat.created_at < boundary.created_at,
+                               and_(Chat.created_at == boundary.created_at, Chat.id <= boundary.id)))
+        if not expired:
+            continue
+        
+        while True:
+            rows = db.session.execute(
+                select(Chat.id, Chat.category, Chat.created_at, Chat.chat_session_id)
+                .where(Chat.user_id == user_id, or_(*expired))
+                .order_by(Chat.created_at, Chat.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
             
-            # ========== CREATE ADMIN USER ==========
-            # Check if admin user already exists
-            admin_user = User.query.filter_by(email=ADMIN_EMAIL).first()
-            if not admin_user:
-                admin_user = User(
-                    email=ADMIN_EMAIL,
-                    name=ADMIN_NAME,
-                    role='Admin',  # Only Admin role
-                    avatar='A',
-                    is_active=True
+            try:
+                # Count what the DELETE removed, not what was selected: rows another pass got to first are gone
+                deleted = db.session.execute(
+                    delete(Chat)
+                    .where(Chat.id.in_([row.id for row in rows]))
+                    .returning(Chat.id, Chat.category, Chat.created_at, Chat.chat_session_id)
+                ).mappings().all()
+                removed = len(deleted)
+                db.session.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(
+                        chat_count=case((User.chat_count > removed, User.chat_count - removed), else_=0),
+                        last_chat_at=case((User.chat_count > removed, User.last_chat_at), else_=None),
+                        updated_at=User.updated_at
+                    )
                 )
-                admin_user.set_password(ADMIN_PASSWORD)
-                db.session.add(admin_user)
-                print(f"✅ Admin user created: {ADMIN_EMAIL} / {ADMIN_PASSWORD}")
-                print(f"   Role: Admin (Only this user has admin access)")
-            else:
-                print(f"✅ Admin user already exists: {ADMIN_EMAIL}")
-            
-            # ========== CREATE DEMO USER ==========
-            # Check if demo user already exists
-            demo_user = User.query.filter_by(email="demo@example.com").first()
-            if not demo_user:
-                demo_user = User(
-                    email="demo@example.com",
-                    name="Demo User",
-                    role='Regular User',  # Always Regular User
-                    avatar='D',
-                    is_active=True
+                chat_sessions.remove(db.session, deleted)
+                deltas = chat_stats(deleted)
+                record_stats(
+                    chats=-deltas['chats'],
+                    categories={category: -count for category, count in deltas['categories'].items()},
+                    days={day: -count for day, count in deltas['days'].items()}
                 )
-                demo_user.set_password("demo123")
-                db.session.add(demo_user)
-                print("✅ Demo user created: demo@example.com / demo123")
-                print(f"   Role: Regular User (No admin access)")
-            else:
-                print("✅ Demo user already exists: demo@example.com")
-            
-            # Only commit if we made changes
-            if not admin_user or not demo_user:
                 db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
             
-            # Verify setup
-            admin_count = User.query.filter_by(role='Admin').count()
-            regular_count = User.query.filter_by(role='Regular User').count()
-            
-            print(f"\n📊 Verification:")
-            print(f"   ✅ Admins: {admin_count} (Only: {ADMIN_EMAIL})")
-            print(f"   ✅ Regular Users: {regular_count}")
-            print(f"\n🔐 Admin Panel Access:")
-            print(f"   ✅ ONLY {ADMIN_EMAIL} can access admin routes")
-            print(f"   ❌ All other users: Regular User role only")
-            
-        except Exception as e:
-            print(f"❌ Database initialization failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            yield removed
+            if len(rows) < batch_size:
+                break
+
+def prune_otps(batch_size):
+    """Delete OTPs that were used or have expired"""
+    # No index on purpose: the table only holds the last pass's worth of live codes,
+    # and every extra index makes each deleted row more expensive
+    while True:
+        expired = or_(OTP.is_used.is_(True), OTP.expires_at < datetime.utcnow())
+        rows = db.session.execute(
+            select(OTP.id, OTP.is_used).where(expired).order_by(OTP.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        
+        try:
+            deleted = db.session.execute(
+                delete(OTP).where(OTP.id.in_([row.id for row in rows]), expired).returning(OTP.is_used)
+            ).scalars().all()
+            record_stats(otps_unused=-sum(1 for is_used in deleted if not is_used))
+            db.session.commit()
+        except Exception:
             db.session.rollback()
+            raise
+        yield len(deleted)
 
-# Initialize database on startup - but only if not already initialized
-with app.app_context():
-    try:
-        # Check if we've already initialized by checking if users table exists
-        from sqlalchemy import inspect
-        inspector = inspect(db.engine)
-        tables_exist = inspector.has_table('user')
-        
-        if not tables_exist:
-            print("🔧 Initializing database for the first time...")
-            init_database()
-        else:
-            print("✅ Database already initialized")
-    except Exception as e:
-        print(f"⚠️ Could not check database status: {e}")
-        # Create tables if they don't exist
-        db.create_all()
-        init_database()
+def prune_analytics(batch_size):
+    """Delete activity marks of closed buckets and hourly rollups past retention"""
+    now = datetime.utcnow()
+    return rollups.prune(
+        db.session,
+        marks_before=bucket_start(now, 'day') - timedelta(days=1),  # Yesterday's marks may still see late writes
+        hourly_before=now - timedelta(days=ANALYTICS_RETENTION_DAYS) if ANALYTICS_RETENTION_DAYS > 0 else None,
+        batch_size=batch_size
+    )
+
+def compact_database(rows_deleted):
+    """Hand freed pages back and refresh planner statistics (SQLite)"""
+    return sqlite_maintenance(db.engine, vacuum_pages=RETENTION_VACUUM_PAGES, pause=RETENTION_BATCH_PAUSE_MS / 1000.0)
+
+retention_worker = RetentionWorker(
+    [('chats', prune_chats), ('otps', prune_otps), ('analytics', prune_analytics)],
+    maintenance=compact_database,
+    context=app.app_context,
+    interval=RETENTION_INTERVAL_SECONDS,
+    batch_size=RETENTION_BATCH_SIZE,
+    pause=RETENTION_BATCH_PAUSE_MS / 1000.0,
+    max_seconds=RETENTION_MAX_SECONDS,
+    # Every worker process schedules passes; the lease row lets one run per interval
+    lease=DatabaseLease(
+        JobLease, 'retention', lambda: db.session,
+        hold=RETENTION_MAX_SECONDS + 600 if RETENTION_MAX_SECONDS > 0 else 86400,
+        min_gap=RETENTION_INTERVAL_SECONDS * 0.9
+    )
+)
+atexit.register(retention_worker.stop)
+
+# ========== REQUEST IDS ==========
+
+# First hook to run, so every log record of a request carries its id
+@app.before_request
+def assign_request_id():
+    g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+
+@app.after_request
+def echo_request_id(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+# ========== METRICS ==========
+
+# Registered ahead of rate limiting so throttled (429) requests are measured too
+metrics = MetricsRegistry()
+request_duration = metrics.histogram(
+    'http_request_duration_seconds', 'Time to produce a response', ('method', 'route', 'status'))
+request_queries = metrics.histogram(
+    'http_request_sql_queries', 'SQL statements executed per request', ('method', 'route'),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+request_query_seconds = metrics.histogram(
+    'http_request_sql_duration_seconds', 'Time spent in SQL statements per request', ('method', 'route'))
+response_size = metrics.histogram(
+    'http_response_size_bytes', 'Response body size (streamed responses are not counted)', ('method', 'route'),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576))
+query_counter = QueryCounter()  # Hooked to the engines by create_app() / create_asgi_app()
+
+def observe_request(method, route, status, started, queries, size):
+    """Record one finished request; `queries` is QueryCounter's [statements, seconds]"""
+    request_duration.observe(time.perf_counter() - started, (method, route, str(status)))
+    request_queries.observe(queries[0], (method, route))
+    request_query_seconds.observe(queries[1], (method, route))
+    if size is not None:
+        response_size.observe(size, (method, route))
+
+@app.before_request
+def start_request_metrics():
+    if METRICS_ENABLED:
+        g.metrics_started = time.perf_counter()
+        query_counter.begin()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    
+    # The URL rule, not the path, so /api/admin/user/<email> is one series
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    observe_request(request.method, route, response.status_code, started, query_counter.end(),
+                    response.content_length)
+    return response
+
+# ========== SQL DIAGNOSTICS ==========
+
+def report_query_diagnostic(message):
+    """Slow and repeated statements go through the log pipeline like every other warning"""
+    logger.warning(message, extra={'event': 'sql_diagnostics'})
+
+# Off by default: hooks every statement and EXPLAINs the slow ones
+query_diagnostics = QueryDiagnostics(slow_ms=SLOW_QUERY_MS, repeat_threshold=N_PLUS_ONE_THRESHOLD,
+                                     report=report_query_diagnostic)
+
+@app.before_request
+def start_query_diagnostics():
+    if SQL_DIAGNOSTICS:
+        query_diagnostics.begin(f"{request.method} {request.url_rule.rule if request.url_rule else request.path}")
+
+@app.after_request
+def finish_query_diagnostics(response):
+    if SQL_DIAGNOSTICS:
+        query_diagnostics.end()
+    return response
+
+# ========== RATE LIMITING ==========
+
+rate_limiter = RateLimiter(
+    backend_from_url(RATE_LIMIT_STORAGE_URL),
+    per_minute=RATE_LIMIT_PER_MINUTE,
+    per_hour=RATE_LIMIT_PER_HOUR
+)
+
+# Stricter (per minute, per hour) limits for routes that hash passwords or send email
+RATE_LIMIT_ROUTES = {
+    'register': (AUTH_RATE_LIMIT_PER_MINUTE, AUTH_RATE_LIMIT_PER_HOUR),
+    'login': (AUTH_RATE_LIMIT_PER_MINUTE, AUTH_RATE_LIMIT_PER_HOUR),
+    'request_otp': (AUTH_RATE_LIMIT_PER_MINUTE, AUTH_RATE_LIMIT_PER_HOUR),
+    'verify_otp': (AUTH_RATE_LIMIT_PER_MINUTE, AUTH_RATE_LIMIT_PER_HOUR),
+    'reset_password': (AUTH_RATE_LIMIT_PER_MINUTE, AUTH_RATE_LIMIT_PER_HOUR)
+}
+RATE_LIMIT_EXEMPT = {'home', 'health_check', 'health_live', 'get_metrics', 'static'}
+
+def rate_limit_keys(endpoint, remote_addr, token, get_json):
+    """(key, per minute, per hour) buckets a request spends from: its IP's and its user's across all
+    routes at the global limits, plus per-route and per-account buckets for the auth routes"""
+    caller = f"ip:{remote_addr}"
+    # None falls back to RATE_LIMIT_PER_MINUTE / RATE_LIMIT_PER_HOUR; many tokens from one address still share its bucket
+    buckets = [(caller, None, None)]
+    if token:
+        try:
+            caller = f"user:{token_email(token)}"
+            buckets.append((caller, None, None))
+        except (jwt.InvalidTokenError, KeyError):
+            pass
+    
+    if endpoint in RATE_LIMIT_ROUTES:
+        per_minute, per_hour = RATE_LIMIT_ROUTES[endpoint]
+        buckets.append((f"{endpoint}:{caller}", per_minute, per_hour))
+        
+        # Keyed on the sender too: the email in the body is anyone's to type, and a bucket
+        # for the account alone would let a stranger lock its owner out
+        data = get_json()
+        email = data.get('email') if isinstance(data, dict) else None
+        if isinstance(email, str) and email:
+            buckets.append((f"{endpoint}:account:{email.strip().lower()}:ip:{remote_addr}", per_minute, per_hour))
+    return buckets
+
+def rate_limit_wait(endpoint, remote_addr, token, get_json):
+    """Spend one token from every bucket of a request; seconds until it may be served, 0 if allowed now"""
+    retry_after = 0
+    for key, per_minute, per_hour in rate_limit_keys(endpoint, remote_addr, token, get_json):
+        allowed, wait = rate_limiter.hit(key, per_minute, per_hour)
+        if not allowed:
+            retry_after = max(retry_after, wait)
+    return retry_after
+
+@app.before_request
+def enforce_rate_limit():
+    if not RATE_LIMIT_ENABLED or request.method == 'OPTIONS':
+        return None
+    if request.endpoint is None or request.endpoint in RATE_LIMIT_EXEMPT:
+        return None
+    
+    retry_after = rate_limit_wait(request.endpoint, request.remote_addr, bearer_token(),
+                                  lambda: request.get_json(silent=True))
+    if not retry_after:
+        return None
+    
+    response = jsonify({'error': 'Too many requests', 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
 
 # ========== ROUTES ==========
 
@@ -426,20 +1550,34 @@ def home():
             "user": {
                 "GET /api/user/profile": "Get user profile (Token required)",
                 "PUT /api/user/profile": "Update profile (Token required)",
-                "GET /api/user/chats": "Get chat history (Token required)",
+                "GET /api/user/chats": "Get chat history - ?limit, ?before/?after cursors, ?session_id, ?format=ndjson (Token required)",
                 "POST /api/user/chat": "Save chat message (Token required)",
+                "POST /api/user/chats/batch": "Save an array of chat messages in one transaction (Token required)",
+                "GET /api/user/chats/search": "Ranked full-text search of your chats - ?q, ?limit, ?offset (Token required)",
+                "GET /api/user/sessions": "Your conversations, newest first - ?limit, ?before cursor (Token required)",
                 "DELETE /api/user/chats/clear": "Clear chat history (Token required)"
             },
             "admin": {
                 "GET /api/admin/dashboard": f"Admin dashboard (ONLY for {ADMIN_EMAIL})",
                 "GET /api/admin/user/<email>": f"Get user details by email (ONLY for {ADMIN_EMAIL})",
+                "GET /api/admin/user/<email>/chats": f"Paginated chat history of a user (ONLY for {ADMIN_EMAIL})",
+                "GET /api/admin/chats/search": f"Full-text search of all chats - ?q, ?email, ?limit, ?offset (ONLY for {ADMIN_EMAIL})",
                 "GET /api/admin/users": f"Get all users (ONLY for {ADMIN_EMAIL})",
-                "PUT /api/admin/user/role": f"Update user role (ONLY for {ADMIN_EMAIL})"
+                "PUT /api/admin/user/role": f"Update user role (ONLY for {ADMIN_EMAIL})",
+                "GET /api/admin/knowledge": f"List knowledge base entries (ONLY for {ADMIN_EMAIL})",
+                "POST /api/admin/knowledge": f"Add knowledge base entry (ONLY for {ADMIN_EMAIL})",
+                "DELETE /api/admin/knowledge/<id>": f"Delete knowledge base entry (ONLY for {ADMIN_EMAIL})",
+                "GET /api/admin/analytics": f"Hourly/daily/weekly/monthly analytics - ?from, ?to, ?granularity (ONLY for {ADMIN_EMAIL})"
             },
             "system": {
                 "GET /api/health": "Health check",
+                "GET /api/health/live": "Liveness probe (no database access)",
                 "GET /api/stats": "System statistics",
+                "GET /api/metrics": "Request metrics in Prometheus text format",
                 "POST /api/feedback": "Submit feedback"
+            },
+            "chat": {
+                "POST /api/chat/respond": "Get chatbot response (mode: keyword, retrieval or auto)"
             }
         }
     })
@@ -489,12 +1627,16 @@ def register():
         new_user.set_password(password)
         
         db.session.add(new_user)
+        record_stats(users=1, roles={role: 1}, active_days={datetime.utcnow().date(): 1},
+                     admin_exists=True if role == 'Admin' else None)
+        if ENABLE_ANALYTICS:
+            rollups.record_registration(db.session, datetime.utcnow(), role)
         db.session.commit()
         
         # Create auth token
         auth_token = create_auth_token(email)
         
-        print(f"✅ New user registered: {email} ({name}) as {role}")
+        logger.info("✅ New user registered: %s as %s", email, role, extra={'event': 'user_registered', 'user': email})
         
         return jsonify({
             'success': True,
@@ -503,9 +1645,9 @@ def register():
             'token': auth_token
         })
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in register: {str(e)}")
+        logger.exception("❌ Error in register")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 2. User Login - NO ROLE CHANGES
@@ -519,7 +1661,7 @@ def login():
         if not email or not password:
             return jsonify({'error': 'Email and password required'}), 400
         
-        print(f"🔑 Login attempt: {email}")
+        logger.info("🔑 Login attempt: %s", email, extra={'event': 'login_attempt', 'user': email})
         
         # Find user
         user = User.query.filter_by(email=email).first()
@@ -529,14 +1671,21 @@ def login():
             if not user.is_active:
                 return jsonify({'error': 'Account is deactivated'}), 403
             
+            # Upgrade the stored hash while the plain password is at hand
+            if user.password_needs_rehash():
+                user.set_password(password)
+                logger.info("🔐 Password hash upgraded for %s", email, extra={'event': 'password_rehashed', 'user': email})
+            
             # Update last login
-            user.updated_at = datetime.utcnow()
+            now = datetime.utcnow()
+            record_stats(**activity_stats(user, now))
+            user.updated_at = now
             db.session.commit()
             
             # Create auth token
             auth_token = create_auth_token(email)
             
-            print(f"✅ Login successful: {email} as {user.role}")
+            logger.info("✅ Login successful: %s as %s", email, user.role, extra={'event': 'login_succeeded', 'user': email})
             
             return jsonify({
                 'success': True,
@@ -545,11 +1694,11 @@ def login():
                 'token': auth_token
             })
         else:
-            print(f"❌ Login failed: {email}")
+            logger.warning("❌ Login failed: %s", email, extra={'event': 'login_failed', 'user': email})
             return jsonify({'error': 'Invalid email or password'}), 401
             
-    except Exception as e:
-        print(f"❌ Error in login: {str(e)}")
+    except Exception:
+        logger.exception("❌ Error in login")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 3. Request OTP for password reset
@@ -571,20 +1720,25 @@ def request_otp():
         otp_code = generate_otp()
         expires_at = datetime.utcnow() + timedelta(minutes=OTP_EXPIRY_MINUTES)
         
-        # Delete old OTPs for this email
-        OTP.query.filter_by(email=email, purpose='password_reset', is_used=False).delete()
-        
-        # Store new OTP
-        new_otp = OTP(
-            email=email,
-            user_id=user.id,
-            otp_code=otp_code,
-            purpose='password_reset',
-            expires_at=expires_at
-        )
-        
-        db.session.add(new_otp)
-        db.session.commit()
+        if otp_store is not None:
+            # Replaces any earlier code for this email, no database write
+            otp_store.issue(email, otp_code)
+        else:
+            # Delete old OTPs for this email
+            replaced = OTP.query.filter_by(email=email, purpose='password_reset', is_used=False).delete()
+            
+            # Store new OTP
+            new_otp = OTP(
+                email=email,
+                user_id=user.id,
+                otp_code=otp_code,
+                purpose='password_reset',
+                expires_at=expires_at
+            )
+            
+            db.session.add(new_otp)
+            record_stats(otps_unused=1 - replaced)
+            db.session.commit()
         
         # Email HTML template
         email_html = f"""
@@ -629,32 +1783,40 @@ def request_otp():
         </html>
         """
         
-        # Send email
-        if send_email(email, f"Password Reset OTP - {APP_NAME}", email_html):
-            # Print OTP to console for testing
-            print(f"📧 OTP for {email}: {otp_code}")
-            print(f"⏰ Expires at: {expires_at}")
+        # Send email (simulated when no SMTP credentials are configured)
+        email_configured = bool(EMAIL_USER and EMAIL_PASSWORD)
+        if email_configured and send_email(email, f"Password Reset OTP - {APP_NAME}", email_html):
+            # Never log the code itself
+            logger.info("📧 OTP sent to %s, expires at %s", email, expires_at.isoformat(),
+                        extra={'event': 'otp_sent', 'user': email})
             
             return jsonify({
                 'success': True,
                 'message': 'OTP sent successfully',
                 'expires_in': f'{OTP_EXPIRY_MINUTES} minutes',
-                'note': 'Check console for OTP (in development)'
+                'note': 'Check your email for the OTP'
             })
-        else:
-            # In development, still return success but with note
-            print(f"📧 [DEV MODE] OTP for {email}: {otp_code}")
+        elif not email_configured and DEBUG_MODE:
+            # Local development only: with no SMTP account the code comes back in the response, never in the logs
+            logger.warning("📧 [DEV MODE] OTP email to %s simulated (no EMAIL_USER/EMAIL_PASSWORD), code returned in the response",
+                           email, extra={'event': 'otp_simulated', 'user': email})
             return jsonify({
                 'success': True,
                 'message': 'OTP generated (email simulation)',
-                'otp': otp_code,  # Only in development!
+                'otp': otp_code,  # Only with DEBUG=True and no email account configured!
                 'expires_in': f'{OTP_EXPIRY_MINUTES} minutes',
-                'note': 'Running in development mode - check console for OTP'
+                'note': 'Running in development mode - the OTP is in this response'
             })
+        else:
+            # The code never reaches the client; whoever asked has to try again once email works
+            reason = 'could not be queued' if email_configured else 'not configured (no EMAIL_USER/EMAIL_PASSWORD)'
+            logger.error("❌ OTP email to %s not sent: email delivery %s", email, reason,
+                         extra={'event': 'otp_not_sent', 'user': email})
+            return jsonify({'error': 'Could not send the OTP email, please try again later'}), 503
             
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in request_otp: {str(e)}")
+        logger.exception("❌ Error in request_otp")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 4. Verify OTP
@@ -668,7 +1830,21 @@ def verify_otp():
         if not email or not otp_code:
             return jsonify({'error': 'Email and OTP required'}), 400
         
-        print(f"🔍 Verifying OTP for {email}: {otp_code}")
+        logger.info("🔍 Verifying OTP for %s", email, extra={'event': 'otp_verify', 'user': email})
+        
+        if otp_store is not None:
+            outcome = otp_store.verify(email, otp_code)
+            if outcome is None:
+                return jsonify({'error': 'Invalid or expired OTP'}), 400
+            if outcome == 'expired':
+                return jsonify({'error': 'OTP expired'}), 400
+            
+            logger.info("✅ OTP verified for %s", email, extra={'event': 'otp_verified', 'user': email})
+            return jsonify({
+                'success': True,
+                'message': 'OTP verified successfully',
+                'reset_token': create_reset_token(email)
+            })
         
         # Find valid OTP
         otp_record = OTP.query.filter_by(
@@ -684,18 +1860,20 @@ def verify_otp():
         # Check if OTP is expired
         if datetime.utcnow() > otp_record.expires_at:
             otp_record.is_used = True
+            record_stats(otps_unused=-1)
             db.session.commit()
             return jsonify({'error': 'OTP expired'}), 400
         
         # Mark OTP as used
         otp_record.is_used = True
+        record_stats(otps_unused=-1)
         
         # Create reset token
         reset_token = create_reset_token(email)
         
         db.session.commit()
         
-        print(f"✅ OTP verified for {email}")
+        logger.info("✅ OTP verified for %s", email, extra={'event': 'otp_verified', 'user': email})
         
         return jsonify({
             'success': True,
@@ -703,9 +1881,9 @@ def verify_otp():
             'reset_token': reset_token
         })
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in verify_otp: {str(e)}")
+        logger.exception("❌ Error in verify_otp")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 5. Reset Password
@@ -737,11 +1915,13 @@ def reset_password():
             
             # Update password
             user.set_password(new_password)
-            user.updated_at = datetime.utcnow()
+            now = datetime.utcnow()
+            record_stats(**activity_stats(user, now))
+            user.updated_at = now
             
             db.session.commit()
             
-            print(f"✅ Password reset for {email}")
+            logger.info("✅ Password reset for %s", email, extra={'event': 'password_reset', 'user': email})
             
             return jsonify({
                 'success': True,
@@ -753,9 +1933,9 @@ def reset_password():
         except jwt.InvalidTokenError:
             return jsonify({'error': 'Invalid token'}), 400
             
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in reset_password: {str(e)}")
+        logger.exception("❌ Error in reset_password")
         return jsonify({'error': 'Internal server error'}), 500
 
 # ========== USER PROFILE ROUTES (Token Required) ==========
@@ -765,12 +1945,16 @@ def reset_password():
 @token_required
 def get_profile(current_user):
     try:
+        user = current_user.load()
+        if not user:
+            return jsonify({'error': 'User not found'}), 401
+        
         return jsonify({
             'success': True,
-            'user': current_user.to_dict()
+            'user': user.to_dict()
         })
-    except Exception as e:
-        print(f"❌ Error in get_profile: {str(e)}")
+    except Exception:
+        logger.exception("❌ Error in get_profile")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 7. Update user profile
@@ -779,29 +1963,34 @@ def get_profile(current_user):
 def update_profile(current_user):
     try:
         data = request.get_json()
+        user = current_user.load()
+        if not user:
+            return jsonify({'error': 'User not found'}), 401
         
         # Update allowed fields
         if 'name' in data:
-            current_user.name = data['name']
-            current_user.avatar = data['name'][0].upper()
+            user.name = data['name']
+            user.avatar = data['name'][0].upper()
         
         if 'avatar' in data:
-            current_user.avatar = data['avatar']
+            user.avatar = data['avatar']
         
-        current_user.updated_at = datetime.utcnow()
+        now = datetime.utcnow()
+        record_stats(**activity_stats(user, now))
+        user.updated_at = now
         db.session.commit()
         
-        print(f"✅ Profile updated for {current_user.email}")
+        logger.info("✅ Profile updated for %s", user.email, extra={'event': 'profile_updated', 'user': user.email})
         
         return jsonify({
             'success': True,
             'message': 'Profile updated successfully',
-            'user': current_user.to_dict()
+            'user': user.to_dict()
         })
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in update_profile: {str(e)}")
+        logger.exception("❌ Error in update_profile")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 8. Get user chat history
@@ -809,23 +1998,11 @@ def update_profile(current_user):
 @token_required
 def get_chats(current_user):
     try:
-        # Get chats for current user (limited by MAX_CHAT_HISTORY from .env)
-        chats = Chat.query.filter_by(user_id=current_user.id)\
-            .order_by(Chat.created_at.desc())\
-            .limit(MAX_CHAT_HISTORY)\
-            .all()
-        
-        chats_list = [chat.to_dict() for chat in chats]
-        
-        return jsonify({
-            'success': True,
-            'chats': chats_list,
-            'count': len(chats_list),
-            'max_history': MAX_CHAT_HISTORY
-        })
+        # Pages are limited by MAX_CHAT_HISTORY from .env; ?format=ndjson streams everything
+        return chat_history_response(current_user.id)
         
-    except Exception as e:
-        print(f"❌ Error in get_chats: {str(e)}")
+    except Exception:
+        logger.exception("❌ Error in get_chats")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 9. Save chat message
@@ -843,29 +2020,118 @@ def save_chat(current_user):
         if not all([session_id, user_message, bot_response]):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        # Create new chat record
-        new_chat = Chat(
-            user_id=current_user.id,
-            session_id=session_id,
-            user_message=user_message,
-            bot_response=bot_response,
-            category=category
-        )
+        now = datetime.utcnow()
+        
+        # Write-behind: the background writer commits it with the next group
+        if CHAT_WRITE_MODE == 'write_behind' and chat_buffer.submit({
+            'user_id': current_user.id,
+            'session_id': session_id,
+            'user_message': user_message,
+            'bot_response': bot_response,
+            'category': category,
+            'created_at': now
+        }):
+            return jsonify({
+                'success': True,
+                'message': 'Chat queued for saving',
+                'chat_id': None,
+                'pending': True
+            })
+        
+        row = {
+            'user_id': current_user.id,
+            'session_id': session_id,
+            'user_message': user_message,
+            'bot_response': bot_response,
+            'category': category,
+            'created_at': now
+        }
         
-        db.session.add(new_chat)
+        # Counters, rollups and the chat session in the same transaction, then the chat itself
+        count_chat_rows(db.session, [row])
+        chat_id = db.session.execute(insert(Chat).returning(Chat.id), row).scalar_one()
+        record_stats(**chat_stats([row]))
         db.session.commit()
         
-        print(f"💾 Chat saved for {current_user.email} (session: {session_id})")
+        logger.info("💾 Chat saved for %s (session: %s)", current_user.email, session_id,
+                    extra={'event': 'chat_saved', 'user': current_user.email, 'session_id': session_id})
         
         return jsonify({
             'success': True,
             'message': 'Chat saved successfully',
-            'chat_id': new_chat.id
+            'chat_id': chat_id
         })
         
-    except Exception as e:
+    except Exception:
+        db.session.rollback()
+        logger.exception("❌ Error in save_chat")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# 23. Save a batch of chat messages
+@app.route('/api/user/chats/batch', methods=['POST'])
+@token_required
+def save_chat_batch(current_user):
+    try:
+        data = request.get_json(silent=True)
+        messages = data.get('chats') if isinstance(data, dict) else data
+        
+        if not isinstance(messages, list) or not messages:
+            return jsonify({'error': 'Expected a non-empty array of chats'}), 400
+        
+        if len(messages) > MAX_CHAT_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_CHAT_BATCH_SIZE} chats per batch'}), 400
+        
+        # Validate everything before writing anything
+        now = datetime.utcnow()
+        rows = []
+        errors = []
+        for index, message in enumerate(messages):
+            if not isinstance(message, dict):
+                errors.append({'index': index, 'error': 'Chat must be an object'})
+                continue
+            
+            session_id = message.get('session_id')
+            user_message = message.get('user_message')
+            bot_response = message.get('bot_response')
+            category = message.get('category') or 'general'
+            
+            if not all([session_id, user_message, bot_response]):
+                errors.append({'index': index, 'error': 'Missing required fields'})
+                continue
+            
+            rows.append({
+                'user_id': current_user.id,
+                'session_id': str(session_id),
+                'user_message': str(user_message),
+                'bot_response': str(bot_response),
+                'category': str(category),
+                'created_at': now
+            })
+        
+        if errors:
+            return jsonify({'error': 'Invalid chats in batch', 'details': errors}), 400
+        
+        # One counter update, then one multi-row INSERT. Not sort_by_parameter_order: without a
+        # sentinel column SQLite would get one INSERT per row. Ids are assigned ascending in
+        # row order within one INSERT, so sorting them restores the input order.
+        count_chat_rows(db.session, rows)
+        chat_ids = sorted(db.session.scalars(insert(Chat).returning(Chat.id), rows).all())
+        record_stats(**chat_stats(rows))
+        db.session.commit()
+        
+        logger.info("💾 %d chats saved for %s", len(rows), current_user.email,
+                    extra={'event': 'chats_saved', 'user': current_user.email, 'count': len(rows)})
+        
+        return jsonify({
+            'success': True,
+            'message': f'Saved {len(rows)} chat messages',
+            'count': len(rows),
+            'chat_ids': chat_ids
+        })
+        
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in save_chat: {str(e)}")
+        logger.exception("❌ Error in save_chat_batch")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 10. Delete user chat history
@@ -873,11 +2139,35 @@ def save_chat(current_user):
 @token_required
 def clear_chats(current_user):
     try:
+        # Buffered chats must land before the delete, or they would reappear after it
+        if CHAT_WRITE_MODE == 'write_behind':
+            chat_buffer.drain()
+        
+        # What is about to go, for the statistics counters
+        today = datetime.utcnow().date()
+        removed = db.session.query(
+            Chat.category,
+            func.count(Chat.id),
+            func.count(case((Chat.created_at >= datetime.combine(today, datetime.min.time()), 1)))
+        ).filter(Chat.user_id == current_user.id).group_by(Chat.category).all()
+        
         # Delete all chats for current user
         deleted_count = Chat.query.filter_by(user_id=current_user.id).delete()
+        record_stats(
+            chats=-deleted_count,
+            categories={category: -count for category, count, _ in removed if category},
+            days={today: -sum(today_count for _, _, today_count in removed)}
+        )
+        db.session.execute(
+            update(User)
+            .where(User.id == current_user.id)
+            .values(chat_count=0, last_chat_at=None, updated_at=User.updated_at)
+        )
+        chat_sessions.clear(db.session, current_user.id)
         db.session.commit()
         
-        print(f"🗑️ Cleared {deleted_count} chats for {current_user.email}")
+        logger.info("🗑️ Cleared %d chats for %s", deleted_count, current_user.email,
+                    extra={'event': 'chats_cleared', 'user': current_user.email, 'count': deleted_count})
         
         return jsonify({
             'success': True,
@@ -885,9 +2175,57 @@ def clear_chats(current_user):
             'deleted_count': deleted_count
         })
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in clear_chats: {str(e)}")
+        logger.exception("❌ Error in clear_chats")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# 27. Search own chat history
+@app.route('/api/user/chats/search', methods=['GET'])
+@token_required
+def search_user_chats(current_user):
+    try:
+        return jsonify(search_chats(request.args, user_id=current_user.id))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except NotImplementedError:
+        return jsonify({'error': 'Chat search is not available on this database'}), 501
+    except Exception:
+        logger.exception("❌ Error in search_user_chats")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# 29. List own chat sessions
+@app.route('/api/user/sessions', methods=['GET'])
+@token_required
+def get_sessions(current_user):
+    try:
+        # Newest first, keyset on the session id (?before=<next_cursor>); reads only chat_session.
+        # Chats still in the write-behind buffer join their session once flushed.
+        try:
+            limit = max(1, min(int(request.args.get('limit', 20)), MAX_CHAT_HISTORY))
+            before = int(request.args['before']) if request.args.get('before') else None
+        except ValueError:
+            return jsonify({'error': 'Invalid limit or before cursor'}), 400
+        
+        query = select(ChatSession).where(ChatSession.user_id == current_user.id)
+        if before is not None:
+            query = query.where(ChatSession.id < before)
+        sessions = db.session.scalars(query.order_by(ChatSession.id.desc()).limit(limit + 1)).all()
+        
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
+        return jsonify({
+            'success': True,
+            'sessions': [chat_session.to_dict() for chat_session in sessions],
+            'count': len(sessions),
+            'has_more': has_more,
+            'next_cursor': sessions[-1].id if has_more else None,
+            'session_timeout_minutes': CHAT_SESSION_TIMEOUT
+        })
+        
+    except Exception:
+        logger.exception("❌ Error in get_sessions")
         return jsonify({'error': 'Internal server error'}), 500
 
 # ========== ADMIN ROUTES (Admin Only) ==========
@@ -897,37 +2235,53 @@ def clear_chats(current_user):
 @admin_required
 def admin_dashboard(current_user):
     try:
-        # Get all users with their stats
-        users = User.query.all()
-        
+        # Per-user chat count and last activity, aggregated once instead of per user
+        chat_stats = db.session.query(
+            Chat.user_id.label('user_id'),
+            func.count(Chat.id).label('chat_count'),
+            func.max(Chat.created_at).label('last_active')
+        ).group_by(Chat.user_id).subquery()
+
+        # Get all users with their stats in a single query
+        rows = db.session.query(
+            User.id, User.email, User.name, User.role, User.avatar,
+            User.is_active, User.created_at, User.updated_at,
+            func.coalesce(chat_stats.c.chat_count, 0),
+            chat_stats.c.last_active
+        ).outerjoin(chat_stats, User.id == chat_stats.c.user_id).all()
+
         user_list = []
-        for user in users:
-            # Get user's chat count
-            chat_count = Chat.query.filter_by(user_id=user.id).count()
-            
-            # Get user's last activity
-            last_chat = Chat.query.filter_by(user_id=user.id)\
-                .order_by(Chat.created_at.desc())\
-                .first()
-            
+        active_users = 0
+        total_chats = 0
+        users_with_chats = 0
+        role_counts = {'Admin': 0, 'Premium User': 0, 'Regular User': 0}
+
+        for (user_id, email, name, role, avatar, is_active,
+             created_at, updated_at, chat_count, last_active) in rows:
             user_list.append({
-                'id': user.id,
-                'email': user.email,
-                'name': user.name,
-                'role': user.role,
-                'avatar': user.avatar,
-                'is_active': user.is_active,
+                'id': user_id,
+                'email': email,
+                'name': name,
+                'role': role,
+                'avatar': avatar,
+                'is_active': is_active,
                 'chat_count': chat_count,
-                'created_at': user.created_at.isoformat() if user.created_at else None,
-                'updated_at': user.updated_at.isoformat() if user.updated_at else None,
-                'last_active': last_chat.created_at.isoformat() if last_chat else None
+                'created_at': created_at.isoformat() if created_at else None,
+                'updated_at': updated_at.isoformat() if updated_at else None,
+                'last_active': last_active.isoformat() if last_active else None
             })
-        
-        # Get system statistics
+
+            # Compute statistics in the same pass
+            if is_active:
+                active_users += 1
+            if chat_count > 0:
+                users_with_chats += 1
+            total_chats += chat_count
+            if role in role_counts:
+                role_counts[role] += 1
+
         total_users = len(user_list)
-        active_users = len([u for u in user_list if u['is_active']])
-        total_chats = Chat.query.count()
-        
+
         return jsonify({
             'success': True,
             'admin_info': {
@@ -940,10 +2294,10 @@ def admin_dashboard(current_user):
                 'total_users': total_users,
                 'active_users': active_users,
                 'total_chats': total_chats,
-                'users_with_chats': len([u for u in user_list if u['chat_count'] > 0]),
-                'admin_users': len([u for u in user_list if u['role'] == 'Admin']),
-                'premium_users': len([u for u in user_list if u['role'] == 'Premium User']),
-                'regular_users': len([u for u in user_list if u['role'] == 'Regular User'])
+                'users_with_chats': users_with_chats,
+                'admin_users': role_counts['Admin'],
+                'premium_users': role_counts['Premium User'],
+                'regular_users': role_counts['Regular User']
             },
             'config': {
                 'max_chat_history': MAX_CHAT_HISTORY,
@@ -953,8 +2307,8 @@ def admin_dashboard(current_user):
             }
         })
         
-    except Exception as e:
-        print(f"❌ Error in admin_dashboard: {str(e)}")
+    except Exception:
+        logger.exception("❌ Error in admin_dashboard")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 12. Get user details by email (Admin only)
@@ -983,7 +2337,7 @@ def get_user_details(current_user, email):
         user_data = {
             'basic_info': user.to_dict(),
             'activity': {
-                'total_chats': Chat.query.filter_by(user_id=user.id).count(),
+                'total_chats': user.chat_count or 0,
                 'recent_chats': [chat.to_dict() for chat in recent_chats],
                 'last_login': user.updated_at.isoformat() if user.updated_at else None
             },
@@ -998,8 +2352,53 @@ def get_user_details(current_user, email):
             'user': user_data
         })
         
-    except Exception as e:
-        print(f"❌ Error in get_user_details: {str(e)}")
+    except Exception:
+        logger.exception("❌ Error in get_user_details")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# 22. Get user chat history by email (Admin only)
+@app.route('/api/admin/user/<email>/chats', methods=['GET'])
+@admin_required
+def get_user_chats(current_user, email):
+    try:
+        user = User.query.filter_by(email=email).first()
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        return chat_history_response(user.id)
+        
+    except Exception:
+        logger.exception("❌ Error in get_user_chats")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# 28. Search all chats, or one user's with ?email= (Admin only)
+@app.route('/api/admin/chats/search', methods=['GET'])
+@admin_required
+def search_all_chats(current_user):
+    try:
+        user_id = None
+        if request.args.get('email'):
+            user_id = db.session.scalar(select(User.id).where(User.email == request.args['email']))
+            if user_id is None:
+                return jsonify({'error': 'User not found'}), 404
+        
+        body = search_chats(request.args, user_id=user_id)
+        
+        # One lookup for the page's authors
+        user_ids = {result['user_id'] for result in body['results']}
+        emails = dict(db.session.execute(select(User.id, User.email).where(User.id.in_(user_ids))).all()) if user_ids else {}
+        for result in body['results']:
+            result['user_email'] = emails.get(result['user_id'])
+        
+        return jsonify(body)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except NotImplementedError:
+        return jsonify({'error': 'Chat search is not available on this database'}), 501
+    except Exception:
+        logger.exception("❌ Error in search_all_chats")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 13. Get all users (Admin only)
@@ -1008,18 +2407,25 @@ def get_user_details(current_user, email):
 def get_all_users(current_user):
     try:
         users = User.query.all()
+        
+        # Role counts from the rows already loaded instead of three COUNTs
+        role_counts = {'Admin': 0, 'Premium User': 0, 'Regular User': 0}
+        for user in users:
+            if user.role in role_counts:
+                role_counts[user.role] += 1
+        
         return jsonify({
             'success': True,
             'users': [user.to_dict() for user in users],
             'count': len(users),
             'role_counts': {
-                'admin': User.query.filter_by(role='Admin').count(),
-                'premium': User.query.filter_by(role='Premium User').count(),
-                'regular': User.query.filter_by(role='Regular User').count()
+                'admin': role_counts['Admin'],
+                'premium': role_counts['Premium User'],
+                'regular': role_counts['Regular User']
             }
         })
-    except Exception as e:
-        print(f"❌ Error in get_all_users: {str(e)}")
+    except Exception:
+        logger.exception("❌ Error in get_all_users")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 14. Update user role (Admin only) - Strict rules
@@ -1061,10 +2467,16 @@ def update_user_role(current_user):
         # Update role
         old_role = user.role
         user.role = new_role
-        user.updated_at = datetime.utcnow()
+        if old_role != new_role:
+            record_stats(roles={old_role: -1, new_role: 1})
+        # Only ADMIN_EMAIL can hold Admin (RULE 1) and never loses it (RULE 2)
+        now = datetime.utcnow()
+        record_stats(admin_exists=True if new_role == 'Admin' else None, **activity_stats(user, now))
+        user.updated_at = now
         db.session.commit()
         
-        print(f"✅ Role updated for {email}: {old_role} → {new_role} by {current_user.email}")
+        logger.info("✅ Role updated for %s: %s → %s by %s", email, old_role, new_role, current_user.email,
+                    extra={'event': 'role_updated', 'user': email, 'admin': current_user.email})
         
         return jsonify({
             'success': True,
@@ -1072,9 +2484,52 @@ def update_user_role(current_user):
             'user': user.to_dict()
         })
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in update_user_role: {str(e)}")
+        logger.exception("❌ Error in update_user_role")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# 25. Analytics from the hourly/daily rollups (Admin only)
+@app.route('/api/admin/analytics', methods=['GET'])
+@admin_required
+def get_analytics(current_user):
+    try:
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in REPORT_GRANULARITIES:
+            return jsonify({'error': f'granularity must be one of: {", ".join(REPORT_GRANULARITIES)}'}), 400
+        
+        # from/to are ISO dates or datetimes; the default is the last 30 days
+        try:
+            end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow()
+            start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=30)
+        except ValueError:
+            return jsonify({'error': 'from and to must be ISO dates (YYYY-MM-DD or YYYY-MM-DDTHH:MM)'}), 400
+        
+        if start >= end:
+            return jsonify({'error': 'from must be before to'}), 400
+        
+        if granularity == 'hour' and end - start > timedelta(days=ANALYTICS_MAX_HOURLY_DAYS):
+            return jsonify({'error': f'Hourly ranges are limited to {ANALYTICS_MAX_HOURLY_DAYS} days'}), 400
+        
+        buckets, rows_read = rollups.report(db.session, start, end, granularity)
+        
+        return jsonify({
+            'success': True,
+            'granularity': granularity,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'buckets': buckets,
+            'totals': {
+                'chats': sum(bucket['chats'] for bucket in buckets),
+                'registrations': sum(bucket['registrations'] for bucket in buckets),
+                'feedback': sum(bucket['feedback']['count'] for bucket in buckets)
+            },
+            'rollup_rows': rows_read,
+            'enabled': ENABLE_ANALYTICS
+        })
+        
+    except Exception:
+        logger.exception("❌ Error in get_analytics")
         return jsonify({'error': 'Internal server error'}), 500
 
 # ========== SYSTEM ROUTES ==========
@@ -1083,17 +2538,11 @@ def update_user_role(current_user):
 @app.route('/api/health', methods=['GET'])
 def health_check():
     try:
-        # Test database connection
-        user_count = User.query.count()
-        chat_count = Chat.query.count()
-        
-        # Check admin user exists
-        admin_exists = User.query.filter_by(email=ADMIN_EMAIL, role='Admin').first() is not None
-        
-        # Check user roles distribution
-        admin_count = User.query.filter_by(role='Admin').count()
-        premium_count = User.query.filter_by(role='Premium User').count()
-        regular_count = User.query.filter_by(role='Regular User').count()
+        # Test database connection (counters come from the statistics service)
+        db.session.execute(select(1))
+        stats = stats_service.snapshot()
+        admin_exists = stats['admin_exists']
+        admin_count = stats['roles'].get('Admin', 0)
         
         return jsonify({
             'status': 'healthy',
@@ -1108,13 +2557,14 @@ def health_check():
             },
             'user_roles': {
                 'admin': admin_count,
-                'premium': premium_count,
-                'regular': regular_count
+                'premium': stats['roles'].get('Premium User', 0),
+                'regular': stats['roles'].get('Regular User', 0)
             },
             'statistics': {
-                'users': user_count,
-                'chats': chat_count,
-                'otps': OTP.query.filter_by(is_used=False).count()
+                'users': stats['users'],
+                'chats': stats['chats'],
+                'otps': stats['otps_unused'],
+                'reconciled_at': stats['reconciled_at']
             },
             'config': {
                 'max_chat_history': MAX_CHAT_HISTORY,
@@ -1131,57 +2581,42 @@ def health_check():
             'error': str(e)
         }), 500
 
+# 24. Liveness probe - no database access
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    return jsonify({'status': 'alive', 'timestamp': datetime.utcnow().isoformat()})
+
+# 26. Request metrics for Prometheus (this worker only)
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return app.response_class(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
 # 16. System Statistics
 @app.route('/api/stats', methods=['GET'])
 def system_stats():
     try:
-        # Get today's date
-        today = datetime.utcnow().date()
-        today_start = datetime.combine(today, datetime.min.time())
-        
-        # User statistics
-        total_users = User.query.count()
-        active_today = User.query.filter(
-            User.updated_at >= today_start
-        ).count()
-        
-        # Chat statistics
-        total_chats = Chat.query.count()
-        chats_today = Chat.query.filter(
-            Chat.created_at >= today_start
-        ).count()
-        
-        # Category distribution
-        from sqlalchemy import func
-        categories = db.session.query(
-            Chat.category, 
-            func.count(Chat.id).label('count')
-        ).group_by(Chat.category).all()
-        
-        category_dist = {str(cat): cnt for cat, cnt in categories if cat}
-        
-        # Role distribution
-        admin_count = User.query.filter_by(role='Admin').count()
-        premium_count = User.query.filter_by(role='Premium User').count()
-        regular_count = User.query.filter_by(role='Regular User').count()
+        # Counters are kept in memory and updated by the writes that change them
+        stats = stats_service.snapshot()
         
         return jsonify({
             'success': True,
             'app': APP_NAME,
             'statistics': {
                 'users': {
-                    'total': total_users,
-                    'active_today': active_today,
+                    'total': stats['users'],
+                    'active_today': stats['active_today'],
                     'roles': {
-                        'admin': admin_count,
-                        'premium': premium_count,
-                        'regular': regular_count
+                        'admin': stats['roles'].get('Admin', 0),
+                        'premium': stats['roles'].get('Premium User', 0),
+                        'regular': stats['roles'].get('Regular User', 0)
                     }
                 },
                 'chats': {
-                    'total': total_chats,
-                    'today': chats_today,
-                    'categories': category_dist,
+                    'total': stats['chats'],
+                    'today': stats['chats_today'],
+                    'categories': stats['categories'],
                     'max_history_per_user': MAX_CHAT_HISTORY
                 },
                 'system': {
@@ -1190,13 +2625,32 @@ def system_stats():
                     'frontend_url': APP_URL,
                     'api_url': API_URL,
                     'admin_email': ADMIN_EMAIL,
-                    'last_updated': datetime.utcnow().isoformat()
-                }
+                    'last_updated': datetime.utcnow().isoformat(),
+                    'statistics_reconciled_at': stats['reconciled_at'],
+                    'statistics_service': stats_service.stats(),
+                    'connection_pool': db.engine.pool.status(),
+                    'sqlite_pragmas': sqlite_pragma_values()
+                },
+                'caches': {
+                    'auth_tokens': token_cache.stats(),
+                    'auth_users': user_cache.stats(),
+                    'responses': response_cache.stats()
+                },
+                'password_hashing': password_hasher.stats(),
+                'otp_store': otp_store.stats() if otp_store is not None else {'backend': 'database'},
+                'rate_limit': dict(rate_limiter.stats(), enabled=RATE_LIMIT_ENABLED),
+                'email': email_dispatcher.stats(),
+                'chat_buffer': dict(chat_buffer.stats(), mode=CHAT_WRITE_MODE),
+                'async_api': dict(async_api.stats(), enabled=ASYNC_CHAT_API, database=async_db.stats()),
+                'sql_diagnostics': dict(query_diagnostics.stats(), enabled=SQL_DIAGNOSTICS),
+                'logging': log_pipeline.stats(),
+                'retention': dict(retention_worker.stats(), enabled=RETENTION_ENABLED,
+                                  chat_retention_days=ANALYTICS_RETENTION_DAYS)
             }
         })
         
-    except Exception as e:
-        print(f"❌ Error in system_stats: {str(e)}")
+    except Exception:
+        logger.exception("❌ Error in system_stats")
         return jsonify({'error': 'Internal server error'}), 500
 
 # 17. Submit feedback
@@ -1238,23 +2692,452 @@ def submit_feedback():
         )
         
         db.session.add(feedback)
+        if ENABLE_ANALYTICS:
+            rollups.record_feedback(db.session, datetime.utcnow(), rating)
         db.session.commit()
         
-        print(f"📝 Feedback submitted by {email or 'anonymous'}")
+        logger.info("📝 Feedback submitted by %s", email or 'anonymous', extra={'event': 'feedback_submitted'})
         
         return jsonify({
             'success': True,
             'message': 'Thank you for your feedback!'
         })
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"❌ Error in submit_feedback: {str(e)}")
+        logger.exception("❌ Error in submit_feedback")
         return jsonify({'error': 'Internal server error'}), 500
 
+# ========== CHATBOT ROUTES ==========
+
+# 18. Get chatbot response
+@app.route('/api/chat/respond', methods=['POST'])
+def chat_respond():
+    try:
+        if knowledge_sync_due():
+            sync_knowledge_base()
+        body, status = chat_response_body(request.get_json(silent=True) or {})
+        return app.response_class(body, status=status, mimetype='application/json')
+        
+    except Exception:
+        logger.exception("❌ Error in chat_respond")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# ========== KNOWLEDGE BASE ROUTES (Admin Only) ==========
+
+# 19. List knowledge base entries (Admin only)
+@app.route('/api/admin/knowledge', methods=['GET'])
+@admin_required
+def list_knowledge(current_user):
+    try:
+        entries = KnowledgeEntry.query.order_by(KnowledgeEntry.id).all()
+        return jsonify({
+            'success': True,
+            'entries': [entry.to_dict() for entry in entries],
+            'count': len(entries),
+            'index_size': len(retrieval_index)
+        })
+    except Exception:
+        logger.exception("❌ Error in list_knowledge")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# 20. Add knowledge base entry (Admin only)
+@app.route('/api/admin/knowledge', methods=['POST'])
+@admin_required
+def add_knowledge(current_user):
+    try:
+        data = request.get_json() or {}
+        title = data.get('title')
+        response_text = data.get('response')
+        keywords = data.get('keywords', [])
+        
+        if not title or not response_text:
+            return jsonify({'error': 'Title and response are required'}), 400
+        
+        if isinstance(keywords, str):
+            keywords = keywords.split(',')
+        
+        entry = KnowledgeEntry(
+            title=title,
+            category=data.get('category', 'general'),
+            keywords=','.join(str(keyword).strip() for keyword in keywords if str(keyword).strip()),
+            response=response_text,
+            created_by=current_user.id
+        )
+        db.session.add(entry)
+        db.session.commit()
+        
+        refresh_knowledge_base()
+        
+        logger.info("📚 Knowledge entry added by %s: %s", current_user.email, title,
+                    extra={'event': 'knowledge_added', 'admin': current_user.email})
+        
+        return jsonify({
+            'success': True,
+            'message': 'Knowledge entry added',
+            'entry': entry.to_dict()
+        })
+        
+    except Exception:
+        db.session.rollback()
+        logger.exception("❌ Error in add_knowledge")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# 21. Delete knowledge base entry (Admin only)
+@app.route('/api/admin/knowledge/<int:entry_id>', methods=['DELETE'])
+@admin_required
+def delete_knowledge(current_user, entry_id):
+    try:
+        entry = db.session.get(KnowledgeEntry, entry_id)
+        if not entry:
+            return jsonify({'error': 'Knowledge entry not found'}), 404
+        
+        db.session.delete(entry)
+        db.session.commit()
+        
+        refresh_knowledge_base()
+        
+        logger.info("🗑️ Knowledge entry %s deleted by %s", entry_id, current_user.email,
+                    extra={'event': 'knowledge_deleted', 'admin': current_user.email})
+        
+        return jsonify({
+            'success': True,
+            'message': 'Knowledge entry deleted'
+        })
+        
+    except Exception:
+        db.session.rollback()
+        logger.exception("❌ Error in delete_knowledge")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# ========== ASYNC CHAT API ==========
+
+# The chat routes again as coroutines on an async database driver, so thousands of
+# waiting clients do not each hold a thread. Only ASGI servers use them (create_asgi_app);
+# every other route, and requests these decline, go to the Flask app above.
+async_api = AsyncAPI(dumps=app.json.dumps, cors_origin=APP_URL)
+async_db = AsyncDatabase()
+
+@async_api.before_request
+async def assign_request_id_async(request):
+    request.state['request_id'] = new_request_id(request.headers.get('x-request-id'))
+
+@async_api.after_request
+def echo_request_id_async(request, response):
+    if 'request_id' in request.state:
+        response.headers['X-Request-ID'] = request.state['request_id']
+
+@async_api.before_request
+async def start_request_metrics_async(request):
+    if METRICS_ENABLED:
+        request.state['metrics_started'] = time.perf_counter()
+        query_counter.begin()
+
+@async_api.after_request
+def record_request_metrics_async(request, response):
+    started = request.state.get('metrics_started')
+    if started is not None:
+        # Async routes are exact paths, so the path is the route
+        observe_request(request.method, request.path, response.status, started, query_counter.end(),
+                        len(response.body))
+
+@async_api.before_request
+async def start_query_diagnostics_async(request):
+    if SQL_DIAGNOSTICS:
+        query_diagnostics.begin(f"{request.method} {request.path}")
+
+@async_api.after_request
+def finish_query_diagnostics_async(request, response):
+    if SQL_DIAGNOSTICS:
+        query_diagnostics.end()
+
+@async_api.before_request
+async def enforce_rate_limit_async(request):
+    if not RATE_LIMIT_ENABLED:
+        return None
+    
+    args = (request.endpoint, request.remote_addr, request.bearer_token(), request.get_json)
+    if isinstance(rate_limiter.backend, MemoryBackend):
+        retry_after = rate_limit_wait(*args)
+    else:
+        # Redis round trips must not stall the event loop
+        retry_after = await asyncio.to_thread(rate_limit_wait, *args)
+    if not retry_after:
+        return None
+    return async_api.json({'error': 'Too many requests', 'retry_after': retry_after}, 429,
+                          headers={'Retry-After': retry_after})
+
+def async_token_required(f):
+    """token_required for async routes; cache misses load the user through the async driver"""
+    @wraps(f)
+    async def decorated(request):
+        token = request.bearer_token()
+        
+        if not token:
+            return async_api.json({'error': 'Token is missing'}, 401)
+        
+        try:
+            email = token_email(token)
+            
+            current_user = user_cache.get(email) if AUTH_CACHE_TTL > 0 else None
+            if current_user is None:
+                async with async_db.session() as session:
+                    user = (await session.execute(select(User).filter_by(email=email))).scalars().first()
+                
+                if not user:
+                    return async_api.json({'error': 'User not found'}, 401)
+                
+                current_user = UserSnapshot(user)
+                if AUTH_CACHE_TTL > 0:
+                    user_cache.set(email, current_user)
+            
+            if not current_user.is_active:
+                return async_api.json({'error': 'User account is deactivated'}, 401)
+                
+        except jwt.ExpiredSignatureError:
+            return async_api.json({'error': 'Token has expired'}, 401)
+        except jwt.InvalidTokenError:
+            return async_api.json({'error': 'Invalid token'}, 401)
+        
+        return await f(request, current_user)
+    
+    return decorated
+
+def serves_history_async(request):
+    """JSON pages only: NDJSON streams and pages merged with the write-behind buffer use the WSGI route"""
+    if request.args.get('format') == 'ndjson':
+        return False
+    return not (CHAT_WRITE_MODE == 'write_behind' and not request.args.get('before'))
+
+# 8. Get chat history (async)
+@async_api.route('/api/user/chats', endpoint='get_chats', accept=serves_history_async)
+@async_token_required
+async def get_chats_async(request, current_user):
+    try:
+        try:
+            limit, cursor, _ = parse_history_args(request.args)
+        except ValueError as e:
+            return async_api.json({'error': str(e)}, 400)
+        
+        query = chat_history_query(current_user.id, request.args, cursor).limit(limit + 1)
+        async with async_db.session() as session:
+            chats = (await session.execute(query)).scalars().all()
+        return async_api.json(chat_history_page(chats, limit, request.args, cursor))
+        
+    except Exception:
+        logger.exception("❌ Error in get_chats_async")
+        return async_api.json({'error': 'Internal server error'}, 500)
+
+# 9. Save chat message (async)
+@async_api.route('/api/user/chat', methods=('POST',), endpoint='save_chat')
+@async_token_required
+async def save_chat_async(request, current_user):
+    try:
+        data = request.get_json() or {}
+        
+        session_id = data.get('session_id')
+        user_message = data.get('user_message')
+        bot_response = data.get('bot_response')
+        category = data.get('category', 'general')
+        
+        if not all([session_id, user_message, bot_response]):
+            return async_api.json({'error': 'Missing required fields'}, 400)
+        
+        row = {
+            'user_id': current_user.id,
+            'session_id': session_id,
+            'user_message': user_message,
+            'bot_response': bot_response,
+            'category': category,
+            'created_at': datetime.utcnow()
+        }
+        
+        # Write-behind: the background writer commits it with the next group
+        if CHAT_WRITE_MODE == 'write_behind' and chat_buffer.submit(row):
+            return async_api.json({
+                'success': True,
+                'message': 'Chat queued for saving',
+                'chat_id': None,
+                'pending': True
+            })
+        
+        # Counters and insert in one transaction; the sync helper runs on the async connection
+        async with async_db.session() as session:
+            async with session.begin():
+                await session.run_sync(count_chat_rows, [row])
+                chat_id = (await session.execute(insert(Chat).returning(Chat.id), row)).scalar_one()
+        stats_service.apply(**chat_stats([row]))
+        
+        logger.info("💾 Chat saved for %s (session: %s)", current_user.email, session_id,
+                    extra={'event': 'chat_saved', 'user': current_user.email, 'session_id': session_id})
+        
+        return async_api.json({
+            'success': True,
+            'message': 'Chat saved successfully',
+            'chat_id': chat_id
+        })
+        
+    except Exception:
+        logger.exception("❌ Error in save_chat_async")
+        return async_api.json({'error': 'Internal server error'}, 500)
+
+# 18. Get chatbot response (async; matching is in-memory, so it runs on the event loop)
+@async_api.route('/api/chat/respond', methods=('POST',), endpoint='chat_respond')
+async def chat_respond_async(request):
+    try:
+        if knowledge_sync_due():
+            await asyncio.to_thread(sync_knowledge_base)
+        body, status = chat_response_body(request.get_json() or {})
+        return AsyncResponse(body, status)
+        
+    except Exception:
+        logger.exception("❌ Error in chat_respond_async")
+        return async_api.json({'error': 'Internal server error'}, 500)
+
+# ========== PROCESS LIFECYCLE ==========
+
+def create_app(config=None):
+    """Bind the database, load the knowledge base and start background jobs; returns the app.
+
+    Importing this module touches nothing: WSGI servers, the CLI (FLASK_APP=app:create_app)
+    and benchmarks call this once per process, with `config` overriding app.config (e.g.
+    SQLALCHEMY_DATABASE_URI). Creating tables and seeding users is `flask init-db`'s job.
+    """
+    if 'sqlalchemy' in app.extensions:
+        if config:
+            raise RuntimeError("create_app() already ran; config can only be passed to the first call")
+        return app
+    
+    log_pipeline.start()
+    app.config.update(config or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        busy_timeout_ms=SQLITE_BUSY_TIMEOUT
+    ))
+    db.init_app(app)
+    
+    global retrieval_index
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, SQLITE_PRAGMAS)
+        if METRICS_ENABLED:
+            query_counter.install(db.engine)
+        if SQL_DIAGNOSTICS:
+            query_diagnostics.install(db.engine)
+        # Settle what workers would otherwise each compute on their first request
+        sqlite_pragma_values()
+        
+        # Start from the saved retrieval index so only changed admin entries are re-indexed
+        retrieval_index = RetrievalIndex.load(RETRIEVAL_INDEX_PATH)
+        try:
+            refresh_knowledge_base()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning("⚠️ Knowledge base entries not loaded (database not initialized yet?): %s",
+                           e.__class__.__name__)
+    
+    if RETENTION_ENABLED:
+        retention_worker.start()
+    return app
+
+def configure_async_engine(engine):
+    """Same connection settings and SQL accounting as the sync engine (engine is the async one's sync_engine)"""
+    apply_sqlite_pragmas(engine, SQLITE_PRAGMAS)
+    if METRICS_ENABLED:
+        query_counter.install(engine)
+    if SQL_DIAGNOSTICS:
+        query_diagnostics.install(engine)
+
+def create_asgi_app(config=None):
+    """create_app() for ASGI servers, with the chat routes served on asyncio (see asgi.py)"""
+    from asgiref.wsgi import WsgiToAsgi  # Only needed when serving over ASGI
+    
+    create_app(config)
+    wsgi_app = WsgiToAsgi(app)
+    if not ASYNC_CHAT_API:
+        return wsgi_app
+    
+    if async_db.engine is None:
+        async_db.configure(
+            app.config['SQLALCHEMY_DATABASE_URI'],
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'],
+            on_engine=configure_async_engine
+        )
+        async_api.fallback = wsgi_app
+        # Lifespan shutdown: close async connections, then drain buffers like a WSGI worker exit
+        async_api.on_shutdown += [async_db.dispose, shutdown]
+    return async_api
+
+def after_fork():
+    """Per-worker setup when the app was imported once in a master process and forked"""
+    # Pooled connections must never be shared between processes
+    with app.app_context():
+        db.engine.dispose(close=False)
+    
+    # Threads, locks and process pools do not carry over a fork
+    for service in (log_pipeline, chat_buffer, email_dispatcher, stats_service, password_hasher, retention_worker):
+        service.after_fork()
+
+def shutdown():
+    """Drain buffered work and stop background threads (idempotent)"""
+    chat_buffer.stop()
+    email_dispatcher.stop()
+    retention_worker.stop()
+    stats_service.stop()
+    password_hasher.stop()
+    log_pipeline.stop()
+
+# ========== CLI COMMANDS ==========
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the schema and seed the admin/demo users (run once per deployment)"""
+    init_db()
+    print("✅ Database ready")
+
+@app.cli.command('reconcile-counters')
+def reconcile_counters_command():
+    """Rebuild per-user chat counters from the chat table"""
+    updated = reconcile_chat_counters()
+    print(f"✅ Chat counters rebuilt for {updated} users")
+
+@app.cli.command('backfill-analytics')
+@click.option('--days', type=int, default=None, help='Only rebuild the last N days')
+def backfill_analytics_command(days):
+    """Rebuild hourly/daily analytics rollups from the chat, user and feedback tables"""
+    backfill_analytics(days)
+
+@app.cli.command('backfill-sessions')
+def backfill_sessions_command():
+    """Group chats that have no chat session yet into sessions"""
+    backfill_chat_sessions()
+
+@app.cli.command('retention')
+@click.option('--full-vacuum', is_flag=True, help='Rewrite the database file afterwards (locks it while running)')
+def retention_command(full_vacuum):
+    """Run one retention pass now and print what it reclaimed"""
+    report = retention_worker.run_once()
+    if report is None:
+        print("⏳ Another process is running a retention pass; try again when it finishes")
+        return
+    for name, task in report['tasks'].items():
+        print(f"🧹 {name}: {task['rows']} rows in {task['batches']} batches ({task['seconds']}s)")
+    print(f"🧹 Maintenance: {report.get('maintenance')}")
+    if full_vacuum:
+        print(f"🧹 Full vacuum: {sqlite_maintenance(db.engine, full_vacuum=True)}")
+    print(f"✅ Retention pass finished in {report['seconds']}s{'' if report['complete'] else ' (time budget reached, run again to continue)'}")
+
 # ========== MAIN ==========
 
 if __name__ == "__main__":
+    # The development server sets up its own database; deployments run `flask init-db`
+    create_app()
+    with app.app_context():
+        init_db()
+    
     print("=" * 70)
     print(f"🚀 Starting {APP_NAME} API Server...")
     print("=" * 70)
@@ -1267,6 +3150,7 @@ if __name__ == "__main__":
     print(f"📊 Database: SQLite (health_ai.db) - FRESH START")
     print(f"📧 Email Service: {'Enabled' if EMAIL_USER else 'Simulation Mode'}")
     print(f"⚙️ Config: Max Chat History={MAX_CHAT_HISTORY}, Session Timeout={CHAT_SESSION_TIMEOUT}min")
+    print(f"🧹 Retention: {'every ' + str(RETENTION_INTERVAL_SECONDS) + 's' if RETENTION_ENABLED else 'Disabled'}, chats kept {f'{ANALYTICS_RETENTION_DAYS} days' if ANALYTICS_RETENTION_DAYS else 'forever'}")
     print("=" * 70)
     print("🌐 API Endpoints:")
     print("  - GET  /                    - API Information")
@@ -1279,14 +3163,22 @@ if __name__ == "__main__":
     print("  - PUT  /api/user/profile    - Update profile (Token)")
     print("  - GET  /api/user/chats      - Get chat history (Token)")
     print("  - POST /api/user/chat       - Save chat (Token)")
+    print("  - POST /api/user/chats/batch - Save many chats (Token)")
+    print("  - GET  /api/user/chats/search - Search chats (Token)")
+    print("  - GET  /api/user/sessions   - Chat sessions (Token)")
     print("  - DELETE /api/user/chats/clear - Clear chats (Token)")
     print(f"  - GET  /api/admin/dashboard - Admin dashboard (ONLY for {ADMIN_EMAIL})")
     print(f"  - GET  /api/admin/user/<email> - User details (ONLY for {ADMIN_EMAIL})")
     print(f"  - GET  /api/admin/users     - All users (ONLY for {ADMIN_EMAIL})")
+    print(f"  - GET  /api/admin/chats/search - Search all chats (ONLY for {ADMIN_EMAIL})")
     print(f"  - PUT  /api/admin/user/role - Update user role (ONLY for {ADMIN_EMAIL})")
+    print(f"  - GET  /api/admin/analytics - Analytics rollups (ONLY for {ADMIN_EMAIL})")
     print("  - POST /api/feedback        - Submit feedback")
     print("  - GET  /api/health          - Health check")
+    print("  - GET  /api/health/live     - Liveness probe")
     print("  - GET  /api/stats           - System statistics")
+    print("  - GET  /api/metrics         - Request metrics (Prometheus)")
+    print("  - POST /api/chat/respond    - Chatbot response")
     print("=" * 70)
     print("🔒 STRICT ROLE RULES:")
     print(f"   1. ONLY '{ADMIN_EMAIL}' gets Admin role")
@@ -1296,6 +3188,7 @@ if __name__ == "__main__":
     print("=" * 70)
     print(f"✅ Server running on {API_URL}")
     print(f"📞 Frontend should connect from {APP_URL}")
+    print("⚠️  Development server only. In production run: flask init-db, then gunicorn -c gunicorn.conf.py wsgi:application")
     print("=" * 70)
     
     app.run(
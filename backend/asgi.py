@@ -0,0 +1,6 @@
+# asgi.py - entry point for ASGI servers: uvicorn asgi:application --workers 4
+# The chat routes run on asyncio (ASYNC_CHAT_API); everything else is the Flask app in a thread pool.
+# uvicorn starts every worker from scratch (no preload); run `flask init-db` once before the first start.
+from app import create_asgi_app
+
+application = create_asgi_app()
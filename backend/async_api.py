@@ -0,0 +1,244 @@
+# async_api.py - ASGI front that serves selected routes on asyncio and hands the rest to the WSGI app
+import json
+import logging
+from urllib.parse import parse_qsl
+
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+# asyncio driver for each database backend (pip install aiosqlite greenlet / asyncpg / aiomysql)
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql'
+}
+
+
+def async_database_url(uri):
+    """The same database URL, pointed at its asyncio driver"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver known for {backend} databases')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class Request:
+    """The parts of an HTTP request an async handler needs"""
+    __slots__ = ('method', 'path', 'args', 'headers', 'body', 'remote_addr', 'endpoint', 'state')
+
+    def __init__(self, scope, body, endpoint=None):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = {}
+        for name, value in parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True):
+            self.args.setdefault(name, value)  # First value wins, like request.args.get
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                        for name, value in scope.get('headers', ())}
+        self.body = body
+        self.remote_addr = (scope.get('client') or (None,))[0]
+        self.endpoint = endpoint
+        self.state = {}  # Scratch space for hooks, like flask.g
+
+    def get_json(self):
+        """Parsed JSON body, or None when it is missing or malformed"""
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+    def bearer_token(self):
+        """JWT from the Authorization header, or None"""
+        auth_header = self.headers.get('authorization', '')
+        if auth_header.startswith('Bearer '):
+            return auth_header.split(' ')[1]
+        return None
+
+
+class Response:
+    __slots__ = ('body', 'status', 'content_type', 'headers')
+
+    def __init__(self, body, status=200, content_type='application/json', headers=None):
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+class AsyncAPI:
+    """ASGI application for a handful of routes that must not hold a thread.
+
+    Handlers registered with @route are coroutines taking a Request and
+    returning a Response. Every other request goes to `fallback` - usually
+    the Flask app behind asgiref's WsgiToAsgi, so both share one server -
+    and so do requests a route's `accept(request)` predicate turns down
+    (their body is replayed). `before_request` hooks run ahead of the
+    handler and short-circuit it by returning a Response; `after_request`
+    hooks see every response this app produced. Callables in
+    `on_shutdown` (plain or async) run when the server stops.
+    """
+
+    def __init__(self, fallback=None, dumps=json.dumps, cors_origin=None, max_body=1024 * 1024):
+        self.fallback = fallback
+        self.dumps = dumps
+        self.cors_origin = cors_origin  # Echoed back for this Origin only, like flask-cors
+        self.max_body = max_body
+
+        self.routes = {}  # (method, path) -> (endpoint, handler, accept)
+        self.before_request_hooks = []
+        self.after_request_hooks = []
+        self.on_shutdown = []
+
+        self.handled = 0
+        self.declined = 0
+        self.errors = 0
+
+    # ---------- registration ----------
+
+    def route(self, path, methods=('GET',), endpoint=None, accept=None):
+        """Register a coroutine handler; `endpoint` names it for hooks (defaults to the function name)"""
+        def register(handler):
+            for method in methods:
+                self.routes[(method, path)] = (endpoint or handler.__name__, handler, accept)
+            return handler
+        return register
+
+    def before_request(self, hook):
+        self.before_request_hooks.append(hook)
+        return hook
+
+    def after_request(self, hook):
+        """hook(request, response), a plain function; it must not raise"""
+        self.after_request_hooks.append(hook)
+        return hook
+
+    def json(self, payload, status=200, headers=None):
+        """JSON Response encoded like the WSGI app's responses"""
+        return Response(self.dumps(payload).encode(), status, headers=headers)
+
+    # ---------- ASGI ----------
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        route = self.routes.get((scope['method'], scope['path'])) if scope['type'] == 'http' else None
+        if route is None:
+            return await self.fallback(scope, receive, send)
+
+        body = await self._read_body(receive)
+        if body is None:
+            return await self._send(send, None, self.json({'error': 'Request body too large'}, 413))
+
+        endpoint, handler, accept = route
+        request = Request(scope, body, endpoint)
+        if accept is not None and not accept(request):
+            self.declined += 1
+            return await self.fallback(scope, self._replay(body, receive), send)
+
+        try:
+            response = None
+            for hook in self.before_request_hooks:
+                response = await hook(request)
+                if response is not None:
+                    break
+            else:
+                response = await handler(request)
+        except Exception:
+            self.errors += 1
+            logger.exception("❌ Error in async %s", endpoint)
+            response = self.json({'error': 'Internal server error'}, 500)
+
+        self.handled += 1
+        for hook in self.after_request_hooks:
+            hook(request, response)
+        await self._send(send, request, response)
+
+    async def _read_body(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    @staticmethod
+    def _replay(body, receive):
+        """receive() for the fallback: the body already read, then the live channel"""
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            return await receive()
+        return replay
+
+    async def _send(self, send, request, response):
+        headers = [(b'content-type', response.content_type.encode()),
+                   (b'content-length', str(len(response.body)).encode())]
+        headers += [(name.lower().encode(), str(value).encode()) for name, value in response.headers.items()]
+        origin = request.headers.get('origin') if request is not None else None
+        if origin and origin == self.cors_origin:
+            headers += [(b'access-control-allow-origin', origin.encode()), (b'vary', b'Origin')]
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': response.body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for callback in self.on_shutdown:
+                    result = callback()
+                    if hasattr(result, '__await__'):
+                        await result
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def stats(self):
+        """Requests served here, declined to the fallback, and failed"""
+        return {
+            'routes': sorted(f'{method} {path}' for method, path in self.routes),
+            'handled': self.handled,
+            'declined': self.declined,
+            'errors': self.errors
+        }
+
+
+class AsyncDatabase:
+    """Async engine and sessions for the app's database, built by configure()"""
+
+    def __init__(self):
+        self.engine = None
+        self._sessions = None
+
+    def configure(self, uri, engine_options=None, on_engine=None):
+        """Create the engine (no connection is opened yet); on_engine(sync_engine) can add event hooks"""
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        self.engine = create_async_engine(async_database_url(uri), **(engine_options or {}))
+        if on_engine is not None:
+            on_engine(self.engine.sync_engine)
+        self._sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def session(self):
+        if self._sessions is None:
+            raise RuntimeError('AsyncDatabase.configure() has not been called')
+        return self._sessions()
+
+    async def dispose(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+
+    def stats(self):
+        return {'driver': self.engine.url.drivername, 'pool': self.engine.pool.status()} if self.engine else None
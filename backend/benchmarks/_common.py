@@ -0,0 +1,116 @@
+# _common.py - shared setup for the backend benchmarks
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, insert
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def load_app(**env):
+    """Import the backend against a throwaway SQLite database"""
+    if 'DATABASE_URL' not in env:
+        db_dir = tempfile.mkdtemp(prefix='health_ai_bench_')
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    env.setdefault('RATE_LIMIT_ENABLED', 'False')  # Benchmarks hammer one user from one address
+    env.setdefault('RETENTION_ENABLED', 'False')  # Seeded history must not be pruned mid-run
+    os.environ.update({key: str(value) for key, value in env.items()})
+
+    import app as backend
+    backend.create_app()
+    with backend.app.app_context():
+        backend.db.create_all()
+        # As at startup against an existing database: the knowledge base version is known before requests
+        backend.refresh_knowledge_base()
+    return backend
+
+
+def seed(backend, users, chats_per_user=0, role='Regular User'):
+    """Bulk insert users (with a dummy password hash) and their chats"""
+    User, Chat, db = backend.User, backend.Chat, backend.db
+    now = datetime.utcnow()
+    with backend.app.app_context():
+        start = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+        db.session.execute(insert(User), [
+            {
+                'id': start + i,
+                'email': f'bench{start + i}@example.com',
+                'name': f'Bench User {start + i}',
+                'password_hash': 'bench',
+                'role': role,
+                'avatar': 'B',
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now
+            }
+            for i in range(users)
+        ])
+        if chats_per_user:
+            rows = []
+            for i in range(users):
+                for j in range(chats_per_user):
+                    rows.append({
+                        'user_id': start + i,
+                        'session_id': f'bench-session-{start + i}',
+                        'user_message': 'fever',
+                        'bot_response': 'Rest and drink plenty of fluids',
+                        'category': 'health',
+                        'created_at': now - timedelta(seconds=chats_per_user - j)
+                    })
+            db.session.execute(insert(Chat), rows)
+        db.session.commit()
+    return [f'bench{start + i}@example.com' for i in range(users)]
+
+
+def create_user(backend, email, role='Regular User'):
+    """Create (or fetch) a user and return its auth headers"""
+    with backend.app.app_context():
+        user = backend.User.query.filter_by(email=email).first()
+        if not user:
+            user = backend.User(email=email, name=email.split('@')[0], role=role,
+                                avatar=email[0].upper(), is_active=True, password_hash='bench')
+            backend.db.session.add(user)
+            backend.db.session.commit()
+        token = backend.create_auth_token(email)
+    return {'Authorization': f'Bearer {token}'}
+
+
+@contextmanager
+def count_queries(backend):
+    """Count SQL statements sent to the database inside the block"""
+    counter = {'count': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+
+    with backend.app.app_context():
+        engine = backend.db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def timed(fn, repeat=5):
+    """Run fn `repeat` times and return the best wall time in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
@@ -0,0 +1,75 @@
+# bench_analytics.py - a year of analytics from rollups vs aggregating the raw chat table
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from _common import load_app, seed, create_user, count_queries, timed
+
+
+def bench_analytics(users=500, chats=400000, days=365):
+    backend = load_app()
+    client = backend.app.test_client()
+    Chat, db = backend.Chat, backend.db
+    seed(backend, users)
+    headers = create_user(backend, backend.ADMIN_EMAIL, role='Admin')
+
+    # Chats spread over the last year
+    now = datetime.utcnow()
+    random.seed(42)
+    with backend.app.app_context():
+        user_ids = [user_id for user_id, in db.session.execute(select(backend.User.id))]
+        for offset in range(0, chats, 50000):
+            db.session.execute(insert(Chat), [{
+                'user_id': random.choice(user_ids),
+                'session_id': 'bench',
+                'user_message': 'fever',
+                'bot_response': 'Rest and drink plenty of fluids',
+                'category': random.choice(('health', 'symptoms', 'nutrition', 'general')),
+                'created_at': now - timedelta(seconds=random.randint(0, days * 86400))
+            } for _ in range(min(50000, chats - offset))])
+        db.session.commit()
+
+    print(f"📈 Analytics benchmark ({chats} chats from {users} users over {days} days)")
+
+    with backend.app.app_context():
+        started = time.perf_counter()
+        written = backend.backfill_analytics()
+        backfill_ms = (time.perf_counter() - started) * 1000
+    print(f"backfill: {written} rollup rows in {backfill_ms:.0f} ms")
+
+    # What a dashboard would otherwise run: GROUP BY over every chat in the range
+    start = now - timedelta(days=days)
+
+    def raw_year():
+        with backend.app.app_context():
+            day = func.date(Chat.created_at)
+            db.session.execute(
+                select(day, Chat.category, func.count(), func.count(func.distinct(Chat.user_id)))
+                .where(Chat.created_at >= start).group_by(day, Chat.category)
+            ).all()
+            db.session.remove()
+
+    path = f"/api/admin/analytics?granularity=day&from={start.date().isoformat()}&to={(now + timedelta(days=1)).date().isoformat()}"
+    with count_queries(backend) as counter:
+        response = client.get(path, headers=headers)
+    body = response.get_json()
+    assert response.status_code == 200, body
+
+    print(f"{'target':<32} {'rows read':>10} {'best ms':>9}")
+    print(f"{'raw GROUP BY over chats':<32} {chats:>10} {timed(raw_year, 3):>9.1f}")
+    print(f"{'GET /api/admin/analytics (day)':<32} {body['rollup_rows']:>10} {timed(lambda: client.get(path, headers=headers)):>9.1f}")
+    month_path = path.replace('granularity=day', 'granularity=month')
+    month_rows = client.get(month_path, headers=headers).get_json()['rollup_rows']
+    print(f"{'GET /api/admin/analytics (month)':<32} {month_rows:>10} {timed(lambda: client.get(month_path, headers=headers)):>9.1f}")
+    print(f"queries per report request: {counter['count']}")
+
+    ok = body['totals']['chats'] == chats and body['rollup_rows'] <= 5000
+    print("✅ A year of reports reads a few thousand rollup rows" if ok else "❌ Report totals or row budget off")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_analytics() else 1)
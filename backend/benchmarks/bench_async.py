@@ -0,0 +1,197 @@
+# bench_async.py - 1k simultaneous long-lived clients on the chat routes: sync (gunicorn, WSGI) vs async (uvicorn, ASGI)
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from _common import BACKEND_DIR, load_app, seed, create_user, percentile
+
+SERVERS = (
+    ('sync: gunicorn gthread', ['-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'], {}),
+    ('sync: uvicorn + WsgiToAsgi', ['-m', 'uvicorn', 'asgi:application'], {'ASYNC_CHAT_API': 'False'}),
+    ('async: uvicorn + aiosqlite', ['-m', 'uvicorn', 'asgi:application'], {'ASYNC_CHAT_API': 'True'}),
+)
+MESSAGES = ('I have a fever', 'how much water should I drink', 'tips for better sleep', 'headache after lunch')
+
+
+async def http_request(reader, writer, method, path, headers, body=b''):
+    """One HTTP/1.1 request on a keep-alive connection; returns the status code"""
+    lines = [f'{method} {path} HTTP/1.1', 'Host: 127.0.0.1', f'Content-Length: {len(body)}']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+    await writer.drain()
+
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(index, port, tokens, deadline, think, timeout, results):
+    """A long-lived client: one connection, a chat request every `think` seconds (jittered)"""
+    headers = {'Authorization': f'Bearer {tokens[index % len(tokens)]}', 'Content-Type': 'application/json'}
+    latencies, failures, timeouts = [], 0, 0
+    await asyncio.sleep(random.random() * think)  # Spread the first requests over one think period
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        results.append(([], 0, 0, False))
+        return
+
+    step = index
+    while time.perf_counter() < deadline:
+        kind = step % 3
+        if kind == 0:
+            request = ('GET', '/api/user/chats?limit=20', b'')
+        elif kind == 1:
+            request = ('POST', '/api/user/chat', json.dumps({
+                'session_id': f'async-{index}', 'user_message': 'hi', 'bot_response': 'hello'}).encode())
+        else:
+            request = ('POST', '/api/chat/respond', json.dumps({'message': random.choice(MESSAGES)}).encode())
+
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(http_request(reader, writer, *request[:2], headers, request[2]), timeout)
+            latencies.append((time.perf_counter() - started) * 1000)
+            failures += status != 200
+        except asyncio.TimeoutError:
+            timeouts += 1
+            break  # The connection is in an unknown state; this client gave up
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            failures += 1
+            break
+        step += 1
+        await asyncio.sleep(think * (0.5 + random.random()))
+
+    writer.close()
+    results.append((latencies, failures, timeouts, True))
+
+
+async def drive(port, tokens, clients, seconds, think, timeout):
+    results = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(client(i, port, tokens, deadline, think, timeout, results) for i in range(clients)))
+    return results
+
+
+def run_clients(port, tokens, clients, seconds, think, timeout):
+    """Runs inside a child process so the clients do not share the server's interpreter"""
+    results = asyncio.run(drive(port, tokens, clients, seconds, think, timeout))
+    latencies = [sample for samples, _, _, _ in results for sample in samples]
+    print(json.dumps({
+        'connected': sum(1 for _, _, _, connected in results if connected),
+        'served': sum(1 for samples, failed, timed_out, _ in results if samples and not failed and not timed_out),
+        'requests': len(latencies),
+        'failures': sum(failed for _, failed, _, _ in results),
+        'timeouts': sum(timed_out for _, _, timed_out, _ in results),
+        'p50_ms': percentile(latencies, 50) if latencies else None,
+        'p99_ms': percentile(latencies, 99) if latencies else None
+    }))
+
+
+def wait_ready(port, timeout=60):
+    import http.client
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/health/live')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def hold_write_lock(database_path, hold, every, stop):
+    """A slow writer: takes the SQLite write lock for `hold` seconds every `every` seconds"""
+    import sqlite3
+    connection = sqlite3.connect(database_path, timeout=30, isolation_level=None)
+    while not stop.wait(every - hold):
+        connection.execute('BEGIN IMMEDIATE')
+        time.sleep(hold)
+        connection.execute('COMMIT')
+    connection.close()
+
+
+def run_server(args, env, port, tokens, clients, seconds, think, timeout, lock=None):
+    if args[1] == 'uvicorn':
+        args = args + ['--port', str(port), '--backlog', '4096', '--timeout-keep-alive', '75', '--log-level', 'warning']
+    server = subprocess.Popen([sys.executable] + args, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(port):
+            raise RuntimeError(f"{' '.join(args)} did not come up")
+        stop = threading.Event()
+        if lock:
+            threading.Thread(target=hold_write_lock, args=(lock[0], lock[1], lock[2], stop), daemon=True).start()
+        try:
+            output = subprocess.run(
+                [sys.executable, __file__, '--clients', str(port), str(clients), str(seconds), str(think), str(timeout)],
+                input=json.dumps(tokens), capture_output=True, text=True, check=True, timeout=seconds + timeout + 120
+            ).stdout
+        finally:
+            stop.set()
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(60)
+
+
+def bench_async(clients=1000, seconds=20, think=4.0, timeout=10.0, users=200, chats_per_user=50,
+                lock_hold=0.25, lock_every=1.0):
+    db_dir = tempfile.mkdtemp(prefix='health_ai_async_')
+    database_path = os.path.join(db_dir, 'bench.db')
+    database_url = f"sqlite:///{database_path}"
+    backend = load_app(DATABASE_URL=database_url)
+    emails = seed(backend, users, chats_per_user)
+    tokens = [create_user(backend, email)['Authorization'].split(' ')[1] for email in emails]
+
+    print(f"⚡ Async chat API benchmark ({clients} simultaneous keep-alive clients, one request per ~{think:.0f}s each, "
+          f"{seconds}s per run, {timeout:.0f}s client timeout, {os.cpu_count()} CPU)")
+    print(f"{'scenario':<18} {'server':<28} {'served':>7} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>9} {'fail':>5} {'timeout':>8}")
+
+    scenarios = (
+        ('steady', None),
+        (f'{lock_hold * 1000:.0f}ms lock / {lock_every:.0f}s', (database_path, lock_hold, lock_every)),
+    )
+    results = {}
+    port = 5400
+    for scenario, lock in scenarios:
+        for label, args, extra_env in SERVERS:
+            port += 1
+            env = dict(os.environ, DATABASE_URL=database_url, RATE_LIMIT_ENABLED='False', RETENTION_ENABLED='False',
+                       SERVER_WORKERS='1', SERVER_BIND=f'127.0.0.1:{port}', SERVER_KEEPALIVE='75', **extra_env)
+            results[scenario, label] = row = run_server(args, env, port, tokens, clients, seconds, think, timeout, lock)
+            p50 = f"{row['p50_ms']:.1f}" if row['p50_ms'] is not None else '-'
+            p99 = f"{row['p99_ms']:.1f}" if row['p99_ms'] is not None else '-'
+            print(f"{scenario:<18} {label:<28} {row['served']:>7} {row['requests'] / seconds:>7.0f} {p50:>8} {p99:>9} "
+                  f"{row['failures']:>5} {row['timeouts']:>8}")
+
+    ok = True
+    for scenario, _ in scenarios:
+        sync, async_ = results[scenario, SERVERS[0][0]], results[scenario, SERVERS[2][0]]
+        ok = ok and async_['served'] >= sync['served'] and async_['failures'] == 0
+        print(f"{'✅' if async_['served'] >= sync['served'] else '❌'} {scenario}: async served "
+              f"{async_['served']}/{clients} clients cleanly, sync gunicorn {sync['served']}/{clients}; "
+              f"p99 {async_['p99_ms'] or 0:.0f} ms vs {sync['p99_ms'] or 0:.0f} ms")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--clients':
+        port, clients, seconds = (int(arg) for arg in sys.argv[2:5])
+        run_clients(port, json.loads(sys.stdin.read()), clients, seconds, float(sys.argv[5]), float(sys.argv[6]))
+        sys.exit(0)
+    sys.exit(0 if bench_async() else 1)
@@ -0,0 +1,46 @@
+# bench_auth_cache.py - /api/user/chats requests/sec with and without the auth cache
+import sys
+import time
+
+from _common import load_app, seed, create_user, count_queries
+
+
+def run(client, headers, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get('/api/user/chats', headers=headers)
+        assert response.status_code == 200, response.get_json()
+    return requests / (time.perf_counter() - started)
+
+
+def bench_auth_cache(requests=2000, chats=20):
+    backend = load_app()
+    client = backend.app.test_client()
+    seed(backend, 1000)
+    headers = create_user(backend, 'bench-chats@example.com')
+    for i in range(chats):
+        client.post('/api/user/chat', headers=headers, json={
+            'session_id': 'bench', 'user_message': f'question {i}', 'bot_response': 'answer'
+        })
+
+    print("🔑 Auth cache benchmark (GET /api/user/chats)")
+    ttl = backend.AUTH_CACHE_TTL
+
+    backend.AUTH_CACHE_TTL = 0
+    with count_queries(backend) as uncached_queries:
+        uncached = run(client, headers, requests)
+
+    backend.AUTH_CACHE_TTL = ttl or 60
+    backend.user_cache.ttl = backend.token_cache.ttl = backend.AUTH_CACHE_TTL
+    with count_queries(backend) as cached_queries:
+        cached = run(client, headers, requests)
+
+    print(f"   without cache: {uncached:8.0f} req/s, {uncached_queries['count'] / requests:.1f} queries/request")
+    print(f"   with cache:    {cached:8.0f} req/s, {cached_queries['count'] / requests:.1f} queries/request")
+    print(f"   speedup:       {cached / uncached:8.2f}x")
+    print(f"   user cache:    {backend.user_cache.stats()}")
+    return cached_queries['count'] < uncached_queries['count']
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_auth_cache() else 1)
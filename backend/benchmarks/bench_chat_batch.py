@@ -0,0 +1,57 @@
+# bench_chat_batch.py - messages/sec through POST /api/user/chat vs /api/user/chats/batch
+import sys
+import time
+
+from _common import load_app, create_user
+
+
+def message(index):
+    return {
+        'session_id': 'bench-session',
+        'user_message': f'fever question {index}',
+        'bot_response': 'Rest and drink plenty of fluids',
+        'category': 'health'
+    }
+
+
+def bench_chat_batch(messages=2000, batch_size=100):
+    backend = load_app()
+    client = backend.app.test_client()
+    headers = create_user(backend, 'bench-batch@example.com')
+    client.get('/api/user/profile', headers=headers)  # Warm the auth cache
+
+    print(f"📦 Chat ingestion benchmark ({messages} messages)")
+
+    started = time.perf_counter()
+    for index in range(messages):
+        response = client.post('/api/user/chat', json=message(index), headers=headers)
+        assert response.status_code == 200, response.get_json()
+    single_rate = messages / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for offset in range(0, messages, batch_size):
+        batch = [message(index) for index in range(offset, min(offset + batch_size, messages))]
+        response = client.post('/api/user/chats/batch', json=batch, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        assert len(response.get_json()['chat_ids']) == len(batch)
+    batch_rate = messages / (time.perf_counter() - started)
+
+    with backend.app.app_context():
+        user = backend.User.query.filter_by(email='bench-batch@example.com').first()
+        assert user.chat_count == 2 * messages, user.chat_count
+
+    speedup = batch_rate / single_rate
+    print(f"{'route':<34} {'msgs/sec':>10}")
+    print(f"{'POST /api/user/chat':<34} {single_rate:>10.0f}")
+    print(f"{f'POST /api/user/chats/batch ({batch_size})':<34} {batch_rate:>10.0f}")
+
+    if speedup < 10:
+        print(f"❌ Batch route is only {speedup:.1f}x faster")
+        return False
+
+    print(f"✅ Batch route is {speedup:.1f}x faster")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_chat_batch() else 1)
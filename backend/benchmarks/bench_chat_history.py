@@ -0,0 +1,83 @@
+# bench_chat_history.py - full-array history vs keyset pages vs NDJSON streaming
+import sys
+import time
+import tracemalloc
+
+from _common import load_app, seed, create_user
+
+
+def measure(fn):
+    """Return (milliseconds, peak traced MB) for one call"""
+    started = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - started) * 1000
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_chat_history(chats=100000):
+    backend = load_app()
+    client = backend.app.test_client()
+    email = seed(backend, 1, chats)[0]
+    headers = create_user(backend, email)
+    client.get('/api/user/chats?limit=1', headers=headers)  # Warm caches
+
+    print(f"📜 Chat history benchmark ({chats} chats for one user)")
+
+    # The old endpoint shape: every row materialized into one JSON array
+    def full_array():
+        backend.MAX_CHAT_HISTORY = chats
+        response = client.get('/api/user/chats', headers=headers)
+        backend.MAX_CHAT_HISTORY = 100
+        assert response.get_json()['count'] == chats
+
+    def stream_ndjson():
+        response = client.get('/api/user/chats?format=ndjson', headers=headers, buffered=False)
+        lines = sum(chunk.count(b'\n') for chunk in response.iter_encoded())
+        assert lines == chats
+
+    # Cursor for a page half way through the history
+    cursor = None
+    with backend.app.app_context():
+        middle = backend.Chat.query.order_by(backend.Chat.created_at.desc(), backend.Chat.id.desc())\
+            .offset(chats // 2).first()
+        cursor = backend.encode_cursor(middle)
+
+    def deep_page():
+        response = client.get(f'/api/user/chats?limit=100&before={cursor}', headers=headers)
+        assert response.get_json()['count'] == 100
+
+    def deep_keyset():
+        created_at, chat_id = backend.decode_cursor(cursor)
+        with backend.app.app_context():
+            Chat = backend.Chat
+            rows = Chat.query.filter(Chat.user_id == 1, backend.or_(
+                Chat.created_at < created_at,
+                backend.and_(Chat.created_at == created_at, Chat.id < chat_id)
+            )).order_by(Chat.created_at.desc(), Chat.id.desc()).limit(100).all()
+            assert len(rows) == 100
+
+    def deep_offset():
+        with backend.app.app_context():
+            rows = backend.Chat.query.filter_by(user_id=1)\
+                .order_by(backend.Chat.created_at.desc(), backend.Chat.id.desc())\
+                .offset(chats // 2).limit(100).all()
+            assert len(rows) == 100
+
+    print(f"{'mode':<28} {'ms':>9} {'peak MB':>9}")
+    for label, fn in [('full JSON array', full_array),
+                      ('NDJSON stream', stream_ndjson),
+                      ('keyset page (middle, API)', deep_page),
+                      ('keyset page (middle, SQL)', deep_keyset),
+                      ('OFFSET page (middle, SQL)', deep_offset)]:
+        elapsed, peak = measure(fn)
+        print(f"{label:<28} {elapsed:>9.1f} {peak:>9.1f}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_chat_history() else 1)
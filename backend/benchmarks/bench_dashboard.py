@@ -0,0 +1,39 @@
+# bench_dashboard.py - /api/admin/dashboard latency and query count as users grow
+import sys
+
+from _common import load_app, seed, create_user, count_queries, timed
+
+
+def bench_dashboard(steps=(100, 1000, 5000), chats_per_user=5):
+    backend = load_app()
+    client = backend.app.test_client()
+    headers = create_user(backend, 'bench-admin@example.com', role='Admin')
+    client.get('/api/admin/dashboard', headers=headers)  # Warm the auth cache
+
+    print("📊 Admin dashboard benchmark")
+    print(f"{'users':>8} {'chats':>9} {'queries':>8} {'best ms':>10}")
+
+    query_counts = []
+    seeded = 0
+    for total in steps:
+        seed(backend, total - seeded, chats_per_user)
+        seeded = total
+
+        with count_queries(backend) as counter:
+            response = client.get('/api/admin/dashboard', headers=headers)
+        assert response.status_code == 200, response.get_json()
+        query_counts.append(counter['count'])
+
+        elapsed = timed(lambda: client.get('/api/admin/dashboard', headers=headers))
+        print(f"{total:>8} {total * chats_per_user:>9} {counter['count']:>8} {elapsed:>10.1f}")
+
+    if len(set(query_counts)) != 1:
+        print(f"❌ Query count grows with users: {query_counts}")
+        return False
+
+    print(f"✅ Query count is constant ({query_counts[0]}) as users grow")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_dashboard() else 1)
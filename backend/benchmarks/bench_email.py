@@ -0,0 +1,103 @@
+# bench_email.py - request-otp latency with inline SMTP vs the background dispatcher
+#
+# Needs a local SMTP stand-in: pip install aiosmtpd
+import asyncio
+import smtplib
+import socket
+import sys
+import time
+from email.mime.text import MIMEText
+
+from _common import load_app, seed, percentile
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    print("❌ aiosmtpd is required for this benchmark: pip install aiosmtpd")
+    sys.exit(1)
+
+RELAY_DELAY = 0.05  # Seconds the stand-in relay spends on each connection and message
+
+
+class SlowRelay:
+    """aiosmtpd handler that behaves like a slow remote relay"""
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(RELAY_DELAY)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(RELAY_DELAY)
+        self.received += 1
+        return '250 OK'
+
+
+def send_inline(host, port, to_email):
+    """What send_email used to do on the request thread"""
+    msg = MIMEText('otp', 'html')
+    msg['From'] = 'bench@example.com'
+    msg['To'] = to_email
+    msg['Subject'] = 'Password Reset OTP'
+    server = smtplib.SMTP(host, port)
+    server.ehlo()
+    server.send_message(msg)
+    server.quit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bench_email(messages=100):
+    handler = SlowRelay()
+    host, port = '127.0.0.1', free_port()
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+
+    backend = load_app()
+    client = backend.app.test_client()
+    emails = seed(backend, messages)
+
+    print(f"📧 Email benchmark ({messages} OTP requests, relay delay {RELAY_DELAY * 1000:.0f}ms)")
+
+    # Inline: one connection per message on the request thread
+    inline = []
+    for email in emails:
+        started = time.perf_counter()
+        send_inline(host, port, email)
+        inline.append((time.perf_counter() - started) * 1000)
+
+    # Queued: request_otp returns once the message is on the dispatcher queue
+    backend.EMAIL_USER, backend.EMAIL_PASSWORD = 'bench@example.com', 'bench'
+    backend.email_dispatcher = backend.EmailDispatcher(host, port, sender='bench@example.com', use_tls=False)
+    queued = []
+    drain_started = time.perf_counter()
+    for email in emails:
+        started = time.perf_counter()
+        response = client.post('/api/auth/request-otp', json={'email': email})
+        queued.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.get_json()
+    backend.email_dispatcher.join()
+    drain = time.perf_counter() - drain_started
+    stats = backend.email_dispatcher.stats()
+    backend.email_dispatcher.stop()
+    controller.stop()
+
+    print(f"   inline send    p50 {percentile(inline, 50):7.1f}ms  p99 {percentile(inline, 99):7.1f}ms")
+    print(f"   queued request p50 {percentile(queued, 50):7.1f}ms  p99 {percentile(queued, 99):7.1f}ms")
+    print(f"   queue drained in {drain:.2f}s over {stats['connections']} connection(s), {stats['batches']} batch(es)")
+    print(f"   dispatcher: {stats}")
+
+    ok = stats['sent'] == messages and handler.received == 2 * messages
+    print("✅ All messages delivered" if ok else "❌ Some messages were not delivered")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_email() else 1)
@@ -0,0 +1,34 @@
+# bench_health.py - /api/health and /api/stats latency and query count with a populated database
+import sys
+
+from _common import load_app, seed, count_queries, timed
+
+
+def bench_health(users=5000, chats_per_user=40):
+    backend = load_app()
+    client = backend.app.test_client()
+    seed(backend, users, chats_per_user)
+
+    print(f"🩺 Health/stats benchmark ({users} users, {users * chats_per_user} chats)")
+    print(f"{'target':<28} {'queries':>8} {'best ms':>9}")
+
+    # What the endpoints used to do on every poll: count everything
+    with count_queries(backend) as counter:
+        backend.load_statistics()
+    print(f"{'full recount (old path)':<28} {counter['count']:>8} {timed(backend.load_statistics):>9.2f}")
+
+    client.get('/api/stats')  # First read loads the counters
+    ok = True
+    for path, budget in (('/api/health', 1), ('/api/stats', 0), ('/api/health/live', 0)):
+        with count_queries(backend) as counter:
+            response = client.get(path)
+        assert response.status_code == 200, response.get_json()
+        ok = ok and counter['count'] <= budget
+        print(f"{path:<28} {counter['count']:>8} {timed(lambda: client.get(path)):>9.2f}")
+
+    print("✅ Polled endpoints no longer count rows" if ok else "❌ Polled endpoints still query the database")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_health() else 1)
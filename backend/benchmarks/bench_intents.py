@@ -0,0 +1,77 @@
+# bench_intents.py - intent matching latency as the number of intents grows
+import random
+import string
+import sys
+import time
+
+import _common  # noqa: F401 - puts the backend on sys.path
+from _common import percentile
+from intent_engine import IntentEngine
+from knowledge_base import KNOWLEDGE_BASE, INTENTS, TOPICS, FALLBACK_RESPONSE
+
+
+def synthetic_intents(count, rng):
+    """Real intents followed by `count` random ones with 3 keywords each"""
+    intents = list(INTENTS)
+    for index in range(count):
+        keywords = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 9)))
+                    for _ in range(3)]
+        intents.append({'name': f'synthetic.{index}', 'category': 'general',
+                        'keywords': keywords, 'answer': f'answer {index}'})
+    return intents
+
+
+def linear_match(intents, message):
+    """The original approach: test every intent's keywords in order"""
+    msg = message.lower().strip()
+    for intent in intents:
+        if any(keyword in msg for keyword in intent['keywords']):
+            return intent['name']
+    return 'fallback'
+
+
+def bench_intents(sizes=(100, 1000, 10000, 50000), queries=2000):
+    rng = random.Random(42)
+    print("🧠 Intent matching benchmark (per-query latency)")
+    print(f"{'intents':>8} {'build s':>8} {'p50 µs':>8} {'p99 µs':>8} {'linear p50 µs':>14}")
+
+    ok = True
+    for size in sizes:
+        intents = synthetic_intents(size, rng)
+        started = time.perf_counter()
+        engine = IntentEngine(KNOWLEDGE_BASE, intents, TOPICS, FALLBACK_RESPONSE)
+        build = time.perf_counter() - started
+
+        # Mix of real questions and messages hitting synthetic keywords
+        messages = []
+        for _ in range(queries):
+            if rng.random() < 0.5:
+                messages.append(rng.choice(['fever treatment', 'what is text analytics',
+                                            'recommended books for nlp', 'no idea what to ask']))
+            else:
+                intent = rng.choice(intents[len(INTENTS):])
+                messages.append(f"tell me about {rng.choice(intent['keywords'])} please")
+
+        samples = []
+        for message in messages:
+            started = time.perf_counter()
+            engine.match(message)
+            samples.append((time.perf_counter() - started) * 1e6)
+
+        linear = []
+        for message in messages[:200]:
+            started = time.perf_counter()
+            linear_match(intents, message)
+            linear.append((time.perf_counter() - started) * 1e6)
+
+        p99 = percentile(samples, 99)
+        ok = ok and p99 < 1000
+        print(f"{len(intents):>8} {build:>8.2f} {percentile(samples, 50):>8.1f} {p99:>8.1f} "
+              f"{percentile(linear, 50):>14.1f}")
+
+    print("✅ Matching stays sub-millisecond" if ok else "❌ Matching exceeded 1ms at p99")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_intents() else 1)
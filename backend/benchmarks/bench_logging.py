@@ -0,0 +1,96 @@
+# bench_logging.py - save_chat latency while stdout goes to a slow consumer (a busy log shipper, a full pipe)
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from _common import BACKEND_DIR, percentile
+
+CONFIGS = (
+    ('sync, every record (like print)', {'LOG_QUEUE_SIZE': '0', 'LOG_SAMPLING': ''}, True),
+    ('sync, every record', {'LOG_QUEUE_SIZE': '0', 'LOG_SAMPLING': ''}, False),
+    ('queue, every record', {'LOG_QUEUE_SIZE': '10000', 'LOG_SAMPLING': ''}, True),
+    ('queue + sampling (default)', {'LOG_QUEUE_SIZE': '10000', 'LOG_SAMPLING': 'chat_saved=100'}, True),
+)
+
+
+def run_child(threads, requests):
+    """Runs inside a child process whose stdout is the slow pipe; reports on stderr"""
+    from _common import load_app, create_user
+    backend = load_app(CHAT_WRITE_MODE='sync')
+    payload = {'session_id': 'bench-logging', 'user_message': 'I have a fever', 'bot_response': 'Rest and drink fluids'}
+    headers = [create_user(backend, f'logging{i}@example.com') for i in range(threads)]
+    latencies = []
+
+    def worker(index):
+        client = backend.app.test_client()
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.post('/api/user/chat', json=payload, headers=headers[index])
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200
+        latencies.extend(samples)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = backend.log_pipeline.stats()
+    sys.stderr.write(json.dumps({
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'req_s': len(latencies) / elapsed,
+        'dropped': stats['dropped']
+    }) + '\n')
+    sys.stderr.flush()
+    os._exit(0)  # Leave what is still queued; draining it through the slow pipe is not the point
+
+
+def consume(pipe, slow, chunk=1024, pause=0.1):
+    """Read the child's stdout; slow=True reads about 10 KB/s, like a consumer that cannot keep up"""
+    while True:
+        data = pipe.read1(chunk) if slow else pipe.read1(65536)
+        if not data:
+            return
+        if slow:
+            time.sleep(pause)
+
+
+def bench_logging(threads=2, requests=1000):
+    print(f"🪵 Logging benchmark (POST /api/user/chat, {threads} threads x {requests} requests, "
+          f"stdout read at ~10 KB/s unless noted)")
+    print(f"{'configuration':<34} {'consumer':>8} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'dropped':>8}")
+
+    results = {}
+    for label, extra_env, slow in CONFIGS:
+        env = dict(os.environ, **extra_env, LOG_FORMAT='json', LOG_LEVEL='INFO',
+                   RATE_LIMIT_ENABLED='False', RETENTION_ENABLED='False')
+        child = subprocess.Popen([sys.executable, __file__, '--child', str(threads), str(requests)], cwd=BACKEND_DIR,
+                                 env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        reader = threading.Thread(target=consume, args=(child.stdout, slow), daemon=True)
+        reader.start()
+        report = child.stderr.read().decode()
+        child.wait()
+        results[label, slow] = row = json.loads(report.strip().splitlines()[-1])
+        print(f"{label:<34} {'slow' if slow else 'fast':>8} {row['req_s']:>7.0f} {row['p50_ms']:>8.2f} "
+              f"{row['p99_ms']:>8.2f} {row['dropped']:>8}")
+
+    blocking = results[CONFIGS[0][0], True]['p99_ms']
+    queued = results[CONFIGS[3][0], True]['p99_ms']
+    ok = queued < blocking
+    print(f"{'✅' if ok else '❌'} With a slow consumer, p99 is {queued:.1f} ms through the queue "
+          f"vs {blocking:.1f} ms writing synchronously")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(int(sys.argv[2]), int(sys.argv[3]))
+    sys.exit(0 if bench_logging() else 1)
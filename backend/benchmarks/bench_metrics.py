@@ -0,0 +1,69 @@
+# bench_metrics.py - cost of the request metrics (/api/metrics) on the save_chat path
+#
+# Instrumented and bare requests run in alternating blocks in one process, so disk and
+# CPU drift (each save_chat is a commit) hits both sides alike.
+import statistics
+import time
+
+from _common import load_app, create_user
+
+
+def set_metrics(backend, enabled):
+    """Toggle the request hooks and the engine's cursor listeners, as METRICS_ENABLED would"""
+    backend.METRICS_ENABLED = enabled
+    with backend.app.app_context():
+        if enabled:
+            backend.query_counter.install(backend.db.engine)
+        else:
+            backend.query_counter.uninstall(backend.db.engine)
+
+
+def bench_metrics(blocks=40, block_size=50, warmup=200, budget=0.05):
+    backend = load_app(METRICS_ENABLED='True', CHAT_WRITE_MODE='sync')
+    client = backend.app.test_client()
+    headers = create_user(backend, 'metrics@example.com')
+    payload = {'session_id': 'bench-metrics', 'user_message': 'I have a fever', 'bot_response': 'Rest and drink fluids'}
+
+    def save_chat():
+        started = time.perf_counter()
+        response = client.post('/api/user/chat', json=payload, headers=headers)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return elapsed * 1e6
+
+    for _ in range(warmup):
+        save_chat()
+
+    samples = {True: [], False: []}
+    current = True
+    for block in range(blocks):
+        # on, off, off, on, on, off ... so neither side always runs first
+        for enabled in ((True, False) if block % 2 == 0 else (False, True)):
+            if enabled != current:
+                set_metrics(backend, enabled)
+                current = enabled
+            samples[enabled] += [save_chat() for _ in range(block_size)]
+    if not current:
+        set_metrics(backend, True)
+
+    started = time.perf_counter()
+    body = client.get('/api/metrics').get_data()
+    render_us = (time.perf_counter() - started) * 1e6
+
+    on, off = statistics.median(samples[True]), statistics.median(samples[False])
+    overhead = on / off - 1
+    print(f"📈 Metrics overhead benchmark (POST /api/user/chat, {blocks} blocks of {block_size} requests "
+          f"per side, alternating)")
+    print(f"{'metrics':<8} {'median µs':>10} {'p90 µs':>9}")
+    for label, values in (('off', samples[False]), ('on', samples[True])):
+        print(f"{label:<8} {statistics.median(values):>10.1f} {statistics.quantiles(values, n=10)[-1]:>9.1f}")
+    print(f"/api/metrics render: {render_us:.0f} µs for {len(body)} bytes")
+    ok = overhead < budget
+    print(f"{'✅' if ok else '❌'} Instrumented save_chat costs {overhead:+.1%} "
+          f"({on - off:+.1f} µs per request, budget {budget:.0%})")
+    return ok
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(0 if bench_metrics() else 1)
@@ -0,0 +1,84 @@
+# bench_rate_limit.py - legitimate latency while one address floods /api/auth/login
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import load_app, create_user, percentile
+
+
+def bench_rate_limit(server_threads=4, attack_rate=50, seconds=5):
+    backend = load_app(RATE_LIMIT_ENABLED='True')
+    client = backend.app.test_client()
+
+    # A real password hash, so every login attempt costs what it costs in production
+    with backend.app.app_context():
+        victim = backend.User(email='victim@example.com', name='Victim', avatar='V', is_active=True)
+        victim.set_password('correct horse battery staple')
+        backend.db.session.add(victim)
+        backend.db.session.commit()
+    headers = create_user(backend, 'legit@example.com')
+
+    def attempt(index):
+        return client.post('/api/auth/login', environ_base={'REMOTE_ADDR': '203.0.113.7'},
+                           json={'email': 'victim@example.com', 'password': f'guess{index}'}).status_code
+
+    def profile(queued_at):
+        response = client.get('/api/user/profile', headers=headers, environ_base={'REMOTE_ADDR': '198.51.100.2'})
+        assert response.status_code == 200, response.status_code
+        return (time.perf_counter() - queued_at) * 1000
+
+    def run(label):
+        # The pool stands in for a server's request threads; the attacker does
+        # not wait for answers, it just keeps sending attack_rate requests/sec
+        backend.rate_limiter.backend.reset()
+        pool = ThreadPoolExecutor(max_workers=server_threads)
+        attacks, legit = [], []
+        started = time.perf_counter()
+        next_attack = next_legit = started
+        while time.perf_counter() - started < seconds:
+            now = time.perf_counter()
+            if now >= next_attack:
+                attacks.append(pool.submit(attempt, len(attacks)))
+                next_attack += 1.0 / attack_rate
+            if now >= next_legit:
+                legit.append(pool.submit(profile, now))
+                next_legit += 0.1  # Stays under RATE_LIMIT_PER_MINUTE
+            time.sleep(0.001)
+
+        samples = [future.result() for future in legit]
+        pool.shutdown(cancel_futures=True)
+        answered = [future.result() for future in attacks if future.done() and not future.cancelled()]
+        hashed = sum(1 for status in answered if status != 429)
+
+        print(f"{label:<14} {len(attacks):>8} {hashed:>7} {percentile(samples, 50):>8.1f} "
+              f"{percentile(samples, 99):>9.1f}")
+        return percentile(samples, 99)
+
+    print(f"🚦 Rate limit load test ({attack_rate} login attempts/s, {server_threads} server threads, {seconds}s)")
+    print(f"{'limiter':<14} {'attempts':>8} {'hashed':>7} {'p50 ms':>8} {'p99 ms':>9}")
+
+    backend.RATE_LIMIT_ENABLED = False
+    unprotected = run('off')
+
+    backend.RATE_LIMIT_ENABLED = True
+    protected = run('memory')
+
+    try:
+        import fakeredis
+        from rate_limit import RedisBackend
+    except ImportError:
+        print("⚠️  fakeredis not installed, skipping the shared backend run")
+    else:
+        backend.rate_limiter.backend = RedisBackend(fakeredis.FakeRedis())
+        protected = max(protected, run('redis (fake)'))
+
+    if protected >= unprotected:
+        print("❌ Rate limiting did not keep the API responsive")
+        return False
+
+    print(f"✅ p99 for legitimate requests: {unprotected:.1f}ms unprotected, {protected:.1f}ms protected")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_rate_limit() else 1)
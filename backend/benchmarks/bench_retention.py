@@ -0,0 +1,135 @@
+# bench_retention.py - batched retention pass vs one big DELETE, measured from a concurrent writer
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from _common import load_app, seed, percentile
+
+
+def populate(backend, users, chats_per_user, otps, days):
+    """Users with chats spread over `days` days, plus a pile of expired OTPs"""
+    Chat, OTP, db = backend.Chat, backend.OTP, backend.db
+    seed(backend, users)
+    now = datetime.utcnow()
+    random.seed(7)
+    with backend.app.app_context():
+        user_ids = db.session.execute(select(backend.User.id)).scalars().all()
+        rows = []
+        for user_id in user_ids:
+            for _ in range(chats_per_user):
+                rows.append({
+                    'user_id': user_id,
+                    'session_id': 'bench',
+                    'user_message': 'fever ' * 20,
+                    'bot_response': 'Rest and drink plenty of fluids. ' * 10,
+                    'category': random.choice(('health', 'symptoms', 'general')),
+                    'created_at': now - timedelta(seconds=random.randint(0, days * 86400))
+                })
+            if len(rows) >= 50000:
+                db.session.execute(insert(Chat), rows)
+                rows = []
+        if rows:
+            db.session.execute(insert(Chat), rows)
+        db.session.execute(insert(OTP), [{
+            'email': f'bench{i % users}@example.com',
+            'otp_code': '123456',
+            'purpose': 'password_reset',
+            'expires_at': now - timedelta(minutes=random.randint(1, days * 1440)),
+            'is_used': i % 3 == 0,
+            'created_at': now - timedelta(days=days)
+        } for i in range(otps)])
+        db.session.commit()
+        backend.reconcile_chat_counters()
+
+
+def writer_latencies(backend, stop):
+    """Save one chat at a time and record how long each commit waits"""
+    samples = []
+    with backend.app.app_context():
+        user_id = backend.db.session.execute(select(backend.User.id)).scalars().first()
+        while not stop.is_set():
+            started = time.perf_counter()
+            backend.flush_chat_rows([{
+                'user_id': user_id, 'session_id': 'writer', 'user_message': 'hi',
+                'bot_response': 'hello', 'category': 'general', 'created_at': datetime.utcnow()
+            }])
+            samples.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.005)
+    return samples
+
+
+def measure(backend, work):
+    stop = threading.Event()
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('samples', writer_latencies(backend, stop)))
+    thread.start()
+    time.sleep(0.2)
+    try:
+        started = time.perf_counter()
+        outcome = work()
+        elapsed = time.perf_counter() - started
+        time.sleep(0.2)
+    finally:
+        stop.set()
+        thread.join()
+    samples = result['samples']
+    return outcome, elapsed, percentile(samples, 99), max(samples)
+
+
+def bench_retention(users=1000, chats_per_user=400, otps=200000, days=180):
+    print(f"🧹 Retention benchmark ({users} users x {chats_per_user} chats over {days} days, {otps} OTPs)")
+    print(f"{'strategy':<26} {'rows':>8} {'seconds':>8} {'writer p99 ms':>14} {'writer max ms':>14}")
+
+    # Baseline: what a naive cleanup does - one DELETE per table in one transaction
+    backend = load_app()
+    populate(backend, users, chats_per_user, otps, days)
+    cutoff = datetime.utcnow() - timedelta(days=backend.ANALYTICS_RETENTION_DAYS)
+
+    def single_delete():
+        with backend.app.app_context():
+            db = backend.db
+            deleted = db.session.execute(text("DELETE FROM chat WHERE created_at < :cutoff"), {'cutoff': cutoff}).rowcount
+            deleted += db.session.execute(text("DELETE FROM otp WHERE is_used = 1 OR expires_at < :now"),
+                                          {'now': datetime.utcnow()}).rowcount
+            db.session.commit()
+            return deleted
+
+    deleted, elapsed, p99, worst = measure(backend, single_delete)
+    print(f"{'single DELETE':<26} {deleted:>8} {elapsed:>8.2f} {p99:>14.1f} {worst:>14.1f}")
+    del sys.modules['app']
+
+    # Retention worker: per-user batches with a pause between transactions
+    backend = load_app(DATABASE_URL=f"sqlite:///{os.path.join(os.path.dirname(backend.app.config['SQLALCHEMY_DATABASE_URI'][10:]), 'worker.db')}")
+    populate(backend, users, chats_per_user, otps, days)
+    backend.retention_worker.max_seconds = 0
+    report, elapsed, p99, worst = measure(backend, backend.retention_worker.run_once)
+    print(f"{'retention worker':<26} {report['rows_deleted']:>8} {elapsed:>8.2f} {p99:>14.1f} {worst:>14.1f}")
+    for name, task in report['tasks'].items():
+        print(f"  {name:<24} {task['rows']:>8} rows, {task['batches']} batches, {task['seconds']}s")
+    print(f"  maintenance: {report['maintenance']}")
+
+    with backend.app.app_context():
+        db, Chat, User = backend.db, backend.Chat, backend.User
+        over_cap = db.session.execute(
+            select(func.count()).select_from(
+                select(Chat.user_id).where(Chat.session_id != 'writer').group_by(Chat.user_id)
+                .having(func.count() > backend.MAX_CHAT_HISTORY).subquery())
+        ).scalar()
+        too_old = Chat.query.filter(Chat.created_at < cutoff).count()
+        drifted = db.session.execute(select(func.count()).select_from(User).where(
+            User.chat_count != select(func.count(Chat.id)).where(Chat.user_id == User.id).scalar_subquery())).scalar()
+        otps_left = backend.OTP.query.count()
+
+    ok = over_cap == 0 and too_old == 0 and drifted == 0 and otps_left == 0
+    print(f"users over cap: {over_cap}, chats past retention: {too_old}, counter drift: {drifted}, OTPs left: {otps_left}")
+    print("✅ Retention enforced without long write locks" if ok else "❌ Retention left rows behind")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_retention() else 1)
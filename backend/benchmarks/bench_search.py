@@ -0,0 +1,135 @@
+# bench_search.py - /api/user/chats/search and /api/admin/chats/search over a large chat table vs LIKE
+#
+# Chat texts draw words from a Zipf-distributed vocabulary (the knowledge base's words first,
+# then synthetic ones), so the queries cover terms found in nearly every chat down to rare ones.
+# Pass the number of chats as the first argument; the default matches the 10M-row target.
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import product
+
+from _common import load_app, seed, create_user, percentile, timed
+
+VOCABULARY_SIZE = 20000
+POOL_SIZE = 20000  # Distinct user messages and bot responses that chats are drawn from
+
+
+def vocabulary(rng):
+    from knowledge_base import KNOWLEDGE_BASE
+    words = sorted(set(re.findall(r'[a-z]{3,}', str(KNOWLEDGE_BASE).lower())))
+    rng.shuffle(words)
+    syllables = [c + v for c, v in product('bdfgklmnprstvz', 'aeiou')]
+    synthetic = (''.join(parts) for parts in product(syllables, repeat=3))
+    seen = set(words)
+    for word in synthetic:
+        if len(words) >= VOCABULARY_SIZE:
+            break
+        if word not in seen:
+            words.append(word)
+    return words
+
+
+def text_pool(rng, words, low, high):
+    weights = [1 / (rank + 1) ** 1.07 for rank in range(len(words))]
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return [' '.join(rng.choices(words, cum_weights=cumulative, k=rng.randint(low, high))) for _ in range(POOL_SIZE)]
+
+
+def fill_chats(backend, chats, user_ids, rng, words, chunk=100000):
+    """Insert chats through the raw connection; the search triggers index them as they land"""
+    messages = text_pool(rng, words, 6, 14)
+    responses = text_pool(rng, words, 12, 30)
+    start = datetime.utcnow() - timedelta(days=90)
+    step = 90 * 86400 / chats
+    with backend.app.app_context():
+        engine = backend.db.engine
+    for offset in range(0, chats, chunk):
+        rows = [(
+            rng.choice(user_ids),
+            'bench-search',
+            rng.choice(messages),
+            rng.choice(responses),
+            'health',
+            (start + timedelta(seconds=(offset + i) * step)).isoformat(' ')
+        ) for i in range(min(chunk, chats - offset))]
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO chat (user_id, session_id, user_message, bot_response, category, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def bench_search(chats=10000000, users=10000, runs=30, budget_ms=50.0):
+    backend = load_app(CHAT_WRITE_MODE='sync')
+    client = backend.app.test_client()
+    rng = random.Random(42)
+    words = vocabulary(rng)
+
+    emails = seed(backend, users)
+    with backend.app.app_context():
+        user_ids = [user_id for user_id, in backend.db.session.execute(backend.select(backend.User.id))]
+    user = create_user(backend, emails[0])
+    admin = create_user(backend, backend.ADMIN_EMAIL, role='Admin')
+
+    started = time.perf_counter()
+    fill_chats(backend, chats, user_ids, rng, words)
+    seed_s = time.perf_counter() - started
+    print(f"🔎 Chat search benchmark ({chats} chats from {users} users, {len(words)}-word vocabulary, "
+          f"seeded and indexed in {seed_s:.0f} s)")
+
+    common, frequent, mid, rare = words[0], words[10], words[300], words[5000]
+    queries = (
+        ('user: term in most chats', '/api/user/chats/search', common, user),
+        ('user: mid-frequency term', '/api/user/chats/search', mid, user),
+        ('user: rare term', '/api/user/chats/search', words[1000], user),
+        ('user: two terms', '/api/user/chats/search', f'{frequent} {mid}', user),
+        ('admin: term in most chats', '/api/admin/chats/search', common, admin),
+        ('admin: mid-frequency term', '/api/admin/chats/search', mid, admin),
+        ('admin: rare term', '/api/admin/chats/search', rare, admin),
+        ('admin: two terms', '/api/admin/chats/search', f'{frequent} {mid}', admin),
+        ('admin: phrase', '/api/admin/chats/search', f'"{words[0]} {words[1]}"', admin),
+        ('admin: one user (?email=)', f'/api/admin/chats/search?email={emails[0]}&', common, admin),
+        ('admin: page 5', '/api/admin/chats/search?offset=80&', common, admin),
+    )
+
+    print(f"{'query':<30} {'order':>9} {'results':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    ok = True
+    for label, path, query, headers in queries:
+        url = f"{path}{'&' if '?' in path else '?'}q={query}".replace('?&', '?').replace('&&', '&')
+        for _ in range(3):
+            response = client.get(url, headers=headers)
+        body = response.get_json()
+        assert response.status_code == 200, body
+
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            client.get(url, headers=headers)
+            samples.append((time.perf_counter() - started) * 1000)
+        p99 = percentile(samples, 99)
+        ok = ok and p99 < budget_ms
+        print(f"{label:<30} {body['order']:>9} {body['count']:>8} {percentile(samples, 50):>8.2f} {p99:>8.2f}")
+
+    # What search would be without the index: a substring scan, here of every chat
+    def like_scan():
+        with backend.app.app_context():
+            Chat = backend.Chat
+            pattern = '%nosuchword%'
+            backend.db.session.execute(
+                backend.select(Chat.id).where(backend.or_(Chat.user_message.like(pattern), Chat.bot_response.like(pattern)))
+                .order_by(Chat.id.desc()).limit(20)
+            ).all()
+            backend.db.session.remove()
+
+    print(f"{'LIKE scan (word in no chat)':<30} {'':>9} {'':>8} {timed(like_scan, 1):>8.0f}")
+    print(f"{'✅' if ok else '❌'} Every search query answers within {budget_ms:.0f} ms at p99 over {chats} chats")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_search(*(int(arg) for arg in sys.argv[1:2])) else 1)
@@ -0,0 +1,103 @@
+# bench_sessions.py - GET /api/user/sessions vs sessionizing the chat table per request, as history grows
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from _common import load_app, create_user, percentile
+
+# What a per-conversation view costs without the chat_session table: split the user's
+# whole history on gaps longer than the timeout, then aggregate every group
+GAPS_SQL = """
+    WITH ordered AS (
+        SELECT created_at, category, CASE WHEN julianday(created_at) - julianday(LAG(created_at)
+               OVER (ORDER BY created_at, id)) <= :timeout_days THEN 0 ELSE 1 END AS opens
+        FROM chat WHERE user_id = :user_id
+    ), numbered AS (
+        SELECT created_at, category, SUM(opens) OVER (ORDER BY created_at ROWS UNBOUNDED PRECEDING) AS number
+        FROM ordered
+    )
+    SELECT number, MIN(created_at), MAX(created_at), COUNT(*) FROM numbered
+    GROUP BY number ORDER BY number DESC LIMIT 20
+"""
+
+
+def fill_history(backend, user_id, chats, rng):
+    """Bursts of 1-20 chats a minute apart, with pauses of up to a day between them"""
+    rows = []
+    at = datetime.utcnow() - timedelta(days=chats // 5)
+    while len(rows) < chats:
+        for _ in range(rng.randint(1, 20)):
+            rows.append({
+                'user_id': user_id,
+                'session_id': 'bench-sessions',
+                'user_message': 'fever',
+                'bot_response': 'Rest and drink plenty of fluids',
+                'category': rng.choice(('health', 'health', 'general', 'text_analytics')),
+                'created_at': at
+            })
+            at += timedelta(minutes=1)
+        at += timedelta(minutes=rng.randint(backend.CHAT_SESSION_TIMEOUT + 1, 1440))
+    with backend.app.app_context():
+        backend.db.session.execute(backend.insert(backend.Chat), rows[:chats])
+        backend.db.session.commit()
+
+
+def bench_sessions(histories=(1000, 10000, 100000), runs=50):
+    backend = load_app(CHAT_WRITE_MODE='sync')
+    client = backend.app.test_client()
+    rng = random.Random(7)
+
+    users = []
+    for chats in histories:
+        email = f'sessions{chats}@example.com'
+        headers = create_user(backend, email)
+        with backend.app.app_context():
+            user_id = backend.User.query.filter_by(email=email).first().id
+        fill_history(backend, user_id, chats, rng)
+        users.append((chats, user_id, headers))
+
+    started = time.perf_counter()
+    with backend.app.app_context():
+        opened = backend.backfill_chat_sessions()
+    print(f"💬 Chat sessions benchmark ({opened} sessions backfilled in {time.perf_counter() - started:.1f} s)")
+    print(f"{'chats':>8} {'sessions':>9} {'/api/user/sessions p50':>23} {'p99':>7} {'chat GROUP BY p50':>18}")
+
+    medians = []
+    for chats, user_id, headers in users:
+        for _ in range(3):
+            response = client.get('/api/user/sessions', headers=headers)
+        assert response.status_code == 200, response.get_json()
+
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            client.get('/api/user/sessions', headers=headers)
+            samples.append((time.perf_counter() - started) * 1000)
+
+        with backend.app.app_context():
+            session_count = backend.db.session.query(backend.ChatSession).filter_by(user_id=user_id).count()
+            params = {'user_id': user_id, 'timeout_days': backend.CHAT_SESSION_TIMEOUT / 1440}
+            grouped = []
+            for _ in range(max(3, runs // 10)):
+                started = time.perf_counter()
+                backend.db.session.execute(text(GAPS_SQL), params).all()
+                grouped.append((time.perf_counter() - started) * 1000)
+            backend.db.session.remove()
+
+        print(f"{chats:>8} {session_count:>9} {percentile(samples, 50):>20.2f} ms {percentile(samples, 99):>7.2f} "
+              f"{percentile(grouped, 50):>15.2f} ms")
+        medians.append(percentile(samples, 50))
+
+    # A page of sessions should cost the same whatever the history behind it
+    smallest, largest = medians[0], medians[-1]
+    ok = largest < smallest * 2
+    print(f"{'✅' if ok else '❌'} Listing sessions takes {largest:.2f} ms at {histories[-1]} chats "
+          f"vs {smallest:.2f} ms at {histories[0]}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_sessions() else 1)
@@ -0,0 +1,108 @@
+# bench_sqlite_concurrency.py - concurrent save_chat writers (plus readers), default SQLite vs tuned
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# SQLite's out-of-the-box behaviour: rollback journal, fsync on every commit,
+# small page cache; pysqlite's own 5 second lock timeout is kept
+BASELINE = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_MMAP_SIZE': '0',
+    'SQLITE_CACHE_SIZE': '-2000',
+    'SQLITE_BUSY_TIMEOUT': '5000'
+}
+
+TUNED = {
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_MMAP_SIZE': '268435456',
+    'SQLITE_CACHE_SIZE': '-65536',
+    'SQLITE_BUSY_TIMEOUT': '5000'
+}
+
+
+def run_load(writers, readers, seconds):
+    """Runs inside a child process configured through the environment"""
+    from _common import load_app, create_user, seed
+
+    backend = load_app(CHAT_WRITE_MODE='sync')
+    client = backend.app.test_client()
+    emails = seed(backend, writers + readers, 200)
+    headers = [create_user(backend, email) for email in emails]
+    for header in headers:
+        client.get('/api/user/profile', headers=header)  # Warm the auth cache
+
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def writer(header):
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            response = client.post('/api/user/chat', headers=header, json={
+                'session_id': 'bench-session',
+                'user_message': 'fever',
+                'bot_response': 'Rest and drink plenty of fluids',
+                'category': 'health'
+            })
+            if response.status_code == 200:
+                done += 1
+            else:
+                errors += 1
+        with lock:
+            counts['writes'] += done
+            counts['errors'] += errors
+
+    def reader(header):
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            response = client.get('/api/user/chats?limit=50', headers=header)
+            if response.status_code == 200:
+                done += 1
+            else:
+                errors += 1
+        with lock:
+            counts['reads'] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=writer, args=(header,)) for header in headers[:writers]]
+    threads += [threading.Thread(target=reader, args=(header,)) for header in headers[writers:]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    backend.log_pipeline.stop()  # Write out queued log lines so the result stays the last line
+    print(json.dumps({key: value / seconds if key != 'errors' else value for key, value in counts.items()}))
+
+
+def bench_sqlite_concurrency(writers=8, readers=4, seconds=5):
+    print(f"🗄️  SQLite concurrency benchmark ({writers} writers, {readers} readers, {seconds}s)")
+    print(f"{'config':<10} {'writes/s':>9} {'reads/s':>9} {'errors':>7}")
+
+    results = {}
+    for label, env in (('default', BASELINE), ('tuned', TUNED)):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', str(writers), str(readers), str(seconds)],
+            env=dict(os.environ, **env), capture_output=True, text=True, check=True
+        ).stdout
+        results[label] = json.loads(output.strip().splitlines()[-1])
+        row = results[label]
+        print(f"{label:<10} {row['writes']:>9.0f} {row['reads']:>9.0f} {row['errors']:>7}")
+
+    speedup = results['tuned']['writes'] / max(results['default']['writes'], 1)
+    ok = speedup > 1 and results['tuned']['errors'] == 0
+    print(f"{'✅' if ok else '❌'} Tuned SQLite: {speedup:.1f}x write throughput, "
+          f"{results['tuned']['errors']} errors")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_load(*(int(arg) for arg in sys.argv[2:5]))
+        sys.exit(0)
+    sys.exit(0 if bench_sqlite_concurrency() else 1)
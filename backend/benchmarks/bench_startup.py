@@ -0,0 +1,124 @@
+# bench_startup.py - process startup cost: import, create_app() and init-db, each in a fresh interpreter
+#
+# Usage: python bench_startup.py [results.jsonl]   (appends one record per run to track startup over time)
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Deliberately not importing _common here: the children must start cold
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PHASES = (
+    ('import', 'import app'),
+    ('factory', 'import + create_app()'),
+    ('legacy', '+ init_db() (old per-process cost)'),
+)
+
+
+def run_child(mode):
+    """Runs inside a fresh interpreter; prints one JSON line of phase timings"""
+    sys.path.insert(0, BACKEND_DIR)
+    database_path = os.environ['DATABASE_URL'][len('sqlite:///'):]
+    existed = os.path.exists(database_path)
+
+    timings = {}
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        started = time.perf_counter()
+        import app as backend
+        timings['import_ms'] = (time.perf_counter() - started) * 1000
+        timings['import_touched_db'] = os.path.exists(database_path) != existed
+        timings['import_printed'] = bool(output.getvalue())
+
+        if mode != 'import':
+            started = time.perf_counter()
+            backend.create_app()
+            timings['create_app_ms'] = (time.perf_counter() - started) * 1000
+
+        if mode in ('legacy', 'init-db'):
+            started = time.perf_counter()
+            with backend.app.app_context():
+                backend.init_db()
+            timings['init_db_ms'] = (time.perf_counter() - started) * 1000
+
+    print(json.dumps(timings))
+
+
+def measure(mode, database_url, runs):
+    """Median phase timings and process wall time over `runs` fresh interpreters"""
+    env = dict(os.environ, DATABASE_URL=database_url, RETENTION_ENABLED='False', RATE_LIMIT_ENABLED='False')
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, __file__, '--child', mode], env=env, cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_ms'] = (time.perf_counter() - started) * 1000
+        samples.append(sample)
+
+    result = {key: statistics.median(sample[key] for sample in samples)
+              for key in samples[0] if key.endswith('_ms')}
+    result['import_touched_db'] = any(sample['import_touched_db'] for sample in samples)
+    result['import_printed'] = any(sample['import_printed'] for sample in samples)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_startup(runs=5, results_path=None):
+    work_dir = tempfile.mkdtemp(prefix='health_ai_startup_')
+    database_url = f"sqlite:///{os.path.join(work_dir, 'startup.db')}"
+
+    # One-off deployment step on an empty database (two password hashes for the default users)
+    fresh = measure('init-db', database_url, 1)
+    print(f"🚀 Startup benchmark (median of {runs} fresh interpreters, initialized SQLite database)")
+    print(f"{'phase':<36} {'in-process ms':>14} {'process ms':>11}")
+    print(f"{'flask init-db, empty database':<36} {fresh['init_db_ms']:>14.1f} {fresh['process_ms']:>11.1f}")
+
+    results = {}
+    for mode, label in PHASES:
+        results[mode] = row = measure(mode, database_url, runs)
+        in_process = sum(row.get(key, 0) for key in ('import_ms', 'create_app_ms', 'init_db_ms'))
+        print(f"{label:<36} {in_process:>14.1f} {row['process_ms']:>11.1f}")
+
+    factory, legacy = results['factory'], results['legacy']
+    saved = legacy['process_ms'] - factory['process_ms']
+    side_effect_free = not results['import']['import_touched_db'] and not results['import']['import_printed']
+    ok = side_effect_free and saved > 0
+    print(f"{'✅' if side_effect_free else '❌'} Import {'does not touch' if side_effect_free else 'touches'} "
+          f"the database or print")
+    print(f"{'✅' if saved > 0 else '❌'} Each worker, CLI call and benchmark starts {saved:.0f} ms faster "
+          f"without the per-process schema check and seeding")
+
+    if results_path:
+        with open(results_path, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps({
+                'benchmark': 'startup',
+                'at': datetime.utcnow().isoformat(timespec='seconds'),
+                'revision': git_revision(),
+                'runs': runs,
+                'init_db_fresh': fresh,
+                **results
+            }) + '\n')
+        print(f"📝 Appended to {results_path}")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(sys.argv[2])
+        sys.exit(0)
+    sys.exit(0 if bench_startup(results_path=sys.argv[1] if len(sys.argv) > 1 else None) else 1)
@@ -0,0 +1,138 @@
+# bench_workers.py - requests/sec through gunicorn (gunicorn.conf.py) as the worker count grows
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from _common import BACKEND_DIR, load_app, seed, create_user, percentile
+
+MESSAGES = ('I have a fever', 'how much water should I drink', 'tips for better sleep', 'headache after lunch')
+
+
+def request_mix(connection, headers, index):
+    """One request from a read-heavy mix: history page, chatbot answer, liveness probe"""
+    kind = index % 4
+    if kind in (0, 1):
+        connection.request('GET', '/api/user/chats?limit=20', headers=headers)
+    elif kind == 2:
+        body = json.dumps({'message': random.choice(MESSAGES), 'mode': 'retrieval'})
+        connection.request('POST', '/api/chat/respond', body=body,
+                           headers=dict(headers, **{'Content-Type': 'application/json'}))
+    else:
+        connection.request('GET', '/api/health/live')
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def client_process(port, headers, threads, seconds, results):
+    """Closed-loop clients: each thread keeps one keep-alive connection busy"""
+    latencies, errors = [], [0]
+    deadline = time.perf_counter() + seconds
+
+    def run(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        index = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = request_mix(connection, headers, index)
+            except (OSError, http.client.HTTPException):
+                status = None
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            if status != 200:
+                errors[0] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            index += 1
+        connection.close()
+
+    pool = [threading.Thread(target=run, args=(offset,)) for offset in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((latencies, errors[0]))
+
+
+def wait_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/health/live')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_server(database_url, workers, threads, port, clients, client_threads, seconds, headers):
+    env = dict(os.environ, DATABASE_URL=database_url, SERVER_WORKERS=str(workers), SERVER_THREADS=str(threads),
+               SERVER_BIND=f'127.0.0.1:{port}', RATE_LIMIT_ENABLED='False', RETENTION_ENABLED='False')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(port):
+            raise RuntimeError(f'gunicorn with {workers} workers did not come up')
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=client_process,
+                                             args=(port, headers, client_threads, seconds, results))
+                     for _ in range(clients)]
+        for process in processes:
+            process.start()
+        latencies, errors = [], 0
+        for _ in processes:
+            samples, failed = results.get()
+            latencies.extend(samples)
+            errors += failed
+        for process in processes:
+            process.join()
+        return len(latencies) / seconds, percentile(latencies, 50), percentile(latencies, 99), errors
+    finally:
+        # Graceful stop: in-flight requests finish, buffers drain
+        server.send_signal(signal.SIGTERM)
+        server.wait(60)
+
+
+def bench_workers(worker_counts=(1, 2, 4), threads=4, clients=4, client_threads=4, seconds=10):
+    db_dir = tempfile.mkdtemp(prefix='health_ai_workers_')
+    database_url = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    backend = load_app(DATABASE_URL=database_url)
+    seed(backend, 200, 50)
+    headers = create_user(backend, 'load@example.com')
+    seed_chats = [{'user_message': 'hi', 'bot_response': 'hello', 'session_id': 'load', 'category': 'general'}] * 50
+    backend.app.test_client().post('/api/user/chats/batch', json={'chats': seed_chats}, headers=headers)
+
+    cpus = multiprocessing.cpu_count()
+    print(f"🚀 Worker scaling benchmark ({cpus} CPUs, {threads} threads/worker, "
+          f"{clients}x{client_threads} keep-alive clients, {seconds}s per run)")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'scaling':>8}")
+
+    baseline = None
+    ok = True
+    for index, workers in enumerate(worker_counts):
+        rps, p50, p99, errors = run_server(database_url, workers, threads, 5200 + index,
+                                           clients, client_threads, seconds, headers)
+        baseline = baseline or rps
+        ok = ok and errors == 0
+        print(f"{workers:>7} {rps:>8.0f} {p50:>8.2f} {p99:>8.2f} {errors:>7} {rps / baseline:>7.2f}x")
+
+    if cpus < max(worker_counts):
+        print(f"ℹ️  Only {cpus} CPU(s): extra workers cannot add throughput here, rerun on the target host")
+    print("✅ All requests served" if ok else "❌ Some requests failed")
+    return ok
+
+
+if __name__ == "__main__":
+    counts = tuple(int(arg) for arg in sys.argv[1:]) or (1, 2, 4)
+    sys.exit(0 if bench_workers(counts) else 1)
@@ -0,0 +1,48 @@
+# bench_write_behind.py - POST /api/user/chat throughput, synchronous vs write-behind
+import sys
+import time
+
+from _common import load_app, create_user
+
+
+def bench_write_behind(messages=2000):
+    backend = load_app()
+    client = backend.app.test_client()
+    headers = create_user(backend, 'bench-writer@example.com')
+    client.get('/api/user/profile', headers=headers)  # Warm the auth cache
+
+    print(f"✍️  save_chat benchmark ({messages} messages)")
+    print(f"{'mode':<14} {'msgs/sec':>10} {'flushes':>8}")
+
+    rates = {}
+    for mode in ('sync', 'write_behind'):
+        backend.CHAT_WRITE_MODE = mode
+        flushes = backend.chat_buffer.flushes
+
+        started = time.perf_counter()
+        for index in range(messages):
+            response = client.post('/api/user/chat', headers=headers, json={
+                'session_id': 'bench-session',
+                'user_message': f'fever question {index}',
+                'bot_response': 'Rest and drink plenty of fluids',
+                'category': 'health'
+            })
+            assert response.status_code == 200, response.get_json()
+        backend.chat_buffer.drain()
+        rates[mode] = messages / (time.perf_counter() - started)
+
+        print(f"{mode:<14} {rates[mode]:>10.0f} {backend.chat_buffer.flushes - flushes:>8}")
+
+    backend.chat_buffer.stop()
+    with backend.app.app_context():
+        user = backend.User.query.filter_by(email='bench-writer@example.com').first()
+        if user.chat_count != 2 * messages or backend.Chat.query.count() != 2 * messages:
+            print(f"❌ Lost chats: counter {user.chat_count}, rows {backend.Chat.query.count()}")
+            return False
+
+    print(f"✅ Write-behind is {rates['write_behind'] / rates['sync']:.1f}x faster with no lost chats")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bench_write_behind() else 1)
@@ -0,0 +1,97 @@
+# check_query_budgets.py - pins how many SQL statements each route may send (run in CI; exit 1 on a regression)
+#
+# Every route runs cold (auth caches cleared) against a seeded database with
+# SQL_DIAGNOSTICS on, so a statement repeated per row (N+1) fails the check too.
+# Raise a budget only in the change that needs the extra statement.
+import sys
+
+from _common import load_app, seed, create_user
+from sql_diagnostics import assert_max_queries
+
+USER = 'budget-user@example.com'
+NEW_USER = 'budget-new@example.com'
+
+
+def routes(backend):
+    """(method, path, request kwargs, budget) in the order they run; later steps rely on earlier ones"""
+    user = create_user(backend, USER)
+    admin = create_user(backend, backend.ADMIN_EMAIL, role='Admin')
+    chat = {'session_id': 'budget', 'user_message': 'I have a fever', 'bot_response': 'Rest and drink fluids'}
+    return (
+        ('GET', '/', {}, 0),
+        ('POST', '/api/auth/register', {'json': {'email': NEW_USER, 'name': 'Budget', 'password': 'secret123'}}, 4),
+        ('POST', '/api/auth/login', {'json': {'email': NEW_USER, 'password': 'secret123'}}, 3),
+        ('POST', '/api/auth/request-otp', {'json': {'email': NEW_USER}}, 4),
+        ('POST', '/api/auth/verify-otp', {'json': {'email': NEW_USER, 'otp': '424242'}}, 2),
+        ('POST', '/api/auth/reset-password', {'json': {
+            'reset_token': backend.create_reset_token(NEW_USER), 'new_password': 'secret456'}}, 2),
+        ('GET', '/api/user/profile', {'headers': user}, 1),
+        ('PUT', '/api/user/profile', {'headers': user, 'json': {'name': 'Budget User'}}, 3),
+        ('POST', '/api/user/chat', {'headers': user, 'json': chat}, 7),
+        ('POST', '/api/user/chats/batch', {'headers': user, 'json': {'chats': [chat] * 20}}, 7),
+        ('GET', '/api/user/chats', {'headers': user}, 2),
+        ('GET', '/api/user/chats?format=ndjson', {'headers': user}, 2),
+        ('GET', '/api/user/chats/search?q=fever', {'headers': user}, 3),
+        ('GET', '/api/user/sessions', {'headers': user}, 2),
+        ('POST', '/api/chat/respond', {'json': {'message': 'I have a headache'}}, 0),
+        ('POST', '/api/feedback', {'headers': user, 'json': {'rating': 5, 'message': 'Great'}}, 3),
+        ('DELETE', '/api/user/chats/clear', {'headers': user}, 5),
+        ('GET', '/api/admin/dashboard', {'headers': admin}, 2),
+        ('GET', '/api/admin/users', {'headers': admin}, 2),
+        ('GET', f'/api/admin/user/{USER}', {'headers': admin}, 5),
+        ('GET', f'/api/admin/user/{USER}/chats', {'headers': admin}, 3),
+        ('GET', '/api/admin/chats/search?q=fever', {'headers': admin}, 4),
+        ('GET', f'/api/admin/chats/search?q=fever&email={USER}', {'headers': admin}, 5),
+        ('PUT', '/api/admin/user/role', {'headers': admin, 'json': {'email': USER, 'role': 'Premium User'}}, 4),
+        ('GET', '/api/admin/analytics', {'headers': admin}, 2),
+        ('GET', '/api/admin/knowledge', {'headers': admin}, 2),
+        ('POST', '/api/admin/knowledge', {'headers': admin, 'json': {
+            'title': 'Budget', 'response': 'Budget answer', 'keywords': ['budget']}}, 3),
+        ('GET', '/api/health', {}, 1),
+        ('GET', '/api/health/live', {}, 0),
+        ('GET', '/api/stats', {}, 0),
+        ('GET', '/api/metrics', {}, 0),
+    )
+
+
+def check_query_budgets(users=20, chats_per_user=10):
+    # The knowledge base version check runs once per KNOWLEDGE_SYNC_SECONDS, not per request
+    backend = load_app(SQL_DIAGNOSTICS='True', CHAT_WRITE_MODE='sync', KNOWLEDGE_SYNC_SECONDS='3600')
+    backend.generate_otp = lambda: '424242'  # verify-otp plays the user reading the email
+    client = backend.app.test_client()
+    seed(backend, users, chats_per_user)
+    with backend.app.app_context():
+        engine = backend.db.engine
+    client.get('/api/stats')  # Load the statistics counters once, like a warm worker
+
+    print(f"🧮 Query budgets ({users} users, {users * chats_per_user} chats, cold auth caches)")
+    print(f"{'route':<44} {'status':>6} {'queries':>8} {'budget':>7}")
+    ok = True
+    for method, path, kwargs, budget in routes(backend):
+        backend.token_cache.clear()
+        backend.user_cache.clear()
+        repeated = backend.query_diagnostics.repeated
+        try:
+            with assert_max_queries(engine, budget, f'{method} {path}') as statements:
+                response = client.open(path, method=method, **kwargs)
+                response.get_data()  # Streamed bodies query while they are consumed
+            failure = None
+        except AssertionError as e:
+            failure = str(e)
+        if backend.query_diagnostics.repeated != repeated:
+            failure = failure or f'{method} {path}: repeated statement shape (see the N+1 report above)'
+
+        mark = '❌' if failure else '  '
+        print(f"{mark}{method + ' ' + path:<42} {response.status_code:>6} {len(statements):>8} {budget:>7}")
+        if response.status_code >= 500:
+            failure = failure or f'{method} {path} failed with {response.status_code}'
+        if failure:
+            ok = False
+            print(failure)
+
+    print("✅ Every route is within its query budget" if ok else "❌ Query budget exceeded")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_query_budgets() else 1)
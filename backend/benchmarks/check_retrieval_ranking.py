@@ -0,0 +1,70 @@
+# check_retrieval_ranking.py - RetrievalIndex.search must rank by cosine similarity whatever the document lengths (exit 1 on a regression)
+import math
+import random
+import sys
+
+from _common import BACKEND_DIR  # noqa: F401 - puts the backend on sys.path
+from retrieval import RetrievalIndex, tokenize
+
+
+def brute_force(index, query, k):
+    """Cosine of the query against every document, scored from scratch"""
+    tokens = [token for token in tokenize(query) if token in index.postings]
+    if not tokens:
+        return []
+    idf = index._idf_cache
+    query_weights = {term: (1 + math.log(tokens.count(term))) * idf[term] for term in dict.fromkeys(tokens)}
+    query_norm = math.sqrt(sum(weight * weight for weight in query_weights.values()))
+    scored = []
+    for key in index.docs:
+        dot = sum(weight * (1 + math.log(index.postings[term][key])) * idf[term]
+                  for term, weight in query_weights.items() if key in index.postings[term])
+        if dot and index._norms[key]:
+            scored.append((dot / (index._norms[key] * query_norm), key))
+    return sorted(scored, reverse=True)[:k]
+
+
+def check_length_bias():
+    """A short focused entry beats a long one that repeats the term among filler"""
+    index = RetrievalIndex()
+    index.sync({
+        'long': ('headache headache ' + ' '.join(f'filler{n}' for n in range(40)), {}),
+        'short': ('headache pain', {})
+    })
+    top = index.search('headache', 1)
+    both = [score for score, key, meta in index.search('headache', 2)]
+    ok = [key for score, key, meta in top] == ['short'] and both == sorted(both, reverse=True)
+    print(f"{'✅' if ok else '❌'} Short entry ranks first: top-1 {[(key, round(score, 4)) for score, key, meta in top]}, "
+          f"top-2 scores {[round(score, 4) for score in both]}")
+    return ok
+
+
+def check_random_corpus(docs=300, queries=200, seed=7):
+    """Top-k matches a brute-force cosine ranking on documents of 2 to 200 terms"""
+    rng = random.Random(seed)
+    vocabulary = [f'term{n}' for n in range(60)]
+    index = RetrievalIndex()
+    index.sync({
+        f'doc{n}': (' '.join(rng.choice(vocabulary) for _ in range(rng.randint(2, 200))), {})
+        for n in range(docs)
+    })
+
+    failures = 0
+    for _ in range(queries):
+        query = ' '.join(rng.sample(vocabulary, rng.randint(1, 3)))
+        k = rng.choice((1, 3, 10))
+        got = [score for score, key, meta in index.search(query, k)]
+        expected = [score for score, key in brute_force(index, query, k)]
+        if len(got) != len(expected) or any(abs(a - b) > 1e-9 for a, b in zip(got, expected)):
+            failures += 1
+            if failures <= 3:
+                print(f"   {query!r} k={k}: got {[round(s, 4) for s in got]}, expected {[round(s, 4) for s in expected]}")
+    ok = failures == 0
+    print(f"{'✅' if ok else '❌'} {queries - failures}/{queries} random queries ranked as brute-force cosine")
+    return ok
+
+
+if __name__ == "__main__":
+    print("🔎 Retrieval ranking")
+    results = [check_length_bias(), check_random_corpus()]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,187 @@
+# chat_buffer.py - write-behind buffer for chat rows with group commit
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ChatWriteBuffer:
+    """In-memory queue of chat rows flushed by a background thread.
+
+    Rows are handed to `flush(rows)` (one multi-row INSERT in one
+    transaction) once `max_rows` are waiting or `interval` seconds after the
+    first of them arrived, whichever comes first. Readers can merge the rows
+    that are still buffered for a user into what they read from the
+    database; `read_consistent` makes sure a row is never seen twice or
+    missed while a flush is committing.
+    """
+
+    def __init__(self, flush, interval=0.05, max_rows=100, max_pending=10000,
+                 max_retries=3, backoff=0.1):
+        self._flush = flush
+        self.interval = interval
+        self.max_rows = max_rows
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._seq = 0  # Odd while a flush is in flight
+
+        self.submitted = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retries = 0
+        self.max_flush_latency = 0.0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Start the flush thread (idempotent)"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='chat-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Flush everything still buffered, then stop the thread"""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        self.drain()
+
+    def after_fork(self):
+        """Reset in a forked child: the flush thread did not survive the fork, and any
+        rows still buffered belong to the parent, which will flush them itself"""
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._seq = 0
+
+    # ---------- producer side ----------
+
+    def submit(self, row):
+        """Buffer one row; returns False when the buffer is full"""
+        self.start()
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self.rejected += 1
+                return False
+            self._pending.append(row)
+            self.submitted += 1
+            if len(self._pending) == 1 or len(self._pending) >= self.max_rows:
+                self._cond.notify_all()
+        return True
+
+    def drain(self):
+        """Synchronously flush every buffered row from the calling thread"""
+        while self._flush_next():
+            pass
+
+    # ---------- reader side ----------
+
+    def read_consistent(self, read, user_id, attempts=5):
+        """Run read() and return (result, buffered rows of user_id).
+
+        Retries when a flush committed while read() was running, so each row
+        is either in the result or in the buffered list, never both.
+        """
+        for _ in range(attempts):
+            with self._cond:
+                while self._seq % 2:
+                    self._cond.wait()
+                seq = self._seq
+                pending = [row for row in self._pending if row['user_id'] == user_id]
+            result = read()
+            if self._seq == seq:
+                return result, pending
+
+        # Flushes keep landing mid-read: empty the buffer and read the database alone
+        self.drain()
+        return read(), []
+
+    def __len__(self):
+        return len(self._pending)
+
+    def stats(self):
+        """Buffer depth and flush counters"""
+        return {
+            'pending': len(self._pending),
+            'max_pending': self.max_pending,
+            'running': self._thread is not None,
+            'submitted': self.submitted,
+            'flushed': self.flushed,
+            'flushes': self.flushes,
+            'avg_rows_per_flush': round(self.flushed / self.flushes, 1) if self.flushes else 0,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'retries': self.retries,
+            'max_flush_latency_ms': round(self.max_flush_latency * 1000, 2)
+        }
+
+    # ---------- writer side ----------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+
+                # Give the group a chance to fill before committing it
+                deadline = time.monotonic() + self.interval
+                while len(self._pending) < self.max_rows and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                stopping = self._stopping
+
+            self._flush_next()
+            if stopping and not self._pending:
+                return
+
+    def _flush_next(self):
+        """Flush up to max_rows rows; returns False when nothing was pending"""
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return False
+                rows = self._pending[:self.max_rows]
+                del self._pending[:self.max_rows]
+                self._seq += 1
+
+            started = time.monotonic()
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        self._flush(rows)
+                        self.flushed += len(rows)
+                        self.flushes += 1
+                        break
+                    except Exception:
+                        if attempt == self.max_retries:
+                            self.failed += len(rows)
+                            logger.exception("❌ Chat flush error (%d rows dropped)", len(rows))
+                            break
+                        self.retries += 1
+                        time.sleep(self.backoff * (2 ** attempt))
+            finally:
+                self.max_flush_latency = max(self.max_flush_latency, time.monotonic() - started)
+                with self._cond:
+                    self._seq += 1
+                    self._cond.notify_all()
+        return True
@@ -0,0 +1,250 @@
+# chat_search.py - full-text search over chat history: SQLite FTS5 or a PostgreSQL tsvector index
+import html
+import re
+
+from sqlalchemy import DateTime, text
+
+# Marks around matched terms while the text is still raw; render_highlight() turns them into <mark>
+START_MARK, END_MARK = '\x02', '\x03'
+
+_WORD = re.compile(r'\w+')
+_TERM = re.compile(r'"([^"]*)"?|(\S+)')
+_LANGUAGE = re.compile(r'^[a-z_]+$')
+
+
+def fts5_terms(query, max_terms=16):
+    """User input -> FTS5 phrases, ANDed when joined with spaces.
+
+    "quoted text" is a phrase; everything else FTS5 would read as syntax
+    (AND, NEAR, column filters, stray quotes) is matched as plain text.
+    Prefix searches (word*) are not offered: FTS5 merges the postings of
+    every matching term first, which grows with the table, and the porter
+    stemmer already matches other forms of a word.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(query):
+        tokens = _WORD.findall(phrase or word)
+        if tokens:
+            terms.append('"' + ' '.join(tokens) + '"')
+    return terms[:max_terms]
+
+
+def fts5_query(query, max_terms=16):
+    """User input -> FTS5 MATCH expression, or '' when it has no words"""
+    return ' '.join(fts5_terms(query, max_terms))
+
+
+def render_highlight(value):
+    """Escape chat text for HTML and turn the match marks into <mark> tags"""
+    if value is None:
+        return None
+    return html.escape(value).replace(START_MARK, '<mark>').replace(END_MARK, '</mark>')
+
+
+class ChatSearch:
+    """Ranked, highlighted full-text search over the chat table.
+
+    SQLite keeps an external-content FTS5 table (user_id, user_message,
+    bot_response) in step with `chat` through triggers, so every write path
+    (ORM, bulk inserts, the write-behind buffer, aiosqlite, retention
+    deletes) is covered. PostgreSQL uses a GIN index on the tsvector of both
+    texts, which it maintains itself. Other databases have no search.
+
+    Only the newest `candidates` matches of a query are ranked: relevance
+    within recent history, at a cost that does not grow with the table.
+    On SQLite, bm25() first counts the chats containing each query term
+    across the whole table, so a query with a term found in more than
+    `common_term_chats` chats lists its candidates newest first instead.
+    """
+
+    def __init__(self, chat, language='english', candidates=1000, common_term_chats=50000, snippet_tokens=24):
+        if not _LANGUAGE.match(language):
+            raise ValueError(f'Invalid text search language: {language}')
+        self.chat = chat.__table__
+        self.language = language
+        self.candidates = candidates
+        self.common_term_chats = common_term_chats
+        self.snippet_tokens = snippet_tokens
+        self.fts_table = f'{self.chat.name}_fts'
+        self.pg_index = f'ix_{self.chat.name}_search'
+
+    # ---------- schema ----------
+
+    def _sqlite_ddl(self):
+        chat, fts = self.chat.name, self.fts_table
+        columns = 'user_id, user_message, bot_response'
+        new_values = 'new.id, new.user_id, new.user_message, new.bot_response'
+        old_values = "'delete', old.id, old.user_id, old.user_message, old.bot_response"
+        return (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{chat}', "
+            f"content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {chat} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES ({new_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {chat} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ({old_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {chat} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ({old_values}); "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES ({new_values}); END"
+        )
+
+    def _document(self):
+        """The indexed expression; queries must repeat it verbatim for PostgreSQL to use the index"""
+        return f"to_tsvector('{self.language}', user_message || ' ' || bot_response)"
+
+    def install(self, connection):
+        """Create the index (and, on SQLite, its triggers) when missing; returns True when it was built.
+
+        An index created next to existing chats is filled from them, which
+        reads the whole table - `flask init-db` does this once.
+        """
+        dialect = connection.dialect.name
+        if dialect == 'sqlite':
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.fts_table,)
+            ).first()
+            for statement in self._sqlite_ddl():
+                connection.exec_driver_sql(statement)
+            if exists:
+                return False
+            self.rebuild(connection)
+            return True
+        if dialect == 'postgresql':
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM pg_indexes WHERE indexname = %s", (self.pg_index,)
+            ).first()
+            if exists:
+                return False
+            connection.exec_driver_sql(
+                f"CREATE INDEX {self.pg_index} ON {self.chat.name} USING gin ({self._document()})"
+            )
+            return True
+        return False
+
+    def rebuild(self, connection):
+        """Re-index every chat (SQLite; PostgreSQL indexes never drift)"""
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql(f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')")
+
+    # ---------- queries ----------
+
+    def search(self, session, query, user_id=None, limit=20, offset=0):
+        """One page of matches: (results, has_more, order).
+
+        `order` is 'relevance' (best first) or 'recency' (newest first, see
+        above). Results are dicts with the chat's id, user_id, session_id,
+        category, created_at, score (higher is better; None by recency) and
+        user_message / bot_response as HTML-escaped snippets with matches in
+        <mark>. Returns None when the query has no searchable words.
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            statement, params, order = self._sqlite_search(session, query, user_id)
+        elif dialect == 'postgresql':
+            statement, params, order = self._postgresql_search(query, user_id)
+        else:
+            raise NotImplementedError(f'Chat search is not available on {dialect}')
+        if statement is None:
+            return None
+
+        # Pages end with the last candidate
+        window = min(limit + 1, self.candidates - offset)
+        rows = []
+        if window > 0:
+            params.update(candidates=self.candidates, limit=window, offset=offset)
+            rows = session.execute(text(statement).columns(created_at=DateTime), params).mappings().all()
+        results = [{
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'session_id': row['session_id'],
+            'category': row['category'],
+            'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+            'score': round(row['score'], 4) if row['score'] is not None else None,
+            'user_message': render_highlight(row['user_message']),
+            'bot_response': render_highlight(row['bot_response'])
+        } for row in rows[:limit]]
+        return results, len(rows) > limit, order
+
+    def _count_capped(self, session, expressions):
+        """Chats matching each expression, counting no further than common_term_chats"""
+        fts = self.fts_table
+        counts = ', '.join(f"(SELECT count(*) FROM (SELECT 1 FROM {fts} WHERE {fts} MATCH :e{i} LIMIT :cap))"
+                           for i in range(len(expressions)))
+        params = {f'e{i}': expression for i, expression in enumerate(expressions)}
+        return session.execute(text(f"SELECT {counts}"), dict(params, cap=self.common_term_chats)).one()
+
+    def _sqlite_search(self, session, query, user_id):
+        terms = fts5_terms(query)
+        if not terms:
+            return None, None, None
+        columns = '{user_message bot_response} : '
+        match = columns + '(' + ' '.join(terms) + ')'
+        # bm25() counts the chats of each word on its own, phrases or not
+        counted = {columns + f'"{word}"' for term in terms for word in term.strip('"').split()}
+        if user_id is not None:
+            owner = f'user_id : "{int(user_id)}"'
+            match = f'{owner} AND {match}'
+            counted.add(owner)
+        ranked = all(count < self.common_term_chats for count in self._count_capped(session, sorted(counted)))
+
+        fts, chat = self.fts_table, self.chat.name
+        snippets = ', '.join(f"snippet({fts}, {column}, char(2), char(3), '…', {self.snippet_tokens}) AS {name}"
+                             for column, name in ((1, 'user_message'), (2, 'bot_response')))
+        columns = f"{chat}.id, {chat}.user_id, {chat}.session_id, {chat}.category, {chat}.created_at"
+        if not ranked:
+            # Newest first, straight off the index; snippets are only built for rows past the offset
+            statement = f"""
+                SELECT {columns}, NULL AS score, {snippets}
+                FROM {fts} JOIN {chat} ON {chat}.id = {fts}.rowid
+                WHERE {fts} MATCH :match
+                ORDER BY {fts}.rowid DESC LIMIT :limit OFFSET :offset
+            """
+            return statement, {'match': match}, 'recency'
+
+        # The newest candidates come off the index in rowid order; only they are scored,
+        # and only the page is looked up again for its snippets
+        statement = f"""
+            WITH page AS (
+                SELECT id, score FROM (
+                    SELECT rowid AS id, -bm25({fts}, 0.0, 1.0, 1.0) AS score
+                    FROM {fts} WHERE {fts} MATCH :match
+                    ORDER BY rowid DESC LIMIT :candidates
+                ) ORDER BY score DESC, id DESC LIMIT :limit OFFSET :offset
+            )
+            SELECT {columns}, page.score, {snippets}
+            FROM page
+            JOIN {fts} ON {fts}.rowid = page.id
+            JOIN {chat} ON {chat}.id = page.id
+            WHERE {fts} MATCH :match
+            ORDER BY page.score DESC, page.id DESC
+        """
+        return statement, {'match': match}, 'relevance'
+
+    def _postgresql_search(self, query, user_id):
+        if not _WORD.search(query):
+            return None, None, None
+
+        chat, document = self.chat.name, self._document()
+        headline = (f"ts_headline('{self.language}', {chat}.{{column}}, q.query, "
+                    f"'StartSel={START_MARK}, StopSel={END_MARK}, MaxWords={self.snippet_tokens}, MinWords=8')")
+        owner = 'AND user_id = :user_id' if user_id is not None else ''
+        statement = f"""
+            WITH q AS (SELECT websearch_to_tsquery('{self.language}', :query) AS query),
+            candidates AS (
+                SELECT id FROM {chat}, q WHERE {document} @@ q.query {owner}
+                ORDER BY id DESC LIMIT :candidates
+            ),
+            page AS (
+                SELECT {chat}.id, ts_rank({document}, q.query) AS score
+                FROM candidates JOIN {chat} ON {chat}.id = candidates.id, q
+                ORDER BY score DESC, {chat}.id DESC LIMIT :limit OFFSET :offset
+            )
+            SELECT {chat}.id, {chat}.user_id, {chat}.session_id, {chat}.category, {chat}.created_at,
+                   page.score, {headline.format(column='user_message')} AS user_message,
+                   {headline.format(column='bot_response')} AS bot_response
+            FROM page JOIN {chat} ON {chat}.id = page.id, q
+            ORDER BY page.score DESC, page.id DESC
+        """
+        params = {'query': query}
+        if user_id is not None:
+            params['user_id'] = user_id
+        return statement, params, 'relevance'
@@ -0,0 +1,193 @@
+# chat_sessions.py - server-side chat sessions: a user's chats split wherever they pause longer than a timeout
+from collections import Counter
+
+from sqlalchemy import select, insert, update, delete, func, bindparam
+
+
+def dominant_category(counts):
+    """Most frequent category; ties go to the one seen first"""
+    return max(counts, key=counts.get) if counts else None
+
+
+class SessionStore:
+    """Maintains the chat_session rows as chats are inserted and deleted.
+
+    A user's chat joins their latest session when it comes at most `timeout`
+    (a timedelta) after that session's last message, and opens a new one
+    otherwise. Sessions carry started_at, ended_at, message_count,
+    category_counts and dominant_category, all updated from the rows being
+    written, so listing sessions never reads the chat table.
+
+    assign() reads the latest session before extending it; callers run it
+    after the chat_count UPDATE on the user row, which holds concurrent
+    writes for the same user until this transaction commits.
+    """
+
+    def __init__(self, sessions, chat, timeout):
+        self.sessions = table = sessions.__table__
+        self.chat = chat.__table__
+        self.timeout = timeout
+
+        # Built once: constructing a statement and its cache key costs more than running it here
+        newest = select(func.max(table.c.id))\
+            .where(table.c.user_id.in_(bindparam('user_ids', expanding=True)))\
+            .group_by(table.c.user_id)
+        self._latest = select(table).where(table.c.id.in_(newest))
+        self._extend = update(table).where(table.c.id == bindparam('target_id')).values(
+            ended_at=bindparam('new_ended_at'),
+            message_count=bindparam('new_count'),
+            category_counts=bindparam('new_counts', type_=table.c.category_counts.type),
+            dominant_category=bindparam('new_dominant')
+        )
+        self._open = insert(table).returning(table.c.id)
+
+    # ---------- incremental updates ----------
+
+    def assign(self, session, rows, continue_latest=True):
+        """Set row['chat_session_id'] on chats about to be inserted (dicts with user_id,
+        session_id, category, created_at); returns the number of sessions opened"""
+        if not rows:
+            return 0
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row['user_id'], []).append(row)
+
+        latest = {}
+        if continue_latest:
+            latest = {current['user_id']: dict(current)
+                      for current in session.execute(self._latest, {'user_ids': list(by_user)}).mappings()}
+
+        opened, extended, placed = [], {}, []
+        for user_id, user_rows in by_user.items():
+            current = latest.get(user_id)
+            for row in sorted(user_rows, key=lambda row: row['created_at']):
+                if current is None or row['created_at'] - current['ended_at'] > self.timeout:
+                    current = {
+                        'id': None,
+                        'user_id': user_id,
+                        'client_session_id': row['session_id'],
+                        'started_at': row['created_at'],
+                        'ended_at': row['created_at'],
+                        'message_count': 0,
+                        'category_counts': {}
+                    }
+                    opened.append(current)
+                elif current['id'] is not None:
+                    extended[current['id']] = current
+
+                counts = current['category_counts'] = dict(current['category_counts'] or {})
+                category = row.get('category') or ''
+                counts[category] = counts.get(category, 0) + 1
+                current['message_count'] += 1
+                current['ended_at'] = max(current['ended_at'], row['created_at'])
+                placed.append((row, current))
+
+        if extended:
+            session.execute(self._extend, [{
+                'target_id': current['id'],
+                'new_ended_at': current['ended_at'],
+                'new_count': current['message_count'],
+                'new_counts': current['category_counts'],
+                'new_dominant': dominant_category(current['category_counts'])
+            } for current in extended.values()])
+        if opened:
+            # Ids come out ascending in row order within the INSERT (see save_chat_batch)
+            ids = sorted(session.scalars(self._open, [{
+                'user_id': current['user_id'],
+                'client_session_id': current['client_session_id'],
+                'started_at': current['started_at'],
+                'ended_at': current['ended_at'],
+                'message_count': current['message_count'],
+                'category_counts': current['category_counts'],
+                'dominant_category': dominant_category(current['category_counts'])
+            } for current in opened]).all())
+            for current, session_id in zip(opened, ids):
+                current['id'] = session_id
+
+        for row, current in placed:
+            row['chat_session_id'] = current['id']
+        return len(opened)
+
+    def remove(self, session, rows):
+        """Take deleted chats (dicts with chat_session_id and category) out of their sessions.
+
+        Runs after the DELETE: sessions left empty go, the others get their
+        counts lowered and their first/last message times re-read.
+        """
+        removed = {}
+        for row in rows:
+            if row['chat_session_id'] is not None:
+                removed.setdefault(row['chat_session_id'], Counter())[row['category'] or ''] += 1
+        if not removed:
+            return
+
+        table, chat = self.sessions, self.chat
+        emptied, changed = [], []
+        for current in session.execute(select(table).where(table.c.id.in_(removed))).mappings():
+            gone = removed[current['id']]
+            counts = {category: count - gone[category]
+                      for category, count in (current['category_counts'] or {}).items()
+                      if count > gone[category]}
+            remaining = current['message_count'] - sum(gone.values())
+            if remaining <= 0:
+                emptied.append(current['id'])
+                continue
+            changed.append({
+                'target_id': current['id'],
+                'new_count': remaining,
+                'new_counts': counts,
+                'new_dominant': dominant_category(counts)
+            })
+
+        if emptied:
+            session.execute(delete(table).where(table.c.id.in_(emptied)))
+        if changed:
+            in_session = chat.c.chat_session_id == table.c.id
+            session.execute(
+                update(table)
+                .where(table.c.id == bindparam('target_id'))
+                .values(
+                    started_at=select(func.min(chat.c.created_at)).where(in_session).scalar_subquery(),
+                    ended_at=select(func.max(chat.c.created_at)).where(in_session).scalar_subquery(),
+                    message_count=bindparam('new_count'),
+                    category_counts=bindparam('new_counts', type_=table.c.category_counts.type),
+                    dominant_category=bindparam('new_dominant')
+                ),
+                changed
+            )
+
+    def clear(self, session, user_id):
+        """Drop all sessions of a user whose chats were all deleted"""
+        session.execute(delete(self.sessions).where(self.sessions.c.user_id == user_id))
+
+    # ---------- backfill ----------
+
+    def backfill(self, session, user_id):
+        """Group one user's chats that have no session (saved before sessions existed) into
+        sessions of their own; returns the number opened"""
+        chat = self.chat
+        rows = [dict(row) for row in session.execute(
+            select(chat.c.user_id, chat.c.session_id, chat.c.category, chat.c.created_at)
+            .where(chat.c.user_id == user_id, chat.c.chat_session_id.is_(None))
+            .order_by(chat.c.created_at, chat.c.id)
+        ).mappings()]
+        opened = self.assign(session, rows, continue_latest=False)
+
+        # A session's chats are one contiguous stretch of the user's (created_at) history
+        spans = {}
+        for row in rows:
+            start, end = spans.get(row['chat_session_id'], (row['created_at'], row['created_at']))
+            spans[row['chat_session_id']] = (min(start, row['created_at']), max(end, row['created_at']))
+        if spans:
+            session.execute(
+                update(chat)
+                .where(
+                    chat.c.user_id == user_id,
+                    chat.c.chat_session_id.is_(None),
+                    chat.c.created_at.between(bindparam('span_start'), bindparam('span_end'))
+                )
+                .values(chat_session_id=bindparam('target_session')),
+                [{'target_session': session_id, 'span_start': start, 'span_end': end}
+                 for session_id, (start, end) in spans.items()]
+            )
+        return opened
@@ -0,0 +1,119 @@
+# db_tuning.py - engine options and per-connection pragmas applied at engine creation
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(uri, pool_size=10, max_overflow=20, pool_timeout=30, pool_recycle=1800,
+                   busy_timeout_ms=5000):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    Server databases get a bounded, health-checked connection pool. SQLite
+    keeps SQLAlchemy's default pool (a QueuePool for file databases) and only
+    gets the driver-level lock timeout; everything else is set by pragmas.
+    """
+    if is_sqlite(uri):
+        return {'connect_args': {'timeout': busy_timeout_ms / 1000.0}}
+
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': True
+    }
+
+
+def sqlite_pragmas(journal_mode='WAL', synchronous='NORMAL', mmap_size=268435456,
+                   cache_size=-65536, busy_timeout_ms=5000, auto_vacuum='INCREMENTAL'):
+    """Ordered (pragma, value) pairs; None or '' leaves SQLite's default alone"""
+    pragmas = [
+        ('auto_vacuum', auto_vacuum),  # Only takes effect on a new database (or after a full VACUUM)
+        ('journal_mode', journal_mode),
+        ('synchronous', synchronous),
+        ('mmap_size', mmap_size),
+        ('cache_size', cache_size),  # Negative values are KiB, positive values pages
+        ('busy_timeout', busy_timeout_ms)
+    ]
+    return [(name, value) for name, value in pragmas if value not in (None, '')]
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run the pragmas on every new DBAPI connection the engine opens"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    if is_memory_sqlite(str(engine.url)):
+        # No journal file or mapping to tune for an in-memory database
+        pragmas = [(name, value) for name, value in pragmas if name not in ('journal_mode', 'mmap_size')]
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def sqlite_settings(engine):
+    """Current values of the tuned pragmas, for health/stats reporting"""
+    if engine.dialect.name != 'sqlite':
+        return None
+    names = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'busy_timeout', 'auto_vacuum')
+    with engine.connect() as connection:
+        return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
+
+
+def sqlite_maintenance(engine, vacuum_pages=2000, pause=0.01, analysis_limit=1000, full_vacuum=False):
+    """Give free pages back to the filesystem and refresh planner statistics.
+
+    With auto_vacuum=INCREMENTAL, free pages are released `vacuum_pages` at
+    a time with a `pause` in between, so writers only ever wait for one
+    short step - unlike a full VACUUM, which rewrites the whole file under
+    an exclusive lock (and is needed once to switch an existing database to
+    incremental mode). ANALYZE is limited to
+    `analysis_limit` rows per index so it stays cheap on large tables.
+    """
+    if engine.dialect.name != 'sqlite':
+        return {'skipped': 'autovacuum is handled by the database server'}
+
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        def pragma(name):
+            return connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+
+        page_size = pragma('page_size')
+        pages_before = pragma('page_count')
+
+        if full_vacuum:
+            connection.exec_driver_sql('VACUUM')
+        elif pragma('auto_vacuum') == 2:  # INCREMENTAL
+            while pragma('freelist_count'):
+                # The driver steps ordinary statements once (one page); executescript runs it to the end
+                connection.connection.driver_connection.executescript(
+                    f'PRAGMA incremental_vacuum({max(1, int(vacuum_pages))})')
+                time.sleep(pause)
+
+        pages_after = pragma('page_count')
+
+        if analysis_limit:
+            connection.exec_driver_sql(f'PRAGMA analysis_limit={int(analysis_limit)}')
+        connection.exec_driver_sql('ANALYZE')
+        return {
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(pragma('auto_vacuum')),
+            'bytes_reclaimed': (pages_before - pages_after) * page_size,
+            'free_pages': pragma('freelist_count'),
+            'file_bytes': pages_after * page_size
+        }
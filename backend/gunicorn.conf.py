@@ -0,0 +1,59 @@
+# gunicorn.conf.py - production server settings: gunicorn -c gunicorn.conf.py wsgi:application
+import gc
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.environ.get("SERVER_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("SERVER_WORKERS", 0)) or multiprocessing.cpu_count() * 2 + 1
+threads = int(os.environ.get("SERVER_THREADS", 4))  # Per worker; requests mostly wait on SQLite or SMTP
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = int(os.environ.get("SERVER_TIMEOUT", 30))  # Seconds before a stuck worker is killed
+graceful_timeout = int(os.environ.get("SERVER_GRACEFUL_TIMEOUT", 30))  # In-flight requests get this long on shutdown
+keepalive = int(os.environ.get("SERVER_KEEPALIVE", 5))
+max_requests = int(os.environ.get("SERVER_MAX_REQUESTS", 0))  # Recycle workers after this many requests, 0 = never
+max_requests_jitter = max_requests // 10
+
+# Import the app (models, knowledge base, retrieval index) once in the master and fork it
+preload_app = os.environ.get("SERVER_PRELOAD", "True").lower() == "true"
+
+accesslog = os.environ.get("SERVER_ACCESS_LOG") or None  # "-" for stdout
+errorlog = "-"
+
+
+def when_ready(server):
+    if workers > 1:
+        if os.environ.get("OTP_STORE", "database") == "memory":
+            server.log.warning("OTP_STORE=memory keeps codes per worker; use OTP_STORE=database with %s workers", workers)
+        if os.environ.get("RATE_LIMIT_STORAGE_URL", "memory://").startswith("memory://"):
+            server.log.warning("Rate limits are counted per worker; set RATE_LIMIT_STORAGE_URL=redis://... to share them")
+        if float(os.environ.get("KNOWLEDGE_SYNC_SECONDS", 5)) <= 0:
+            server.log.warning("KNOWLEDGE_SYNC_SECONDS=0: admin knowledge base edits only reach the worker that served them")
+    server.log.info("Serving with %s workers x %s threads (preload=%s)", workers, threads, preload_app)
+
+
+def pre_fork(server, worker):
+    # Keep everything the master loaded out of the collector, so workers do not
+    # touch (and copy) those pages when they collect garbage
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import after_fork
+    after_fork()
+
+
+def worker_exit(server, worker):
+    # Runs after the worker stopped accepting and finished its in-flight requests
+    from app import shutdown
+    shutdown()
+
+
+def on_exit(server):
+    if preload_app:
+        # The master owns the retention job and anything it started while preloading
+        from app import shutdown
+        shutdown()
@@ -0,0 +1,129 @@
+# intent_engine.py - keyword intent matching for chatbot responses
+from collections import deque
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds every keyword in a text in one pass"""
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        # Trie of all keywords
+        for index, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] = self._out[state] + (index,)
+
+        # Failure links, breadth first so shorter suffixes are resolved first
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def search(self, text):
+        """Return the indexes of every keyword occurring in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class IntentEngine:
+    """Picks the highest-priority intent whose keywords appear in a message.
+
+    All keywords are compiled into one automaton, so matching costs one pass
+    over the message no matter how many intents are registered.
+    """
+
+    def __init__(self, knowledge_base, intents, topics=None, fallback=''):
+        self.knowledge_base = knowledge_base
+        self.fallback = fallback
+        self._intents = []
+
+        keyword_ids = {}
+        self._keyword_intents = []
+        self._keyword_topics = []
+
+        def keyword_id(keyword):
+            keyword = keyword.lower()
+            if keyword not in keyword_ids:
+                keyword_ids[keyword] = len(keyword_ids)
+                self._keyword_intents.append([])
+                self._keyword_topics.append([])
+            return keyword_ids[keyword]
+
+        for priority, intent in enumerate(intents):
+            self._intents.append({
+                'name': intent['name'],
+                'category': intent.get('category', 'general'),
+                'requires': intent.get('requires'),
+                'response': self._resolve(intent['answer'])
+            })
+            for keyword in intent['keywords']:
+                self._keyword_intents[keyword_id(keyword)].append(priority)
+
+        for topic, keywords in (topics or {}).items():
+            for keyword in keywords:
+                self._keyword_topics[keyword_id(keyword)].append(topic)
+
+        self._automaton = KeywordAutomaton(list(keyword_ids))
+
+    def __len__(self):
+        return len(self._intents)
+
+    def _resolve(self, path):
+        """Follow a key path such as ('health', 'fever') into the knowledge base"""
+        if isinstance(path, str):
+            return path
+        node = self.knowledge_base
+        for key in path:
+            node = node[key]
+        return node
+
+    def match(self, message):
+        """Return the intent, category and response text for a user message"""
+        found = self._automaton.search(message.lower().strip())
+
+        topics = set()
+        candidates = set()
+        for index in found:
+            topics.update(self._keyword_topics[index])
+            candidates.update(self._keyword_intents[index])
+
+        for priority in sorted(candidates):
+            intent = self._intents[priority]
+            if intent['requires'] and intent['requires'] not in topics:
+                continue
+            return {
+                'intent': intent['name'],
+                'category': intent['category'],
+                'response': intent['response']
+            }
+
+        return {
+            'intent': 'fallback',
+            'category': 'general',
+            'response': self.fallback
+        }
@@ -0,0 +1,409 @@
+# knowledge_base.py - chatbot answers and the intents that select them
+
+# Answers (same content as the knowledgeBase object in src/pages/ChatPage.jsx)
+KNOWLEDGE_BASE = {
+    # Health Issues & Solutions
+    'health': {
+        'fever': (
+            "🌡️ **Fever Treatment**:\n"
+            "• Rest and sleep\n"
+            "• Drink plenty of fluids (water, juice, broth)\n"
+            "• Take paracetamol or ibuprofen as directed\n"
+            "• Use cool compresses on forehead\n"
+            "• Wear lightweight clothing\n"
+            "\n"
+            "⚠️ See a doctor if:\n"
+            "- Fever > 103°F (39.4°C)\n"
+            "- Lasts more than 3 days\n"
+            "- Severe headache or stiff neck"
+        ),
+        'headache': (
+            "🤕 **Headache Relief**:\n"
+            "• Rest in a dark, quiet room\n"
+            "• Apply cold or warm compress to forehead/neck\n"
+            "• Drink plenty of water\n"
+            "• Try over-the-counter pain relievers (ibuprofen, aspirin)\n"
+            "• Massage temples and neck\n"
+            "• Consider relaxation techniques\n"
+            "\n"
+            "💊 For migraines: Avoid triggers like bright lights, loud noises"
+        ),
+        'cough': (
+            "🤧 **Cough Remedies**:\n"
+            "• Drink warm liquids (honey lemon tea)\n"
+            "• Use a humidifier or steam inhalation\n"
+            "• Try cough drops or lozenges\n"
+            "• Gargle with salt water\n"
+            "• Avoid irritants (smoke, dust)\n"
+            "• Elevate head while sleeping\n"
+            "\n"
+            "🏥 See doctor if:\n"
+            "- Cough with blood\n"
+            "- Lasts > 2 weeks\n"
+            "- Difficulty breathing"
+        ),
+        'cold': (
+            "😷 **Cold & Flu Care**:\n"
+            "• Rest and stay hydrated\n"
+            "• Vitamin C supplements\n"
+            "• Warm salt water gargle\n"
+            "• Chicken soup or warm broth\n"
+            "• Use nasal saline spray\n"
+            "• Take zinc supplements early\n"
+            "\n"
+            "📅 Symptoms usually improve in 7-10 days"
+        ),
+        'stomach': (
+            "🤢 **Stomach Problems**:\n"
+            "• BRAT diet: Bananas, Rice, Applesauce, Toast\n"
+            "• Drink clear fluids (water, electrolyte drinks)\n"
+            "• Avoid dairy, fatty, spicy foods\n"
+            "• Ginger tea for nausea\n"
+            "• Peppermint for indigestion\n"
+            "• Small, frequent meals\n"
+            "\n"
+            "🚑 Emergency if: Severe pain, blood in stool, dehydration"
+        ),
+        'stress': (
+            "🧠 **Stress Management**:\n"
+            "• Practice deep breathing exercises\n"
+            "• Regular physical activity (30 min daily)\n"
+            "• Meditation or mindfulness\n"
+            "• Adequate sleep (7-9 hours)\n"
+            "• Talk to friends/family\n"
+            "• Time management techniques\n"
+            "• Professional counseling if needed"
+        ),
+        'diabetes': (
+            "🩸 **Diabetes Care**:\n"
+            "• Monitor blood sugar regularly\n"
+            "• Balanced diet (low sugar, high fiber)\n"
+            "• Regular exercise\n"
+            "• Take medications as prescribed\n"
+            "• Regular foot checks\n"
+            "• Annual eye exams\n"
+            "• Stay hydrated"
+        ),
+        'covid': (
+            "🦠 **COVID-19 Care**:\n"
+            "• Isolate for 5 days from symptoms\n"
+            "• Rest and stay hydrated\n"
+            "• Monitor oxygen levels\n"
+            "• Take paracetamol for fever\n"
+            "• Seek medical help if:\n"
+            "  - Difficulty breathing\n"
+            "  - Chest pain\n"
+            "  - Oxygen < 94%\n"
+            "• Get vaccinated and boosted"
+        )
+    },
+
+    # Text Analytics & NLP Knowledge
+    'textAnalytics': {
+        'introduction': (
+            "📚 **Introduction to Text Analytics**\n"
+            "\n"
+            "**Definition:** Text Analytics involves extracting meaningful information from unstructured text using computational methods.\n"
+            "\n"
+            "**Significance:**\n"
+            "• Converts text to structured data\n"
+            "• Enables sentiment analysis, topic modeling\n"
+            "• Powers search engines, chatbots\n"
+            "\n"
+            "**Applications:**\n"
+            "1. **Business:** Customer feedback analysis\n"
+            "2. **Healthcare:** Medical report analysis\n"
+            "3. **Finance:** News sentiment for trading\n"
+            "4. **Social Media:** Trend detection\n"
+            "\n"
+            "**Data Sources:**\n"
+            "• Social media posts\n"
+            "• Customer reviews\n"
+            "• News articles\n"
+            "• Research papers\n"
+            "• Emails & documents"
+        ),
+        'preprocessing': (
+            "🔧 **Text Preprocessing Techniques**\n"
+            "\n"
+            "**Tokenization:** Splitting text into words/tokens\n"
+            "• Example: \"Hello World!\" → [\"Hello\", \"World\", \"!\"]\n"
+            "\n"
+            "**Stop-word Removal:** Removing common words\n"
+            "• Removes: \"the\", \"is\", \"and\", \"in\"\n"
+            "\n"
+            "**Stemming:** Reducing words to root form\n"
+            "• \"running\" → \"run\"\n"
+            "• \"better\" → \"better\" (imperfect)\n"
+            "\n"
+            "**Lemmatization:** Proper word reduction using dictionary\n"
+            "• \"running\" → \"run\"\n"
+            "• \"better\" → \"good\"\n"
+            "\n"
+            "**Case Normalization:** Convert to lowercase\n"
+            "**Text Cleaning:** Remove URLs, special characters\n"
+            "**Noise Removal:** Handle HTML tags, extra spaces"
+        ),
+        'representation': (
+            "📊 **Text Representation Models**\n"
+            "\n"
+            "**1. Bag-of-Words (BoW):**\n"
+            "• Creates vocabulary from all documents\n"
+            "• Represents text as word frequency vectors\n"
+            "• Simple but loses word order\n"
+            "\n"
+            "**2. TF-IDF (Term Frequency-Inverse Document Frequency):**\n"
+            "• Weights words by importance\n"
+            "• Common words get lower weights\n"
+            "• Formula: TF × IDF\n"
+            "\n"
+            "**3. Word Embeddings:**\n"
+            "**Word2Vec:** Neural network-based embeddings\n"
+            "**GloVe:** Global co-occurrence statistics\n"
+            "**BERT:** Contextual embeddings (state-of-the-art)\n"
+            "\n"
+            "**4. Advanced Models:**\n"
+            "• **FastText:** Handles subwords\n"
+            "• **ELMo:** Deep contextualized embeddings\n"
+            "• **GPT Models:** Transformer-based"
+        ),
+        'nlpTechniques': (
+            "🎯 **NLP Techniques**\n"
+            "\n"
+            "**Part-of-Speech (POS) Tagging:**\n"
+            "• Labels words with grammatical roles\n"
+            "• Tags: Noun (NN), Verb (VB), Adjective (JJ)\n"
+            "• Example: \"The/DT quick/JJ brown/JJ fox/NN\"\n"
+            "\n"
+            "**Named Entity Recognition (NER):**\n"
+            "• Identifies entities in text\n"
+            "• Categories: Person, Organization, Location, Date\n"
+            "• Example: \"[ORG Google] was founded by [PER Larry Page] in [LOC Mountain View]\"\n"
+            "\n"
+            "**Syntactic Parsing:**\n"
+            "• Analyzes grammatical structure\n"
+            "• Creates parse trees\n"
+            "• Helps in understanding relationships\n"
+            "\n"
+            "**Dependency Parsing:**\n"
+            "• Shows word dependencies\n"
+            "• Useful for information extraction"
+        ),
+        'books': (
+            "📖 **Recommended Books & Links**\n"
+            "\n"
+            "**Textbooks:**\n"
+            "1. **\"Speech and Language Processing\"** by Daniel Jurafsky & James H. Martin\n"
+            "   📚 Amazon: https://amzn.to/3Wk2wPk\n"
+            "   📘 PDF: https://web.stanford.edu/~jurafsky/slp3/\n"
+            "\n"
+            "2. **\"Text Mining: Classification, Clustering, and Applications\"** by Ashok Srivastava & Mehran Sahami\n"
+            "   📚 Amazon: https://amzn.to/3YYA8vT\n"
+            "   📘 CRC Press: https://www.routledge.com/9781420059452\n"
+            "\n"
+            "**Reference Books:**\n"
+            "1. **\"Pattern Recognition and Machine Learning\"** by Christopher M. Bishop\n"
+            "   📚 Amazon: https://amzn.to/4ax7sFN\n"
+            "   📘 Springer: https://www.springer.com/gp/book/9780387310732\n"
+            "\n"
+            "2. **\"Deep Learning for Natural Language Processing\"** by Palash Goyal et al.\n"
+            "   📚 Amazon: https://amzn.to/3WV32En\n"
+            "   📘 Springer: https://www.springer.com/gp/book/9783030971734\n"
+            "\n"
+            "**Free Resources:**\n"
+            "• Hugging Face: https://huggingface.co/\n"
+            "• NLTK Documentation: https://www.nltk.org/\n"
+            "• spaCy: https://spacy.io/"
+        ),
+        'examples': (
+            "💻 **Code Examples**\n"
+            "\n"
+            "**Example 1: Text Preprocessing in Python**\n"
+            "```python\n"
+            "import nltk\n"
+            "from nltk.corpus import stopwords\n"
+            "from nltk.stem import WordNetLemmatizer\n"
+            "import re\n"
+            "\n"
+            "def preprocess_text(text):\n"
+            "    # Convert to lowercase\n"
+            "    text = text.lower()\n"
+            "    # Remove special characters\n"
+            "    text = re.sub(r'[^a-zA-Z\\s]', '', text)\n"
+            "    # Tokenize\n"
+            "    tokens = nltk.word_tokenize(text)\n"
+            "    # Remove stopwords\n"
+            "    stop_words = set(stopwords.words('english'))\n"
+            "    tokens = [word for word in tokens if word not in stop_words]\n"
+            "    # Lemmatization\n"
+            "    lemmatizer = WordNetLemmatizer()\n"
+            "    tokens = [lemmatizer.lemmatize(word) for word in tokens]\n"
+            "    return ' '.join(tokens)\n"
+            "\n"
+            "# Example usage\n"
+            "sample_text = \"Text Analytics is AMAZING! It helps in understanding text data.\"\n"
+            "print(preprocess_text(sample_text))\n"
+            "# Output: \"text analytics amazing help understanding text data\"\n"
+            "```\n"
+            "\n"
+            "**Example 2: TF-IDF Implementation**\n"
+            "```python\n"
+            "from sklearn.feature_extraction.text import TfidfVectorizer\n"
+            "\n"
+            "documents = [\n"
+            "    \"Text analytics is important for data science\",\n"
+            "    \"Natural language processing uses text analytics\",\n"
+            "    \"Machine learning and NLP are related fields\"\n"
+            "]\n"
+            "\n"
+            "vectorizer = TfidfVectorizer()\n"
+            "tfidf_matrix = vectorizer.fit_transform(documents)\n"
+            "\n"
+            "print(\"Vocabulary:\", vectorizer.get_feature_names_out())\n"
+            "print(\"TF-IDF Matrix shape:\", tfidf_matrix.shape)\n"
+            "```"
+        ),
+        'career': (
+            "🚀 **Career & Projects**\n"
+            "\n"
+            "**Skills Required:**\n"
+            "• Python programming\n"
+            "• Statistics & Probability\n"
+            "• Linguistics basics\n"
+            "• Machine Learning\n"
+            "• Deep Learning (for advanced NLP)\n"
+            "\n"
+            "**Career Paths:**\n"
+            "1. **NLP Engineer:** Build text processing systems\n"
+            "2. **Data Scientist (Text):** Analyze text data\n"
+            "3. **Research Scientist:** Develop new NLP models\n"
+            "4. **AI Product Manager:** NLP-based products\n"
+            "\n"
+            "**Project Ideas:**\n"
+            "1. **Sentiment Analyzer:** Classify review sentiments\n"
+            "2. **Chatbot:** Context-aware conversation\n"
+            "3. **Text Summarizer:** Automatic document summarization\n"
+            "4. **Named Entity Recognizer:** Extract entities from news\n"
+            "5. **Topic Modeling:** Discover themes in documents\n"
+            "\n"
+            "**Learning Path:**\n"
+            "1. Learn Python & NLP libraries (NLTK, spaCy)\n"
+            "2. Understand text preprocessing\n"
+            "3. Study ML algorithms for text\n"
+            "4. Work with word embeddings\n"
+            "5. Build projects and contribute to GitHub"
+        )
+    },
+
+    # General Responses
+    'greeting': (
+        "👋 **Welcome to Health & Text Analytics Assistant!**\n"
+        "\n"
+        "I can help you with:\n"
+        "\n"
+        "🏥 **Health Issues:**\n"
+        "• Fever, headache, cough\n"
+        "• Cold, stomach problems\n"
+        "• Stress, diabetes care\n"
+        "• COVID-19 guidance\n"
+        "\n"
+        "📚 **Text Analytics & NLP:**\n"
+        "• Introduction to Text Analytics\n"
+        "• Text preprocessing techniques\n"
+        "• Text representation (BoW, TF-IDF, Embeddings)\n"
+        "• NLP techniques (POS, NER, Parsing)\n"
+        "• Recommended books & resources\n"
+        "• Code examples & projects\n"
+        "\n"
+        "What would you like to learn today?"
+    ),
+
+    'help': (
+        "ℹ️ **How I Can Help**\n"
+        "\n"
+        "**Health Topics:**\n"
+        "• 'fever treatment'\n"
+        "• 'headache remedies'\n"
+        "• 'stress management'\n"
+        "• 'diabetes care tips'\n"
+        "\n"
+        "**Text Analytics Topics:**\n"
+        "• 'introduction to text analytics'\n"
+        "• 'text preprocessing'\n"
+        "• 'text representation models'\n"
+        "• 'nlp techniques'\n"
+        "• 'recommended books'\n"
+        "• 'code examples'\n"
+        "• 'career in text analytics'\n"
+        "\n"
+        "Just ask me anything from these topics!"
+    )
+}
+
+FALLBACK_RESPONSE = (
+    "🤔 **I'm not sure I understood. Try asking about:**\n"
+    "\n"
+    "🏥 **Health:**\n"
+    "• 'fever treatment'\n"
+    "• 'headache remedies'\n"
+    "• 'stress management'\n"
+    "\n"
+    "📚 **Text Analytics:**\n"
+    "• 'introduction to text analytics'\n"
+    "• 'text preprocessing techniques'\n"
+    "• 'TF-IDF explained'\n"
+    "• 'NER and POS tagging'\n"
+    "• 'code examples for text preprocessing'\n"
+    "• 'recommended books for NLP'"
+)
+
+# Topics that gate a group of intents ("what is" alone should not answer NLP questions)
+TOPICS = {
+    'text_analytics': ['text analytics', 'text mining', 'nlp']
+}
+
+# Intents in priority order - the first satisfied intent wins, exactly like the
+# original keyword chain. Keywords match as substrings of the lowercased message.
+# 'phrases' are extra wording used only by the retrieval index.
+INTENTS = [
+    # Health queries
+    {'name': 'health.fever', 'category': 'health', 'keywords': ['fever', 'temperature'], 'answer': ('health', 'fever'),
+     'phrases': ['feeling hot', 'high temperature', 'burning up', 'chills']},
+    {'name': 'health.headache', 'category': 'health', 'keywords': ['headache', 'migraine'], 'answer': ('health', 'headache'),
+     'phrases': ['head hurts', 'head pain', 'pounding head', 'throbbing head']},
+    {'name': 'health.cough', 'category': 'health', 'keywords': ['cough'], 'answer': ('health', 'cough'),
+     'phrases': ['sore throat', 'chest congestion', 'phlegm']},
+    {'name': 'health.cold', 'category': 'health', 'keywords': ['cold', 'flu'], 'answer': ('health', 'cold'),
+     'phrases': ['runny nose', 'blocked nose', 'sneezing', 'stuffy nose']},
+    {'name': 'health.stomach', 'category': 'health', 'keywords': ['stomach', 'pain'], 'answer': ('health', 'stomach'),
+     'phrases': ['tummy ache', 'nausea', 'vomiting', 'diarrhea', 'indigestion']},
+    {'name': 'health.stress', 'category': 'health', 'keywords': ['stress', 'anxiety'], 'answer': ('health', 'stress'),
+     'phrases': ['feeling anxious', 'overwhelmed', 'cannot relax', 'worried all the time']},
+    {'name': 'health.diabetes', 'category': 'health', 'keywords': ['diabet', 'sugar'], 'answer': ('health', 'diabetes'),
+     'phrases': ['diabetes', 'blood glucose', 'insulin']},
+    {'name': 'health.covid', 'category': 'health', 'keywords': ['covid', 'corona'], 'answer': ('health', 'covid'),
+     'phrases': ['coronavirus', 'tested positive', 'loss of smell']},
+
+    # Text analytics queries (only when the message mentions the topic)
+    {'name': 'textAnalytics.introduction', 'category': 'text_analytics', 'requires': 'text_analytics',
+     'keywords': ['intro', 'what is', 'definition'], 'answer': ('textAnalytics', 'introduction')},
+    {'name': 'textAnalytics.preprocessing', 'category': 'text_analytics', 'requires': 'text_analytics',
+     'keywords': ['preprocess', 'token', 'stem', 'lemma'], 'answer': ('textAnalytics', 'preprocessing')},
+    {'name': 'textAnalytics.representation', 'category': 'text_analytics', 'requires': 'text_analytics',
+     'keywords': ['represent', 'bow', 'tfidf', 'embedding', 'word2vec', 'bert'], 'answer': ('textAnalytics', 'representation')},
+    {'name': 'textAnalytics.nlpTechniques', 'category': 'text_analytics', 'requires': 'text_analytics',
+     'keywords': ['ner', 'pos', 'pars', 'named entity', 'part of speech'], 'answer': ('textAnalytics', 'nlpTechniques')},
+    {'name': 'textAnalytics.books', 'category': 'text_analytics', 'requires': 'text_analytics',
+     'keywords': ['book', 'resource', 'reference', 'learn'], 'answer': ('textAnalytics', 'books')},
+    {'name': 'textAnalytics.examples', 'category': 'text_analytics', 'requires': 'text_analytics',
+     'keywords': ['code', 'example', 'implement', 'python'], 'answer': ('textAnalytics', 'examples')},
+    {'name': 'textAnalytics.career', 'category': 'text_analytics', 'requires': 'text_analytics',
+     'keywords': ['career', 'job', 'project', 'skill'], 'answer': ('textAnalytics', 'career')},
+    # Default text analytics response
+    {'name': 'textAnalytics.default', 'category': 'text_analytics',
+     'keywords': TOPICS['text_analytics'], 'answer': ('textAnalytics', 'introduction')},
+
+    # General
+    {'name': 'greeting', 'category': 'general', 'keywords': ['hello', 'hi', 'hey', 'welcome'], 'answer': ('greeting',)},
+    {'name': 'help', 'category': 'general', 'keywords': ['help', 'what can you', 'assist'], 'answer': ('help',)}
+]
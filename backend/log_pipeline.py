@@ -0,0 +1,208 @@
+# log_pipeline.py - non-blocking structured logging: request threads enqueue, one thread writes
+import copy
+import itertools
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Correlation id of the request running in this context (thread or asyncio task)
+request_id = ContextVar('request_id', default=None)
+
+# Libraries that narrate every operation at DEBUG; held at WARNING unless configured otherwise
+QUIET_LOGGERS = ('aiosqlite', 'asyncio', 'urllib3')
+
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+# Attributes every LogRecord has; anything else came in through `extra=` and is emitted as a field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def new_request_id(incoming=None):
+    """Adopt the caller's X-Request-ID when it looks sane, otherwise mint one; returns it"""
+    value = incoming if incoming and _REQUEST_ID.match(incoming) else uuid.uuid4().hex[:16]
+    request_id.set(value)
+    return value
+
+
+def parse_sampling(spec):
+    """'chat_saved=100,chats_saved=10' -> {'chat_saved': 100, 'chats_saved': 10} (keep 1 in N)"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        event, _, every = item.partition('=')
+        rates[event.strip()] = max(1, int(every))
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id, event fields and exc_info"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = None
+        return super().format(record)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the request id on the record while still on the request's thread"""
+
+    def filter(self, record):
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in N records of each high-volume event (extra={'event': ...}); others pass untouched"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {event: itertools.count() for event in self.rates}
+
+    def filter(self, record):
+        every = self.rates.get(getattr(record, 'event', None))
+        if every is None or every == 1:
+            return True
+        if next(self._counters[record.event]) % every:
+            return False
+        record.sample_rate = every  # Consumers multiply counts back up
+        return True
+
+
+_plain = logging.Formatter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """Merge args into msg and render the traceback now; keeps exc_text apart for the JSON field"""
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _plain.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Root logging through a bounded queue drained by one writer thread.
+
+    Request threads only format the message and enqueue it, so a slow stdout
+    consumer (a pipe, a log shipper) never stalls them; when the queue is
+    full records are dropped and counted. queue_size=0 writes synchronously
+    from the calling thread instead, like print() did.
+    """
+
+    def __init__(self, level='INFO', fmt='json', stream=None, sampling=None, queue_size=10000):
+        self.level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        self.fmt = fmt
+        self.stream = stream
+        self.sampling = sampling or {}
+        self.queue_size = queue_size
+
+        self._handler = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Install on the root logger (idempotent)"""
+        with self._lock:
+            if self._handler is not None:
+                return
+            output = logging.StreamHandler(self.stream or sys.stdout)
+            output.setFormatter(JsonFormatter() if self.fmt == 'json' else TextFormatter())
+
+            if self.queue_size > 0:
+                handler = DroppingQueueHandler(queue.Queue(self.queue_size))
+                self._listener = QueueListener(handler.queue, output, respect_handler_level=False)
+                self._listener.start()
+            else:
+                handler = output
+            if self.sampling:
+                handler.addFilter(SamplingFilter(self.sampling))
+            handler.addFilter(ContextFilter())
+
+            root = logging.getLogger()
+            root.addHandler(handler)
+            root.setLevel(self.level)
+            for name in QUIET_LOGGERS:
+                quiet = logging.getLogger(name)
+                if quiet.level == logging.NOTSET:
+                    quiet.setLevel(max(self.level, logging.WARNING))
+            self._handler = handler
+
+    def stop(self):
+        """Write out what is queued and detach (idempotent)"""
+        with self._lock:
+            if self._handler is None:
+                return
+            logging.getLogger().removeHandler(self._handler)
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+            self._handler = None
+
+    def after_fork(self):
+        """The writer thread does not survive fork(); give the child its own queue and thread"""
+        self._lock = threading.Lock()
+        if self._handler is not None:
+            logging.getLogger().removeHandler(self._handler)
+            self._handler = None
+            self._listener = None
+            self.start()
+
+    def stats(self):
+        handler = self._handler
+        queued = handler.queue.qsize() if isinstance(handler, QueueHandler) else None
+        return {
+            'running': handler is not None,
+            'level': logging.getLevelName(self.level),
+            'format': self.fmt,
+            'queued': queued,
+            'dropped': getattr(handler, 'dropped', 0),
+            'sampling': self.sampling
+        }
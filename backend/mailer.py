@@ -0,0 +1,223 @@
+# mailer.py - background email delivery over persistent SMTP sessions
+import logging
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDispatcher:
+    """Bounded email queue drained by worker threads.
+
+    Each worker keeps one authenticated SMTP session open and reuses it for
+    every message, reconnecting when the relay drops it. Messages that are
+    already waiting are sent back-to-back as a batch over the same session.
+    Failed sends are retried with exponential backoff.
+    """
+
+    def __init__(self, host, port, user='', password='', sender=None, use_tls=True,
+                 workers=1, queue_size=1000, batch_size=20, max_retries=3,
+                 backoff=1.0, timeout=30, idle_timeout=60):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender or user
+        self.use_tls = use_tls
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.connects = 0
+        self.batches = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'email-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        """Deliver what is already queued, then stop the workers"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        for _ in threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def after_fork(self):
+        """Reset in a forked child: queued messages are the parent's to send"""
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    # ---------- producer side ----------
+
+    def enqueue(self, to_email, subject, body, subtype='html'):
+        """Queue a message; returns False when the queue is full"""
+        self.start()
+        try:
+            self._queue.put_nowait((to_email, subject, body, subtype, time.monotonic()))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.queued += 1
+        return True
+
+    def join(self):
+        """Block until every queued message has been handled"""
+        self._queue.join()
+
+    def stats(self):
+        """Queue depth and delivery counters"""
+        delivered = self.sent or 1
+        return {
+            'queue_depth': self._queue.qsize(),
+            'queue_size': self._queue.maxsize,
+            'workers': len(self._threads),
+            'queued': self.queued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'retries': self.retries,
+            'connections': self.connects,
+            'batches': self.batches,
+            'last_latency_ms': round(self.last_latency * 1000, 2),
+            'avg_latency_ms': round(self.total_latency / delivered * 1000, 2),
+            'max_latency_ms': round(self.max_latency * 1000, 2)
+        }
+
+    # ---------- worker side ----------
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.ehlo()
+        if self.use_tls:
+            # Raises SMTPNotSupportedError when STARTTLS is not offered; never log in over plaintext
+            server.starttls()
+            server.ehlo()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        self.connects += 1
+        return server
+
+    @staticmethod
+    def _close(server):
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _build(self, to_email, subject, body, subtype):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, subtype))
+        return msg
+
+    def _next_batch(self):
+        """Block for one message, then take whatever else is already waiting"""
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        server = None
+        last_used = 0.0
+        while True:
+            batch = self._next_batch()
+            messages = [item for item in batch if item is not None]
+
+            # Probe sessions that sat idle long enough for the relay to drop them
+            if server is not None and messages and time.monotonic() - last_used > self.idle_timeout:
+                try:
+                    server.noop()
+                except Exception:
+                    self._close(server)
+                    server = None
+
+            if messages:
+                self.batches += 1
+            for item in messages:
+                server = self._deliver(server, *item)
+                last_used = time.monotonic()
+
+            for _ in batch:
+                self._queue.task_done()
+
+            # A None sentinel from stop() ends the worker
+            if len(messages) < len(batch):
+                self._close(server)
+                return
+
+    def _deliver(self, server, to_email, subject, body, subtype, queued_at):
+        """Send one message, reconnecting and backing off on failure"""
+        msg = self._build(to_email, subject, body, subtype)
+        for attempt in range(self.max_retries + 1):
+            try:
+                if server is None:
+                    server = self._connect()
+                server.send_message(msg)
+
+                latency = time.monotonic() - queued_at
+                self.sent += 1
+                self.last_latency = latency
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+                return server
+            except Exception as e:
+                self._close(server)
+                server = None
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error("❌ Email sending error (%s): %s", to_email, e)
+                    return None
+                self.retries += 1
+                time.sleep(self.backoff * (2 ** attempt))
+        return server
@@ -0,0 +1,161 @@
+# metrics.py - in-process Prometheus metrics and per-request SQL accounting
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Prometheus' default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    """Monotonic total per label set"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        """Add to the series for `labels` (values in labelnames order)"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Bucketed observations per label set; buckets are cumulative only when rendered"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [count per bucket..., count above the last bucket, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        """Record one observation for `labels` (values in labelnames order)"""
+        index = bisect.bisect_left(self.buckets, value)  # First bucket with value <= le
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        names = self.labelnames + ('le',)
+        for labels, values in series:
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                total += count
+                yield f'{self.name}_bucket', _format_labels(names, labels + (_format_value(bound),)), total
+            yield f'{self.name}_sum', _format_labels(self.labelnames, labels), values[-1]
+            yield f'{self.name}_count', _format_labels(self.labelnames, labels), total
+
+
+class MetricsRegistry:
+    """Metrics of this process, rendered in the Prometheus text format (0.0.4).
+
+    Every worker process keeps its own registry, so with several gunicorn
+    workers each scrape sees one worker; label the scrape target per worker
+    (or run one worker per port) when the totals matter.
+    """
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class QueryCounter:
+    """Counts SQL statements, and the time spent in them, per request.
+
+    begin() starts counting for the request running in the current context
+    (thread or asyncio task) and end() returns [statements, seconds].
+    Statements outside a request - background writers, the CLI - are not
+    counted and cost one context variable lookup.
+    """
+
+    def __init__(self):
+        self._current = ContextVar('request_queries', default=None)
+
+    def install(self, engine):
+        """Listen to the cursor events of a (sync) engine"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def uninstall(self, engine):
+        event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def begin(self):
+        stats = [0, 0.0]
+        self._current.set(stats)
+        return stats
+
+    def end(self):
+        stats = self._current.get()
+        self._current.set(None)
+        return stats
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current.get() is not None:
+            conn.info['query_started'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._current.get()
+        if stats is None:
+            return
+        started = conn.info.pop('query_started', None)
+        stats[0] += 1
+        if started is not None:
+            stats[1] += time.perf_counter() - started
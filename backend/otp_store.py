@@ -0,0 +1,84 @@
+# otp_store.py - in-process OTP storage with TTL expiry for single-node deployments
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryOTPStore:
+    """One live OTP per (email, purpose), kept in this process only.
+
+    Issuing a new code replaces the previous one. Entries are ordered by
+    issue time and every code lives `ttl` seconds, so expired entries are
+    always at the front and are swept from there on each call. Codes are
+    lost on restart and invisible to other workers, so this only fits a
+    single-process deployment.
+    """
+
+    def __init__(self, ttl, max_entries=100000, clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+
+        self._codes = OrderedDict()  # (email, purpose) -> (code, expires_at)
+        self._lock = threading.Lock()
+
+        self.issued = 0
+        self.verified = 0
+        self.failed = 0
+        self.expired = 0
+
+    def _sweep(self, now):
+        while self._codes:
+            key, (_, expires_at) = next(iter(self._codes.items()))
+            if expires_at > now:
+                break
+            del self._codes[key]
+            self.expired += 1
+
+    def issue(self, email, code, purpose='password_reset'):
+        """Store a code; returns how many live codes it replaced (0 or 1)"""
+        with self._lock:
+            now = self.clock()
+            self._sweep(now)
+            key = (email, purpose)
+            replaced = 1 if self._codes.pop(key, None) else 0
+            self._codes[key] = (code, now + self.ttl)
+            if len(self._codes) > self.max_entries:
+                self._codes.popitem(last=False)
+            self.issued += 1
+            return replaced
+
+    def verify(self, email, code, purpose='password_reset'):
+        """'valid' (the code is consumed), 'expired' or None for no match"""
+        with self._lock:
+            now = self.clock()
+            key = (email, purpose)
+            entry = self._codes.get(key)
+            if entry is None or not hmac.compare_digest(entry[0], str(code)):
+                self.failed += 1
+                self._sweep(now)
+                return None
+            del self._codes[key]
+            if entry[1] <= now:
+                self.expired += 1
+                return 'expired'
+            self.verified += 1
+            return 'valid'
+
+    def __len__(self):
+        with self._lock:
+            self._sweep(self.clock())
+            return len(self._codes)
+
+    def stats(self):
+        """Live codes and counters (never the codes themselves)"""
+        return {
+            'backend': 'memory',
+            'live': len(self),
+            'ttl_seconds': self.ttl,
+            'issued': self.issued,
+            'verified': self.verified,
+            'failed': self.failed,
+            'expired': self.expired
+        }
@@ -0,0 +1,118 @@
+# passwords.py - password hashing on a process pool with a tunable cost
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+SCRYPT_DEFAULT_N = 2 ** 15  # werkzeug's default scrypt cost
+
+
+def hash_method(algorithm='scrypt', work_factor=0):
+    """werkzeug method string with every parameter spelled out.
+
+    work_factor is the scrypt N (a power of two) or the PBKDF2 iteration
+    count; 0 keeps werkzeug's default. Spelling the parameters out lets a
+    stored hash be compared with the current settings.
+    """
+    name, _, digest = algorithm.partition(':')
+    if name == 'scrypt':
+        n = work_factor or SCRYPT_DEFAULT_N
+        if n < 2 or n & (n - 1):
+            raise ValueError('scrypt work factor must be a power of two')
+        return f'scrypt:{n}:8:1'
+    if name == 'pbkdf2':
+        return f'pbkdf2:{digest or "sha256"}:{work_factor or DEFAULT_PBKDF2_ITERATIONS}'
+    raise ValueError(f'Unsupported password hash algorithm: {algorithm}')
+
+
+# Module-level so the pool can pickle them by reference
+def _generate(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _check(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords away from the request thread.
+
+    With workers > 0 the key derivation runs in a process pool, so a request
+    thread only waits on a future (holding no GIL) while other requests
+    keep being served. With workers == 0 it runs inline, as before. If the
+    pool breaks (a worker was killed) it is rebuilt on the next call.
+    """
+
+    def __init__(self, algorithm='scrypt', work_factor=0, workers=0, timeout=30):
+        self.method = hash_method(algorithm, work_factor)
+        self.workers = workers
+        self.timeout = timeout
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+        self.hashed = 0
+        self.verified = 0
+        self.pool_restarts = 0
+        self.total_time = 0.0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _run(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            if not self.workers:
+                return fn(*args)
+            try:
+                return self._get_pool().submit(fn, *args).result(self.timeout)
+            except BrokenProcessPool:
+                with self._lock:
+                    self._pool = None
+                    self.pool_restarts += 1
+                return self._get_pool().submit(fn, *args).result(self.timeout)
+        finally:
+            self.total_time += time.perf_counter() - started
+
+    def hash(self, password):
+        """Hash with the configured algorithm and work factor"""
+        self.hashed += 1
+        return self._run(_generate, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Check a password against any werkzeug hash, whatever its parameters"""
+        self.verified += 1
+        return self._run(_check, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when a stored hash was made with other settings"""
+        return pwhash.split('$', 1)[0] != self.method
+
+    def stop(self):
+        """Shut the worker processes down"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def after_fork(self):
+        """Forget a pool inherited from the parent process (it stays the parent's to shut down)"""
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """Settings and counters (no secrets)"""
+        operations = self.hashed + self.verified
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'hashed': self.hashed,
+            'verified': self.verified,
+            'pool_restarts': self.pool_restarts,
+            'avg_ms': round(self.total_time / operations * 1000, 2) if operations else 0
+        }
@@ -0,0 +1,204 @@
+# rate_limit.py - token-bucket rate limiting with in-process or shared (Redis) state
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def bucket_rules(per_minute, per_hour):
+    """(capacity, tokens per second) for every enabled limit; 0 disables a limit"""
+    rules = []
+    if per_minute > 0:
+        rules.append((per_minute, per_minute / 60.0))
+    if per_hour > 0:
+        rules.append((per_hour, per_hour / 3600.0))
+    return rules
+
+
+def take_token(tokens, elapsed, rules):
+    """Refill every bucket for `elapsed` seconds and take one token from each.
+
+    Returns (allowed, retry_after_seconds, new token levels). A request is
+    only allowed when every bucket has a token, and then all of them pay.
+    """
+    levels = [min(capacity, level + elapsed * rate) for level, (capacity, rate) in zip(tokens, rules)]
+    if all(level >= 1 for level in levels):
+        return True, 0.0, [level - 1 for level in levels]
+    retry_after = max((1 - level) / rate for level, (_, rate) in zip(levels, rules) if level < 1)
+    return False, retry_after, levels
+
+
+class MemoryBackend:
+    """Buckets kept in this process; one small list per active key.
+
+    Least recently used keys are dropped past `max_keys`. A dropped key
+    simply starts again with full buckets, which is what an idle key would
+    have refilled to anyway.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [timestamp, level, level, ...]
+        self._lock = threading.Lock()
+
+    def consume(self, key, rules, now):
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens, elapsed = [capacity for capacity, _ in rules], 0.0
+            else:
+                self._buckets.move_to_end(key)
+                tokens, elapsed = state[1:], max(0.0, now - state[0])
+
+            allowed, retry_after, levels = take_token(tokens, elapsed, rules)
+            self._buckets[key] = [now] + levels
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed, retry_after
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RedisBackend:
+    """Buckets shared by every worker through a Redis-compatible server.
+
+    The refill-and-take step runs as one Lua script, so concurrent workers
+    cannot both spend the last token. Each key is a small hash that expires
+    once its buckets would be full again.
+    """
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local count = tonumber(ARGV[2])
+    local names = {'ts'}
+    for i = 1, count do
+        names[i + 1] = 't' .. i
+    end
+    local stored = redis.call('HMGET', KEYS[1], unpack(names))
+    local ts = tonumber(stored[1])
+    local elapsed = 0
+    if ts then
+        elapsed = math.max(0, now - ts)
+    end
+
+    local allowed = 1
+    local retry = 0
+    local levels = {}
+    local ttl = 1
+    for i = 1, count do
+        local capacity = tonumber(ARGV[1 + 2 * i])
+        local rate = tonumber(ARGV[2 + 2 * i])
+        local level = tonumber(stored[i + 1]) or capacity
+        level = math.min(capacity, level + elapsed * rate)
+        levels[i] = level
+        if level < 1 then
+            allowed = 0
+            retry = math.max(retry, (1 - level) / rate)
+        end
+        ttl = math.max(ttl, math.ceil(capacity / rate))
+    end
+
+    local fields = {'ts', tostring(now)}
+    for i = 1, count do
+        local level = levels[i]
+        if allowed == 1 then
+            level = level - 1
+        end
+        table.insert(fields, 't' .. i)
+        table.insert(fields, tostring(level))
+    end
+    redis.call('HSET', KEYS[1], unpack(fields))
+    redis.call('EXPIRE', KEYS[1], ttl)
+    return {allowed, tostring(retry)}
+    """
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def consume(self, key, rules, now):
+        args = [repr(now), len(rules)]
+        for capacity, rate in rules:
+            args.extend([capacity, repr(rate)])
+        allowed, retry_after = self._script(keys=[self.prefix + key], args=args)
+        return bool(int(allowed)), float(retry_after)
+
+    def reset(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*'))
+
+
+def backend_from_url(url):
+    """memory:// (default) or redis://host:port/db"""
+    if not url or url.startswith('memory://'):
+        return MemoryBackend()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis  # Only needed for the shared backend
+        return RedisBackend(redis.Redis.from_url(url))
+    raise ValueError(f'Unsupported rate limit storage: {url}')
+
+
+class RateLimiter:
+    """Per-key token buckets for a per-minute and a per-hour limit.
+
+    Backend errors fail open: a broken shared store must not take the API
+    down with it.
+    """
+
+    def __init__(self, backend, per_minute, per_hour, clock=time.time):
+        self.backend = backend
+        self.per_minute = per_minute
+        self.per_hour = per_hour
+        self.clock = clock
+
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+
+    def hit(self, key, per_minute=None, per_hour=None):
+        """Spend one token for key; returns (allowed, whole seconds to wait)"""
+        rules = bucket_rules(self.per_minute if per_minute is None else per_minute,
+                             self.per_hour if per_hour is None else per_hour)
+        if not rules:
+            return True, 0
+
+        try:
+            allowed, retry_after = self.backend.consume(key, rules, self.clock())
+        except Exception as e:
+            self.errors += 1
+            logger.error("❌ Rate limit backend error: %s", e)
+            return True, 0
+
+        if allowed:
+            self.allowed += 1
+            return True, 0
+        self.limited += 1
+        return False, max(1, math.ceil(retry_after))
+
+    def stats(self):
+        """Decision counters and backend size"""
+        try:
+            keys = len(self.backend)
+        except Exception:
+            keys = None
+        return {
+            'backend': type(self.backend).__name__,
+            'keys': keys,
+            'per_minute': self.per_minute,
+            'per_hour': self.per_hour,
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'errors': self.errors
+        }
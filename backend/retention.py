@@ -0,0 +1,210 @@
+# retention.py - background deletion of expired rows in small transactions
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, insert, update
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionWorker:
+    """Runs retention tasks every `interval` seconds on a background thread.
+
+    A task is a generator function taking the batch size; it deletes and
+    commits one batch per step and yields how many rows that batch removed.
+    Between batches the worker sleeps `pause` seconds so other writers get
+    the database lock back, and it stops a pass early once `max_seconds`
+    are spent (the next pass carries on where it left off). After the
+    tasks, `maintenance(rows_deleted)` may compact the database and returns
+    a dict for the report.
+
+    Every process that starts the worker schedules passes; a `lease`
+    (DatabaseLease) lets one of them run at a time and, for scheduled passes,
+    only once per interval across all of them.
+    """
+
+    def __init__(self, tasks, maintenance=None, context=None, interval=3600, batch_size=1000,
+                 pause=0.01, max_seconds=60, lease=None):
+        self.tasks = tasks  # [(name, generator function)]
+        self.maintenance = maintenance
+        self.lease = lease
+        self.context = context or nullcontext
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_seconds = max_seconds
+
+        self._lock = threading.Lock()  # One pass at a time (thread or CLI)
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.rows_deleted = 0
+        self.last_report = None
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Start the background thread (idempotent; interval 0 disables it)"""
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='retention-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop after the batch in progress"""
+        thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join(10)
+
+    def after_fork(self):
+        """Reset in a forked child without starting; one process (the parent) runs the passes"""
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once(scheduled=True)
+            except Exception:
+                self.errors += 1
+                logger.exception("❌ Retention error")
+
+    # ---------- passes ----------
+
+    def run_once(self, scheduled=False):
+        """Run every task, then maintenance; returns the report, or None when another process has the lease"""
+        with self._lock, self.context():
+            if self.lease is not None and not self.lease.claim(scheduled):
+                self.skipped += 1
+                return None
+            try:
+                report = self._pass()
+            finally:
+                if self.lease is not None:
+                    self.lease.release()
+
+        if report['rows_deleted']:
+            logger.info("🧹 Retention: reclaimed %d rows in %ss", report['rows_deleted'], report['seconds'],
+                        extra={'event': 'retention_pass', 'count': report['rows_deleted']})
+        return report
+
+    def _pass(self):
+        """Run every task, then maintenance; returns the report"""
+        started = time.perf_counter()
+        deadline = started + self.max_seconds if self.max_seconds > 0 else None
+        report = {'started_at': datetime.utcnow().isoformat(), 'tasks': {}, 'complete': True}
+
+        for name, task in self.tasks:
+            task_started = time.perf_counter()
+            rows = batches = 0
+            steps = task(self.batch_size)
+            try:
+                for deleted in steps:
+                    rows += deleted
+                    batches += 1
+                    if self._stop.is_set() or (deadline and time.perf_counter() > deadline):
+                        report['complete'] = False
+                        break
+                    if self.pause:
+                        time.sleep(self.pause)
+            finally:
+                steps.close()
+            report['tasks'][name] = {
+                'rows': rows,
+                'batches': batches,
+                'seconds': round(time.perf_counter() - task_started, 3)
+            }
+            if not report['complete']:
+                break
+
+        deleted = sum(task['rows'] for task in report['tasks'].values())
+        if self.maintenance is not None:
+            maintenance_started = time.perf_counter()
+            report['maintenance'] = self.maintenance(deleted)
+            report['maintenance']['seconds'] = round(time.perf_counter() - maintenance_started, 3)
+
+        report['rows_deleted'] = deleted
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        self.runs += 1
+        self.rows_deleted += deleted
+        self.last_report = report
+        return report
+
+    def stats(self):
+        """Settings, totals and the last report"""
+        return {
+            'interval_seconds': self.interval,
+            'batch_size': self.batch_size,
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'rows_deleted': self.rows_deleted,
+            'last_run': self.last_report
+        }
+
+
+class DatabaseLease:
+    """Which process may run a periodic job, kept in one row of `model` (name, holder, expires_at, finished_at).
+
+    claim() takes the row when no pass is running (expires_at has passed)
+    and, for scheduled passes, when the last one finished at least
+    `min_gap` seconds ago; a claim holds for `hold` seconds, longer than a
+    pass may take. release() marks the pass finished. `session` returns
+    the SQLAlchemy session to use.
+    """
+
+    def __init__(self, model, name, session, hold, min_gap):
+        self.model = model
+        self.name = name
+        self.session = session
+        self.hold = timedelta(seconds=hold)
+        self.min_gap = timedelta(seconds=min_gap)
+
+    @staticmethod
+    def holder():
+        """This process as recorded in the row (the pid changes across fork)"""
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def claim(self, scheduled=False):
+        """Take the lease; returns False when another process is running, or recently ran, the job"""
+        model, session, now = self.model, self.session(), datetime.utcnow()
+        free = model.expires_at < now
+        if scheduled:
+            free = and_(free, or_(model.finished_at.is_(None), model.finished_at <= now - self.min_gap))
+        values = {'holder': self.holder(), 'expires_at': now + self.hold}
+        try:
+            claimed = session.execute(update(model).where(model.name == self.name, free).values(**values)).rowcount
+            if not claimed:
+                # First run ever, or the row exists and someone else holds it (IntegrityError)
+                session.execute(insert(model).values(name=self.name, **values))
+            session.commit()
+            return True
+        except IntegrityError:
+            session.rollback()
+            return False
+
+    def release(self):
+        """End this process's claim so the next pass, in any process, can take it"""
+        model, session, now = self.model, self.session(), datetime.utcnow()
+        try:
+            session.execute(
+                update(model)
+                .where(model.name == self.name, model.holder == self.holder())
+                .values(expires_at=now, finished_at=now)
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
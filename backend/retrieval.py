@@ -0,0 +1,189 @@
+# retrieval.py - TF-IDF retrieval over knowledge base entries
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from
+further had has have having he her here hers him his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours out
+over own same she should so some such than that the their theirs them then there these
+they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours please tell give show explain
+""".split())
+
+
+def stem(token):
+    """Very small suffix stripper so 'hurts'/'hurting' meet 'hurt'"""
+    for suffix in ('ing', 'es', 'ed', 's'):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    """Lowercase word tokens with stop words removed and suffixes stripped"""
+    return [stem(token) for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class RetrievalIndex:
+    """Sparse TF-IDF index scored by cosine similarity.
+
+    Postings map term -> {doc key: term frequency}, i.e. the columns of a
+    sparse term-document matrix, so scoring a query is one sparse
+    matrix-vector product over the query's terms. Documents can be added and
+    removed one at a time; only the document norms are recomputed afterwards.
+    Callers that share an index between threads should update a copy() and
+    swap it in rather than mutating the live one.
+    """
+
+    def __init__(self):
+        self.docs = {}       # key -> {'hash', 'terms', 'meta'}
+        self.postings = {}   # term -> {key: tf}
+        self._norms = {}
+        self._idf_cache = {}
+        self._dirty = True
+
+    def __len__(self):
+        return len(self.docs)
+
+    @staticmethod
+    def content_hash(text, meta):
+        payload = json.dumps([text, meta], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def add(self, key, text, meta):
+        """Index (or re-index) one document"""
+        digest = self.content_hash(text, meta)
+        existing = self.docs.get(key)
+        if existing and existing['hash'] == digest:
+            return False
+        if existing:
+            self.remove(key)
+
+        terms = {}
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0) + 1
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[key] = tf
+
+        self.docs[key] = {'hash': digest, 'terms': terms, 'meta': meta}
+        self._dirty = True
+        return True
+
+    def remove(self, key):
+        """Drop one document from the index"""
+        doc = self.docs.pop(key, None)
+        if not doc:
+            return False
+        for term in doc['terms']:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self.postings[term]
+        self._dirty = True
+        return True
+
+    def copy(self):
+        """Independent copy for copy-on-write updates"""
+        clone = RetrievalIndex()
+        clone.docs = {key: dict(doc) for key, doc in self.docs.items()}
+        clone.postings = {term: dict(posting) for term, posting in self.postings.items()}
+        clone._dirty = True
+        return clone
+
+    def sync(self, documents):
+        """Make the index match {key: (text, meta)}, touching only changed docs"""
+        changed = 0
+        for key in list(self.docs):
+            if key not in documents:
+                changed += self.remove(key)
+        for key, (text, meta) in documents.items():
+            changed += self.add(key, text, meta)
+        self.refresh()
+        return changed
+
+    def _idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log((1 + len(self.docs)) / (1 + df)) + 1
+
+    def refresh(self):
+        """Recompute idf weights and document norms after the collection changed"""
+        idf = {term: self._idf(term) for term in self.postings}
+        self._norms = {
+            key: math.sqrt(sum(((1 + math.log(tf)) * idf[term]) ** 2 for term, tf in doc['terms'].items()))
+            for key, doc in self.docs.items()
+        }
+        self._idf_cache = idf
+        self._dirty = False
+
+    def search(self, query, k=3):
+        """Return up to k (score, key, meta) tuples, best first"""
+        if self._dirty:
+            self.refresh()
+
+        query_terms = {}
+        for token in tokenize(query):
+            if token in self.postings:
+                query_terms[token] = query_terms.get(token, 0) + 1
+        if not query_terms:
+            return []
+
+        idf = self._idf_cache
+        query_weights = {term: (1 + math.log(tf)) * idf[term] for term, tf in query_terms.items()}
+        query_norm = math.sqrt(sum(weight * weight for weight in query_weights.values()))
+
+        scores = {}
+        for term, query_weight in query_weights.items():
+            term_idf = idf[term]
+            for key, tf in self.postings[term].items():
+                scores[key] = scores.get(key, 0.0) + query_weight * (1 + math.log(tf)) * term_idf
+
+        # Normalize before picking the top k: raw dot products favour long documents
+        norms = self._norms
+        ranked = heapq.nlargest(k, (
+            (score / (norms[key] * query_norm), key)
+            for key, score in scores.items()
+            if norms[key]
+        ), key=lambda item: item[0])
+        return [(score, key, self.docs[key]['meta']) for score, key in ranked]
+
+    def save(self, path):
+        """Persist the index as JSON (written atomically)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            'version': 1,
+            'docs': {key: {'hash': doc['hash'], 'terms': doc['terms'], 'meta': doc['meta']}
+                     for key, doc in self.docs.items()}
+        }
+        tmp_path = f'{path}.{os.getpid()}.tmp'  # Workers may save at the same time
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(payload, fh, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved index, or return an empty one if missing/unreadable"""
+        index = cls()
+        try:
+            with open(path, encoding='utf-8') as fh:
+                payload = json.load(fh)
+        except (OSError, ValueError):
+            return index
+        if payload.get('version') != 1:
+            return index
+
+        for key, doc in payload['docs'].items():
+            index.docs[key] = doc
+            for term, tf in doc['terms'].items():
+                index.postings.setdefault(term, {})[key] = tf
+        return index
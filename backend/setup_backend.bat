@@ -40,8 +40,13 @@ pip install flask-sqlalchemy flask-migrate
 
 REM Install optional dependencies (comment out if not needed)
 echo 📊 Installing additional utilities...
-pip install flask-limiter  # For rate limiting
+pip install redis  # Shared rate limit buckets (RATE_LIMIT_STORAGE_URL=redis://...)
+pip install fakeredis lupa  # Redis stand-in for the rate limit benchmark
 pip install python-dateutil  # For date handling
+pip install aiosmtpd  # Local SMTP stand-in for the email benchmark
+pip install gunicorn  # Production server on Linux/macOS (gunicorn -c gunicorn.conf.py wsgi:application)
+pip install uvicorn asgiref  # ASGI alternative that also runs on Windows (uvicorn asgi:application)
+pip install aiosqlite greenlet  # Async driver for the ASGI chat routes (asyncpg for PostgreSQL)
 
 REM Create required directories
 echo 📁 Creating directories...
@@ -61,9 +66,10 @@ echo.
 echo 📋 Next steps:
 echo 1. Edit .env file with your configuration
 echo 2. Activate environment: venv\Scripts\activate
-echo 3. Initialize database: 
-echo    - python app.py (first run will create tables)
+echo 3. Initialize database (once per deployment, safe to re-run after upgrades):
+echo    - flask init-db
 echo 4. Run the server: python app.py
+echo 5. Production: gunicorn -c gunicorn.conf.py wsgi:application
 echo.
 echo ⚙️  Default credentials:
 echo    Email: demo@example.com
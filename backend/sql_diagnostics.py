@@ -0,0 +1,162 @@
+# sql_diagnostics.py - slow-query log, N+1 detection and query budgets for the SQLAlchemy layer
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Prefix that asks each backend for a plan without running the statement
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN '
+}
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """The statement with literals and IN-lists folded, so one query per row looks the same each time"""
+    shape = _SPACE.sub(' ', statement.strip())
+    shape = _LITERAL.sub('?', shape)
+    return _IN_LIST.sub('(...)', shape)
+
+
+def _shorten(statement, limit=300):
+    statement = _SPACE.sub(' ', statement.strip())
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+class QueryDiagnostics:
+    """Development aid hooked to an engine's cursor events.
+
+    Statements slower than `slow_ms` are reported with their EXPLAIN plan,
+    wherever they run. Between begin(label) and end() - one request - the
+    statements are grouped by shape, and a shape seen `repeat_threshold`
+    times or more is reported as a likely N+1 (a query per row of an
+    earlier result). `report` receives each message.
+    """
+
+    def __init__(self, slow_ms=100.0, repeat_threshold=5, explain=True, report=print, keep=50):
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.explain = explain
+        self.report = report
+        self._current = ContextVar('request_statements', default=None)
+
+        self.recent = deque(maxlen=keep)  # Latest findings, for /api/stats
+        self.slow_queries = 0
+        self.repeated = 0
+        self._lock = threading.Lock()
+
+    # ---------- lifecycle ----------
+
+    def install(self, engine):
+        """Listen to the cursor events of a (sync) engine"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def begin(self, label):
+        self._current.set((label, Counter()))
+
+    def end(self):
+        """Report the repeated shapes of the request begun in this context; returns them as {shape: count}"""
+        current = self._current.get()
+        self._current.set(None)
+        if current is None:
+            return {}
+
+        label, shapes = current
+        repeated = {shape: count for shape, count in shapes.items() if count >= self.repeat_threshold}
+        for shape, count in repeated.items():
+            self._record('n_plus_one', label, f"🔁 Possible N+1 in {label}: {count}x {_shorten(shape)}",
+                         statement=shape, count=count)
+        return repeated
+
+    # ---------- cursor events ----------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['diagnostics_started'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('diagnostics_started', None)
+        current = self._current.get()
+        if current is not None and not executemany:
+            current[1][statement_shape(statement)] += 1
+
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms < self.slow_ms:
+            return
+
+        label = current[0] if current is not None else 'background'
+        plan = self.explain_plan(conn, statement, parameters) if self.explain and not executemany else None
+        message = f"🐢 Slow query ({elapsed_ms:.1f} ms, {label}): {_shorten(statement)}"
+        if plan:
+            message += f"\n   plan: {plan}"
+        self._record('slow', label, message, statement=_shorten(statement), ms=round(elapsed_ms, 1), plan=plan)
+
+    def explain_plan(self, conn, statement, parameters):
+        """EXPLAIN output on one line, or None; runs on the raw DBAPI connection so no events fire"""
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        try:
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                return ' | '.join(str(row[-1]) for row in cursor.fetchall())
+            finally:
+                cursor.close()
+        except Exception:
+            return None
+
+    def _record(self, kind, label, message, **details):
+        with self._lock:
+            if kind == 'slow':
+                self.slow_queries += 1
+            else:
+                self.repeated += 1
+            self.recent.append(dict(details, kind=kind, where=label))
+        self.report(message)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'slow_query_ms': self.slow_ms,
+                'repeat_threshold': self.repeat_threshold,
+                'slow_queries': self.slow_queries,
+                'n_plus_one': self.repeated,
+                'recent': list(self.recent)
+            }
+
+
+@contextmanager
+def assert_max_queries(engine, max_queries, label='block'):
+    """Fail with AssertionError when the block sends more than `max_queries` statements.
+
+    Only statements from the calling thread count, so background writers do
+    not make a budget flaky. Yields the list of statements sent so far.
+    """
+    thread = threading.get_ident()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    if len(statements) > max_queries:
+        listing = '\n'.join(f'  {i}. {_shorten(statement, 200)}' for i, statement in enumerate(statements, 1))
+        raise AssertionError(f"{label} sent {len(statements)} SQL statements, budget {max_queries}:\n{listing}")
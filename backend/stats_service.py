@@ -0,0 +1,147 @@
+# stats_service.py - in-memory system counters kept current by write events
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class StatisticsService:
+    """Counters for /api/health and /api/stats without COUNT queries.
+
+    Routes report what they changed through apply() once their transaction
+    commits. A background thread replaces everything with fresh numbers from
+    `loader()` every `reconcile_interval` seconds, which corrects any drift
+    (rows changed outside the app, a delta racing a reconcile). Per-day
+    numbers are kept by date, so a new day starts from zero.
+    """
+
+    def __init__(self, loader, reconcile_interval=300):
+        self._loader = loader
+        self.reconcile_interval = reconcile_interval
+
+        self._lock = threading.Lock()
+        self._state = None
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.reconciles = 0
+        self.reconcile_errors = 0
+        self.drift = 0  # Total absolute correction made by the last reconcile
+        self.last_reconciled = None
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Start the reconcile thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None or self.reconcile_interval <= 0:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='stats-reconciler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the reconcile thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join(5)
+
+    def after_fork(self):
+        """Reset in a forked child; the reconcile thread restarts with the first snapshot"""
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.wait(self.reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception:
+                self.reconcile_errors += 1
+                logger.exception("❌ Statistics reconcile error")
+
+    # ---------- updates ----------
+
+    def reconcile(self):
+        """Replace the counters with numbers read from the database"""
+        fresh = self._loader()
+        state = {
+            'users': fresh['users'],
+            'chats': fresh['chats'],
+            'otps_unused': fresh['otps_unused'],
+            'admin_exists': fresh['admin_exists'],
+            'roles': Counter(fresh['roles']),
+            'categories': Counter(fresh['categories']),
+            'chats_by_day': {fresh['today']: fresh['chats_today']},
+            'active_by_day': {fresh['today']: fresh['active_today']}
+        }
+        with self._lock:
+            if self._state is not None:
+                self.drift = sum(abs(state[key] - self._state[key]) for key in ('users', 'chats', 'otps_unused'))
+            self._state = state
+            self.reconciles += 1
+            self.last_reconciled = datetime.utcnow()
+
+    def apply(self, users=0, chats=0, otps_unused=0, roles=None, categories=None, days=None,
+              active_days=None, admin_exists=None):
+        """Add deltas from a committed write; dict arguments map name -> delta.
+
+        days counts chats and active_days users first seen active, per date;
+        admin_exists, when given, replaces the flag.
+        """
+        with self._lock:
+            state = self._state
+            if state is None:
+                return  # Nothing loaded yet; the first read reconciles
+            state['users'] += users
+            state['chats'] += chats
+            state['otps_unused'] += otps_unused
+            state['roles'].update(roles or {})
+            state['categories'].update(categories or {})
+            if admin_exists is not None:
+                state['admin_exists'] = admin_exists
+            for name, deltas in (('chats_by_day', days), ('active_by_day', active_days)):
+                by_day = state[name]
+                for day, delta in (deltas or {}).items():
+                    by_day[day] = by_day.get(day, 0) + delta
+
+                # Only today's bucket is ever read; keep yesterday for writes racing midnight
+                if len(by_day) > 2:
+                    oldest = datetime.utcnow().date() - timedelta(days=1)
+                    for day in [day for day in by_day if day < oldest]:
+                        del by_day[day]
+
+    # ---------- reads ----------
+
+    def snapshot(self):
+        """Current counters (reconciles first if nothing is loaded yet)"""
+        if self._state is None:
+            self.reconcile()
+            self.start()
+        today = datetime.utcnow().date()
+        with self._lock:
+            state = self._state
+            return {
+                'users': state['users'],
+                'chats': state['chats'],
+                'otps_unused': state['otps_unused'],
+                'active_today': state['active_by_day'].get(today, 0),
+                'admin_exists': state['admin_exists'],
+                'roles': {role: count for role, count in state['roles'].items() if count},
+                'categories': {category: count for category, count in state['categories'].items() if count},
+                'chats_today': state['chats_by_day'].get(today, 0),
+                'reconciled_at': self.last_reconciled.isoformat() if self.last_reconciled else None
+            }
+
+    def stats(self):
+        """Reconcile counters"""
+        return {
+            'reconcile_interval_seconds': self.reconcile_interval,
+            'reconciles': self.reconciles,
+            'reconcile_errors': self.reconcile_errors,
+            'last_drift': self.drift
+        }
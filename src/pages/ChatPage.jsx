@@ -4,6 +4,8 @@ import ChatBox from "../components/ChatBox";
 import InputBox from "../components/InputBox";
 import "../styles.css";
 
+const API_BASE_URL = "http://localhost:5000/api";
+
 // Comprehensive Knowledge Base - UPDATED FOR TEXT ANALYTICS
 const knowledgeBase = {
   // Health Issues & Solutions (Keep existing)
@@ -95,6 +97,7 @@ print("TF-IDF Matrix shape:", tfidf_matrix.shape)
 };
 
 // Smart Response Finder - UPDATED FOR TEXT ANALYTICS
+// Offline fallback only; answers normally come from the backend /chat/respond engine
 const getAIResponse = (userMessage) => {
   const msg = userMessage.toLowerCase().trim();
   
@@ -205,8 +208,20 @@ export default function ChatPage() {
     setIsTyping(true);
     
     // Generate AI response after delay
-    setTimeout(() => {
-      const aiResponse = getAIResponse(text);
+    setTimeout(async () => {
+      let aiResponse;
+      try {
+        const response = await fetch(`${API_BASE_URL}/chat/respond`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ message: text }),
+        });
+        const data = await response.json();
+        aiResponse = response.ok ? data.response : getAIResponse(text);
+      } catch (error) {
+        // Backend unreachable - answer from the local knowledge base
+        aiResponse = getAIResponse(text);
+      }
       console.log("Bot response:", aiResponse);
       
       const botMessage = {